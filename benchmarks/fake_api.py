@@ -0,0 +1,218 @@
+"""
+Local stand-in for api.homegate.ch serving `/geo/locations`, `/search/listings` and
+`/listings/listing/{id}` with configurable latency, jitter, payload size and error
+rate, for the benchmarks.
+
+The responses are built from fixtures: recorded responses in a directory (geo.json,
+search.json and listing.json, as returned by the API) or, by default, synthetic
+`srp-list` results. The search results of the fixture are repeated and renumbered
+up to `total` listings.
+
+    python benchmarks/fake_api.py --port 8080 --latency 0.02 --error-rate 0.01
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from listing_models import srp_result
+
+
+@dataclass
+class ApiProfile:
+    """
+    Behaviour of the stand-in server.
+
+    Args:
+        latency (float): Seconds waited before every response. Defaults to 0.005.
+        jitter (float): Maximum extra seconds, drawn uniformly, added to the latency. Defaults to 0.002.
+        total (int): The number of listings matched by every search. Defaults to 2000.
+        payload_scale (int): How many times the description of the results is repeated. Defaults to 1.
+        error_rate (float): The share of the requests answered with error_status. Defaults to 0.
+        error_status (int): The status of the failed requests, sent with "Retry-After: 0". Defaults to 503.
+        seed (int): The seed of the jitter and the errors. Defaults to 0.
+        fixtures (str, optional): The directory of the recorded responses. Defaults to synthetic ones.
+    """
+
+    latency: float = 0.005
+    jitter: float = 0.002
+    total: int = 2000
+    payload_scale: int = 1
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 0
+    fixtures: Optional[str] = None
+
+
+def _load_fixtures(profile: ApiProfile) -> tuple[dict, list[dict], dict]:
+    """The geo response, search results and listing response used as templates."""
+    if profile.fixtures is None:
+        results = [srp_result(i) for i in range(20)]
+        geo = None
+        listing = {"id": results[0]["id"], "listing": results[0]["listing"]}
+    else:
+
+        def load(name):
+            with open(os.path.join(profile.fixtures, name), encoding="utf-8") as f:
+                return json.load(f)
+
+        geo = load("geo.json")
+        results = load("search.json")["results"]
+        listing = load("listing.json")
+    for result in results:
+        localization = result.get("listing", {}).get("localization", {})
+        for texts in localization.values():
+            if isinstance(texts, dict) and "text" in texts:
+                text = texts["text"]
+                text["description"] = (
+                    text.get("description", "") * profile.payload_scale
+                )
+    return geo, results, listing
+
+
+class FakeApi:
+    """
+    The stand-in server, answering from threads with keep-alive connections.
+
+    Args:
+        profile (ApiProfile): The behaviour of the server.
+        port (int): The port to listen on. Defaults to any free port.
+    """
+
+    def __init__(self, profile: ApiProfile, port: int = 0):
+        self.profile = profile
+        self.requests = 0
+        self._random = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        geo, results, listing = _load_fixtures(profile)
+        self._geo = geo
+        self._listing = listing
+        # Every result is serialized once, with its position in the fixture.
+        self._results = [json.dumps(result).encode() for result in results]
+        self._ids = [str(result.get("id")) for result in results]
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _delay_and_status(self) -> tuple[float, int]:
+        with self._lock:
+            self.requests += 1
+            delay = self.profile.latency + self._random.uniform(0, self.profile.jitter)
+            failed = self._random.random() < self.profile.error_rate
+        return delay, self.profile.error_status if failed else 200
+
+    def geo_locations(self, name: str) -> bytes:
+        if self._geo is not None:
+            return json.dumps(self._geo).encode()
+        kind = "zipcode" if name.isdigit() else "city"
+        geo_id = f"geo-{kind}-{name.lower()}"
+        return json.dumps(
+            {
+                "total": 1,
+                "results": [
+                    {"geoLocation": {"id": geo_id, "center": {"lat": 47.3, "lon": 8.5}}}
+                ],
+            }
+        ).encode()
+
+    def search_listings(self, body: bytes) -> bytes:
+        query = json.loads(body)
+        start = query.get("from", 0)
+        end = min(start + query.get("size", 20), self.profile.total)
+        results = []
+        for i in range(start, end):
+            # Renumber the fixture results so that every listing id is distinct.
+            result = self._results[i % len(self._results)]
+            fixture_id = self._ids[i % len(self._ids)]
+            results.append(result.replace(fixture_id.encode(), str(i).encode()))
+        return b'{"from":%d,"size":%d,"total":%d,"results":[%s]}' % (
+            start,
+            query.get("size", 20),
+            self.profile.total,
+            b",".join(results),
+        )
+
+    def listing(self, listing_id: str) -> bytes:
+        listing = copy.deepcopy(self._listing)
+        listing["id"] = listing_id
+        return json.dumps(listing).encode()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send the headers and the body in one segment, without a delayed ACK stall.
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                url = urlsplit(self.path)
+                delay, status = api._delay_and_status()
+                time.sleep(delay)
+                data = b"{}"
+                if status == 200:
+                    if url.path == "/geo/locations":
+                        name = parse_qs(url.query).get("name", [""])[0]
+                        data = api.geo_locations(name)
+                    elif url.path == "/search/listings":
+                        data = api.search_listings(body)
+                    elif url.path.startswith("/listings/listing/"):
+                        data = api.listing(url.path.rsplit("/", 1)[1])
+                    else:
+                        status = 404
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status != 200:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever(poll_interval=0.05)
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    for name, default in asdict(ApiProfile()).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(default) if default is not None else str,
+            default=default,
+        )
+    args = vars(parser.parse_args())
+    port = args.pop("port")
+    api = FakeApi(ApiProfile(**args), port)
+    print(f"Serving on {api.url}")
+    api.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+De-duplication of geo location results: the original exact comparison of
+homegater.utils, the exact one the client now uses and the comparison within a
+tolerance. The grid index queries are compared against a linear scan.
+
+    python benchmarks/geo_dedupe.py [--results 100] [--batches 1000]
+"""
+
+import argparse
+import random
+import timeit
+
+from homegater.geo import GeoPoints, distance_m, unique_geo_results
+from homegater.utils import _unique_geo_set
+
+
+def exact_unique(geo_list: list[dict]) -> list[dict]:
+    """The original exact comparison of the centers of homegater.utils._unique_geo_set."""
+    seen = set()
+    unique_geo_list = []
+    for geo in geo_list:
+        keys = (
+            geo["geoLocation"]["center"]["lat"],
+            geo["geoLocation"]["center"]["lon"],
+        )
+        if keys not in seen:
+            unique_geo_list.append(geo)
+            seen.add(keys)
+    return unique_geo_list
+
+
+def geo_results(count: int, rng: random.Random) -> list[dict]:
+    """Geo results centered in Switzerland, a quarter of them sharing their center."""
+    results = []
+    for i in range(count):
+        if results and i % 4 == 0:
+            center = dict(rng.choice(results)["geoLocation"]["center"])
+        else:
+            center = {"lat": rng.uniform(45.8, 47.8), "lon": rng.uniform(5.9, 10.5)}
+        results.append({"geoLocation": {"id": f"geo-city-{i}", "center": center}})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--batches", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=50_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    batches = [geo_results(args.results, rng) for _ in range(args.batches)]
+    for name, unique in (
+        ("exact comparison", exact_unique),
+        ("_unique_geo_set", _unique_geo_set),
+        ("unique_geo_results", unique_geo_results),
+        ("unique_geo_results 0 m", lambda r: unique_geo_results(r, tolerance_m=0)),
+    ):
+        seconds = min(
+            timeit.repeat(lambda unique=unique: [unique(b) for b in batches], number=1)
+        )
+        print(f"{name:>24}: {seconds * 1000:8.1f} ms for {args.batches} batches")
+
+    points = GeoPoints.from_results(geo_results(args.points, rng))
+    index = points.index(cell_m=2_000)
+    queries = [(rng.uniform(45.8, 47.8), rng.uniform(5.9, 10.5)) for _ in range(200)]
+
+    def scan(lat, lon):
+        return min(
+            range(len(points)),
+            key=lambda i: distance_m(lat, lon, points.lat[i], points.lon[i]),
+        )
+
+    for name, nearest in (("linear scan", scan), ("GridIndex.nearest", index.nearest)):
+        seconds = min(
+            timeit.repeat(
+                lambda nearest=nearest: [nearest(*q) for q in queries],
+                number=1,
+                repeat=3,
+            )
+        )
+        print(f"{name:>24}: {seconds / len(queries) * 1e6:8.1f} us per nearest query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Import time of the package entry points, measured with `python -X importtime` in fresh
+interpreters, and the modules they load. The run fails when an entry point exceeds its
+budget or loads a module it must not, to guard the startup of the command line:
+
+    python benchmarks/import_time.py [--runs 5] [--scale 1.0]
+
+The budgets are in milliseconds of cumulative import time on top of the interpreter
+startup, the best of the runs. `--scale` adjusts them to a slower machine.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Entry point: (budget in ms, modules it must not load).
+BUDGETS = {
+    "homegater": (5, ("requests", "httpx", "asyncio")),
+    "homegater.cli": (25, ("requests", "httpx", "asyncio")),
+    "homegater.client": (
+        250,
+        ("httpx", "asyncio", "numpy", "orjson", "homegater.geo", "homegater.store"),
+    ),
+}
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """The cumulative import time in ms of the module, and the modules loaded."""
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    # The bytecode is written by the first run, so that the best run does not compile.
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    micros = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            micros = int(fields[1])
+    return micros / 1000, set(result.stdout.split())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<18} {'ms':>7} {'budget':>7}")
+    for module, (budget, forbidden) in BUDGETS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        best = min(ms for ms, _ in runs)
+        loaded = sorted(set(forbidden) & runs[0][1])
+        budget *= args.scale
+        print(f"{module:<18} {best:>7.1f} {budget:>7.0f} {' '.join(loaded)}")
+        if best > budget:
+            failures.append(f"{module} imports in {best:.1f} ms, over {budget:.0f} ms")
+        if loaded:
+            failures.append(f"{module} loads {', '.join(loaded)}")
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Decoding time of a search page with the json backends, with and without field projection.
+
+    python benchmarks/json_decoding.py [--listings 500] [--payload recorded.json]
+
+The payload defaults to a synthetic `srp-list` page, a recorded `/search/listings`
+response body can be passed instead.
+"""
+
+import argparse
+import json
+import timeit
+
+import requests
+from listing_models import srp_result
+
+from homegater.decoding import compile_fields, get_loads, orjson, project_fields
+
+FIELDS = compile_fields(
+    ["id", "listing.offerType", "listing.prices", "listing.characteristics"]
+)
+
+
+def recorded_response(content: bytes) -> requests.Response:
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    response.encoding = "utf-8"
+    return response
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=500)
+    parser.add_argument("--payload", help="A recorded /search/listings response.")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            content = f.read()
+    else:
+        results = [srp_result(i) for i in range(args.listings)]
+        content = json.dumps({"total": len(results), "results": results}).encode()
+    response = recorded_response(content)
+
+    def projected(loads):
+        data = loads(content)
+        data["results"] = [project_fields(r, FIELDS) for r in data["results"]]
+        return data
+
+    cases = {
+        "response.json()": response.json,
+        "json": lambda: get_loads("json")(content),
+    }
+    if orjson is not None:
+        cases["orjson"] = lambda: orjson.loads(content)
+        cases["orjson + fields"] = lambda: projected(orjson.loads)
+    cases["json + fields"] = lambda: projected(json.loads)
+
+    print(f"payload: {len(content) / 1024:.0f} kB")
+    for name, decode in cases.items():
+        seconds = min(timeit.repeat(decode, number=args.number, repeat=3))
+        print(f"{name:>16}: {seconds / args.number * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Memory and parse time of the typed listing models, built from the decoded response
+or from its raw bytes, against the raw response dicts.
+
+    python benchmarks/listing_models.py [--listings 20000]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from homegater.models import SearchPage
+
+
+def srp_result(i: int) -> dict:
+    """A search result shaped like the `srp-list` fieldset."""
+    return {
+        "id": str(4000000000 + i),
+        "listingType": {"type": "STANDARD"},
+        "remoteViewing": False,
+        "listerBranding": {"logoUrl": "https://media2.homegate.ch/logo.png"},
+        "listing": {
+            "id": str(4000000000 + i),
+            "offerType": "RENT",
+            "categories": ["APARTMENT", "FLAT"],
+            "prices": {"currency": "CHF", "rent": {"gross": 1500 + i % 3000}},
+            "characteristics": {
+                "numberOfRooms": 1.5 + i % 5,
+                "livingSpace": 40 + i % 120,
+                "floor": i % 6,
+                "hasBalcony": True,
+            },
+            "address": {
+                "street": f"Bahnhofstrasse {i % 200}",
+                "postalCode": str(8000 + i % 100),
+                "locality": "Zürich",
+                "region": "ZH",
+                "geoCoordinates": {
+                    "latitude": 47.3 + i % 100 / 1000,
+                    "longitude": 8.5 + i % 100 / 1000,
+                    "accuracy": "HIGH",
+                },
+            },
+            "localization": {
+                "primary": "de",
+                "de": {
+                    "text": {
+                        "title": f"Helle Wohnung {i}",
+                        "description": "Schöne Wohnung an zentraler Lage. " * 8,
+                    },
+                    "attachments": [
+                        {"type": "IMAGE", "url": f"https://media2.homegate.ch/{i}/{j}"}
+                        for j in range(5)
+                    ],
+                },
+            },
+            "lister": {"phone": "+41 44 000 00 00"},
+        },
+    }
+
+
+def measure(parse, payload: bytes) -> tuple[float, int]:
+    """The seconds taken by parse and the bytes it retains, measured separately."""
+    gc.collect()
+    start = time.perf_counter()
+    parse(payload)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = parse(payload)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = json.dumps(
+        {
+            "from": 0,
+            "size": args.listings,
+            "total": args.listings,
+            "results": [srp_result(i) for i in range(args.listings)],
+        }
+    ).encode()
+
+    for name, parse in (
+        ("raw dict", json.loads),
+        ("SearchPage", lambda p: SearchPage.from_response(json.loads(p))),
+        ("from_bytes", SearchPage.from_bytes),
+    ):
+        elapsed, retained = measure(parse, payload)
+        print(
+            f"{name:>10}: {elapsed * 1000:8.1f} ms "
+            f"{retained / args.listings:8.0f} bytes/listing retained"
+        )
+
+
+if __name__ == "__main__":
+    main()
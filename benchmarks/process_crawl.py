@@ -0,0 +1,75 @@
+"""
+Throughput of ProcessCrawler by number of worker processes, against the local
+stand-in API of fake_api.py serving large pages, so that the crawl is bound by the
+decoding of the responses until the rate budget is reached.
+
+    python benchmarks/process_crawl.py [--processes 1 2 4] [--locations 8] [--rate-limit 0]
+"""
+
+import argparse
+import multiprocessing
+
+from fake_api import ApiProfile, FakeApi
+
+from homegater.parallel import ProcessCrawler, crawl_plan
+
+
+def _serve(profile: ApiProfile, urls) -> None:
+    api = FakeApi(profile)
+    urls.put(api.url)
+    api.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--locations", type=int, default=8)
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--payload-scale", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0, help="Requests per second, 0 for none."
+    )
+    args = parser.parse_args()
+
+    profile = ApiProfile(
+        latency=args.latency,
+        jitter=0,
+        total=args.total,
+        payload_scale=args.payload_scale,
+    )
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    server = context.Process(target=_serve, args=(profile, urls), daemon=True)
+    server.start()
+    try:
+        url = urls.get(timeout=30)
+        searches = crawl_plan(
+            "RENT", [str(8000 + i) for i in range(args.locations)], ["APARTMENT"]
+        )
+        baseline = None
+        print(
+            f"{'processes':>9} {'pages':>6} {'results':>8} {'pages/s':>8} {'speedup':>7}"
+        )
+        for processes in args.processes:
+            crawler = ProcessCrawler(
+                processes,
+                rate_limit=args.rate_limit or None,
+                page_size=args.page_size,
+                base_url=url,
+            )
+            stats = crawler.crawl(searches, lambda results: None)
+            pages_per_second = stats.pages / stats.seconds
+            baseline = baseline or pages_per_second
+            print(
+                f"{processes:>9} {stats.pages:>6} {stats.results:>8} "
+                f"{pages_per_second:>8.1f} {pages_per_second / baseline:>6.2f}x"
+            )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
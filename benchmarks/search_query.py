@@ -0,0 +1,76 @@
+"""
+Construction and serialization of the search queries: the dict built on every call
+and serialized by the HTTP client, against a precompiled SearchQuery.
+
+    python benchmarks/search_query.py [--pages 10000]
+"""
+
+import argparse
+import json
+import timeit
+
+from homegater.query import FLAT_CATEGORY, HOUSE_CATEGORY, SearchQuery
+
+GEO_TAGS = ["geo-zipcode-8001"]
+KWARGS = {"monthly_rent": {"from": 1000, "to": 3000}, "number_of_rooms": {"from": 2}}
+
+
+def dict_query(from_index: int) -> bytes:
+    """The query as built by the client before SearchQuery, serialized like requests does."""
+    query = {
+        "query": {
+            "offerType": "RENT",
+            "categories": HOUSE_CATEGORY + FLAT_CATEGORY,
+            "location": {"geoTags": GEO_TAGS},
+        },
+        "sortBy": "dateCreated",
+        "sortDirection": "desc",
+        "from": from_index,
+        "size": 20,
+        "trackTotalHits": True,
+        "fieldset": "srp-list",
+    }
+    query["query"].update(
+        {
+            "".join(
+                word.title() if i > 0 else word for i, word in enumerate(key.split("_"))
+            ): value
+            for key, value in KWARGS.items()
+        }
+    )
+    return json.dumps(query).encode()
+
+
+def compiled_query(from_index: int) -> bytes:
+    query = SearchQuery("RENT", (*HOUSE_CATEGORY, *FLAT_CATEGORY), GEO_TAGS, **KWARGS)
+    return query.to_bytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=10000)
+    args = parser.parse_args()
+
+    query = SearchQuery("RENT", (*HOUSE_CATEGORY, *FLAT_CATEGORY), GEO_TAGS, **KWARGS)
+    expected = json.loads(dict_query(0))
+    expected["query"]["categories"].sort()
+    assert json.loads(query.to_bytes()) == expected
+
+    for name, build in (
+        ("dict + json.dumps", dict_query),
+        ("SearchQuery", compiled_query),
+        ("SearchQuery.page", lambda i: query.page(i).to_bytes()),
+        ("SearchQuery reused", lambda i: query.to_bytes()),
+    ):
+        seconds = min(
+            timeit.repeat(
+                lambda build=build: [build(i * 20) for i in range(args.pages)],
+                number=1,
+                repeat=5,
+            )
+        )
+        print(f"{name:>18}: {seconds / args.pages * 1e6:6.2f} us per query")
+
+
+if __name__ == "__main__":
+    main()
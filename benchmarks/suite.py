@@ -0,0 +1,261 @@
+"""
+Throughput benchmarks of the client against the local stand-in API of fake_api.py.
+
+The server runs in its own process and every scenario in a fresh one, so that the
+peak RSS is the one of the scenario. For every scenario the suite reports the
+requests per second, the p50 and p99 request latency seen by the client and the
+peak RSS. The results are saved as JSON with the commit they were measured on, to be
+compared with a later run:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --compare before.json
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+from fake_api import ApiProfile, FakeApi
+
+from homegater.client import FLAT_CATEGORY, Homegate
+from homegater.metrics import Instrumentation
+
+
+class LatencyRecorder(Instrumentation):
+    """The duration and status of every request, and the retries."""
+
+    def __init__(self):
+        self.durations = []
+        self.statuses = []
+        self.retries = 0
+
+    def request_end(self, endpoint, status, seconds, bytes_sent, bytes_received):
+        self.durations.append(seconds)
+        self.statuses.append(status)
+
+    def retry(self, endpoint, reason):
+        self.retries += 1
+
+
+def single_search(client: Homegate, options: dict) -> None:
+    """One search after the other, each resolving its zip code."""
+    for _ in range(options["searches"]):
+        client.search_rent_listings(location="8001")
+
+
+def paginated_crawl(client: Homegate, options: dict) -> None:
+    """All the pages of a search, prefetched."""
+    for _ in client.iter_listings(
+        offer_type="RENT",
+        categories=FLAT_CATEGORY,
+        location="geo-zipcode-8001",
+        page_size=options["page_size"],
+        prefetch=4,
+    ):
+        pass
+
+
+def fan_out(client: Homegate, options: dict) -> None:
+    """The searches of many locations sent concurrently."""
+    locations = [str(8000 + i) for i in range(options["locations"])]
+    with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+        list(
+            executor.map(
+                lambda loc: client.search_rent_listings(location=loc), locations
+            )
+        )
+
+
+def bulk_detail(client: Homegate, options: dict) -> None:
+    """The details of many listings."""
+    for _ in client.get_listings(
+        range(options["listings"]), max_workers=options["workers"]
+    ):
+        pass
+
+
+SCENARIOS = {
+    "single_search": single_search,
+    "paginated_crawl": paginated_crawl,
+    "fan_out": fan_out,
+    "bulk_detail": bulk_detail,
+}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """The nearest-rank percentile of the values."""
+    if not values:
+        return math.nan
+    values = sorted(values)
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_scenario(name: str, url: str, options: dict) -> dict:
+    recorder = LatencyRecorder()
+    with Homegate(
+        base_url=url,
+        pool_size=options["workers"] * 2,
+        retries=2,
+        backoff_factor=0,
+        instrumentation=recorder,
+    ) as client:
+        start = time.perf_counter()
+        SCENARIOS[name](client, options)
+        elapsed = time.perf_counter() - start
+    requests = len(recorder.durations)
+    return {
+        "requests": requests,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "p50_ms": _percentile(recorder.durations, 0.5) * 1000,
+        "p99_ms": _percentile(recorder.durations, 0.99) * 1000,
+        "retries": recorder.retries,
+        "errors": sum(1 for status in recorder.statuses if status != 200),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _serve(profile: ApiProfile, urls) -> None:
+    api = FakeApi(profile)
+    urls.put(api.url)
+    api.serve_forever()
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(
+    profile: ApiProfile, options: dict, scenarios: list[str], repeat: int
+) -> dict:
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    server = context.Process(target=_serve, args=(profile, urls), daemon=True)
+    server.start()
+    try:
+        url = urls.get(timeout=30)
+        results = {}
+        for name in scenarios:
+            runs = []
+            for _ in range(repeat):
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(run_scenario, (name, url, options)))
+            # The run of median throughput.
+            runs.sort(key=lambda run: run["requests_per_second"])
+            results[name] = runs[len(runs) // 2]
+    finally:
+        server.terminate()
+        server.join()
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "profile": asdict(profile),
+        "options": options,
+        "scenarios": results,
+    }
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    print(f"commit {report['commit']}, python {report['python']}")
+    header = f"{'scenario':>16} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'retries':>7} {'errors':>7} {'rss MB':>8}"
+    print(header)
+    for name, result in report["scenarios"].items():
+        line = (
+            f"{name:>16} {result['requests']:>9} {result['requests_per_second']:>9.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['retries']:>7} {result['errors']:>7} "
+            f"{result['peak_rss_mb']:>8.1f}"
+        )
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            line += (
+                f"   req/s {_change(result['requests_per_second'], before['requests_per_second'])}"
+                f", p99 {_change(result['p99_ms'], before['p99_ms'])}"
+                f" vs {baseline['commit']}"
+            )
+        print(line)
+
+
+def _change(value: float, before: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(value - before) / before:+.1%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Save the results as JSON.")
+    parser.add_argument("--compare", help="JSON results of a previous run.")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--listings", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=ApiProfile.latency)
+    parser.add_argument("--jitter", type=float, default=ApiProfile.jitter)
+    parser.add_argument("--total", type=int, default=ApiProfile.total)
+    parser.add_argument("--payload-scale", type=int, default=ApiProfile.payload_scale)
+    parser.add_argument("--error-rate", type=float, default=ApiProfile.error_rate)
+    parser.add_argument("--seed", type=int, default=ApiProfile.seed)
+    parser.add_argument(
+        "--fixtures",
+        help="Directory of recorded geo.json, search.json and listing.json.",
+    )
+    args = parser.parse_args()
+
+    profile = ApiProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        total=args.total,
+        payload_scale=args.payload_scale,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        fixtures=args.fixtures,
+    )
+    options = {
+        "searches": args.searches,
+        "page_size": args.page_size,
+        "locations": args.locations,
+        "listings": args.listings,
+        "workers": args.workers,
+    }
+    report = run_suite(profile, options, args.scenarios, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,31 @@
-from homegater.client import Homegate as Homegate
+"""
+The clients are imported on first access, so that importing the package, e.g. for the
+command line, does not load requests, httpx and asyncio until a client is used.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from homegater.async_client import AsyncHomegate as AsyncHomegate
+    from homegater.client import Homegate as Homegate
+
+__all__ = ["AsyncHomegate", "Homegate"]
+
+_LAZY = {
+    "AsyncHomegate": "homegater.async_client",
+    "Homegate": "homegater.client",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'homegater' has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
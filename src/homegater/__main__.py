@@ -0,0 +1,5 @@
+import sys
+
+from homegater.cli import main
+
+sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Append-only archive of the raw API responses, for reprocessing and replay.
+
+A `ResponseArchive` passed to `Homegate(archive=...)` records the body of every
+successful geo, search and listing response with the fingerprint of its request and
+its time. The responses are compressed one by one (gzip, or zstd with the `archive`
+extra) and appended to segment files, each with a fixed-size index of the offsets of
+its records. A gzip or zstd segment is also a valid stream of the responses.
+
+An `ArchiveReader` memory-maps the segments: the uncompressed records are read
+without copy, and the compressed ones are decompressed straight from the mapping.
+The records can be replayed through the decode path of a client, e.g. after a change
+of its `fields`:
+
+    with ArchiveReader("responses") as reader:
+        for record, data in reader.replay(Homegate(fields=["id", "listing.prices"])):
+            ...
+"""
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+from urllib.parse import urlsplit
+
+from homegater.ratelimit import ENDPOINTS
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+CODECS = ("none", "gzip", "zstd")
+# Offset and length in the segment, length of the response, time, request fingerprint,
+# codec and endpoint of a record.
+_ENTRY = struct.Struct("<QIId32sBB")
+
+
+def request_fingerprint(
+    method: str, url: str, body: Union[bytes, str, None] = None
+) -> bytes:
+    """
+    The sha256 digest of a request: its method, the path and query of its url, and its
+    body. It does not depend on the base url, so a recording replays on a stand-in API.
+    """
+    parts = urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    digest = hashlib.sha256(f"{method.upper()} {target}\n".encode())
+    if body:
+        digest.update(body.encode() if isinstance(body, str) else body)
+    return digest.digest()
+
+
+def _segment_path(directory: str, segment: int, suffix: str) -> str:
+    return os.path.join(directory, f"segment-{segment:05d}.{suffix}")
+
+
+def _segments(directory: str) -> list[int]:
+    return sorted(
+        int(name[len("segment-") : -len(".index")])
+        for name in os.listdir(directory)
+        if name.startswith("segment-") and name.endswith(".index")
+    )
+
+
+class ResponseArchive:
+    """
+    Writer of an archive of raw responses, shared by threads.
+
+    Args:
+        directory (str): The directory of the segments, created if missing. An existing archive is appended to.
+        compression (str): The codec of the records, "gzip", "zstd" or "none". Defaults to "gzip".
+        level (int, optional): The compression level. Defaults to 6 for gzip and 3 for zstd.
+        segment_size (int): The size in bytes above which a new segment is started. Defaults to 64 MiB.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        compression: str = "gzip",
+        level: int = None,
+        segment_size: int = 64 * 1024 * 1024,
+    ):
+        if compression not in CODECS:
+            raise ValueError(
+                f"Invalid compression {compression}. Only {CODECS} are accepted."
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "The zstd compression requires zstandard. Install it with: pip install homegater[archive]"
+            )
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compression = compression
+        self.segment_size = segment_size
+        self._codec = CODECS.index(compression)
+        self._compress = self._compressor(compression, level)
+        self._lock = threading.Lock()
+        segments = _segments(directory)
+        self._segment = segments[-1] if segments else 0
+        self._open()
+
+    @staticmethod
+    def _compressor(compression: str, level: Optional[int]) -> Callable[[bytes], bytes]:
+        if compression == "gzip":
+            level = 6 if level is None else level
+            return lambda data: gzip.compress(data, level, mtime=0)
+        if compression == "zstd":
+            return zstandard.ZstdCompressor(
+                level=3 if level is None else level
+            ).compress
+        return bytes
+
+    def _open(self) -> None:
+        self._data = open(_segment_path(self.directory, self._segment, "data"), "ab")
+        self._index = open(_segment_path(self.directory, self._segment, "index"), "ab")
+        self._offset = self._data.tell()
+
+    def append(
+        self,
+        endpoint: str,
+        fingerprint: bytes,
+        content: bytes,
+        timestamp: float = None,
+    ) -> None:
+        """Record the body of a response of the endpoint to the request of the fingerprint."""
+        stored = self._compress(content)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._offset and self._offset + len(stored) > self.segment_size:
+                self._close()
+                self._segment += 1
+                self._open()
+            self._data.write(stored)
+            self._index.write(
+                _ENTRY.pack(
+                    self._offset,
+                    len(stored),
+                    len(content),
+                    timestamp,
+                    fingerprint,
+                    self._codec,
+                    ENDPOINTS.index(endpoint),
+                )
+            )
+            self._offset += len(stored)
+
+    def record(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        body: Union[bytes, str, None],
+        content: bytes,
+    ) -> None:
+        """Record the body of a response of the endpoint to the request."""
+        self.append(endpoint, request_fingerprint(method, url, body), content)
+
+    def flush(self) -> None:
+        """Write the buffered records, so that the readers opened afterwards see them."""
+        with self._lock:
+            self._data.flush()
+            self._index.flush()
+
+    def _close(self) -> None:
+        # The data first, an index entry is only valid once its record is written.
+        self._data.close()
+        self._index.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def __enter__(self) -> "ResponseArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass(slots=True)
+class ArchivedResponse:
+    """A recorded response, whose body is read from the memory-mapped segment."""
+
+    endpoint: str
+    fingerprint: bytes
+    timestamp: float
+    size: int
+    codec: str
+    stored: memoryview
+
+    @property
+    def content(self) -> Union[bytes, memoryview]:
+        """The body of the response: a view of the mapping when it is not compressed."""
+        if self.codec == "gzip":
+            return zlib.decompress(self.stored, wbits=31)
+        if self.codec == "zstd":
+            if zstandard is None:
+                raise ImportError(
+                    "The zstd records require zstandard. Install it with: pip install homegater[archive]"
+                )
+            return zstandard.ZstdDecompressor().decompress(self.stored)
+        return self.stored
+
+
+class ArchiveReader:
+    """
+    Memory-mapped reader of the records of an archive, in the order they were appended.
+    The segments are unmapped on close, or once their records kept after it are released.
+
+    Args:
+        directory (str): The directory of the archive.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._maps = []
+        self._entries = []
+        for segment in _segments(directory):
+            with open(_segment_path(directory, segment, "index"), "rb") as f:
+                index = f.read()
+            with open(_segment_path(directory, segment, "data"), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if not size:
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(data)
+            self._maps.append((data, view))
+            # A partly written entry, or one whose record is not written, is skipped.
+            usable = len(index) - len(index) % _ENTRY.size
+            for entry in _ENTRY.iter_unpack(index[:usable]):
+                if entry[0] + entry[1] <= size:
+                    self._entries.append((view, entry))
+        self._latest = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _record(self, view: memoryview, entry: tuple) -> ArchivedResponse:
+        offset, stored, size, timestamp, fingerprint, codec, endpoint = entry
+        return ArchivedResponse(
+            ENDPOINTS[endpoint],
+            fingerprint,
+            timestamp,
+            size,
+            CODECS[codec],
+            view[offset : offset + stored],
+        )
+
+    def __iter__(self) -> Iterator[ArchivedResponse]:
+        for view, entry in self._entries:
+            yield self._record(view, entry)
+
+    def get(self, fingerprint: bytes) -> Optional[ArchivedResponse]:
+        """The latest response recorded for the request fingerprint, if any."""
+        if self._latest is None:
+            self._latest = {entry[4]: i for i, (_, entry) in enumerate(self._entries)}
+        i = self._latest.get(fingerprint)
+        return None if i is None else self._record(*self._entries[i])
+
+    def replay(
+        self, client: Any, endpoints: tuple[str, ...] = ENDPOINTS
+    ) -> Iterator[tuple[ArchivedResponse, Any]]:
+        """
+        Decode the recorded responses of the endpoints as the client decodes the API
+        responses, with its json backend and fields. The uncompressed records are
+        decoded without copy by orjson.
+        """
+        decoders = {
+            "geo": lambda content: client._loads("geo", content),
+            "search": client._decode_search,
+            "listing": client._decode_listing,
+        }
+        # The stdlib json decodes bytes and str only.
+        copy = client.json_loads is json.loads
+        for record in self:
+            if record.endpoint in endpoints:
+                content = record.content
+                if copy and isinstance(content, memoryview):
+                    content = bytes(content)
+                yield record, decoders[record.endpoint](content)
+
+    def close(self) -> None:
+        for data, view in self._maps:
+            view.release()
+            try:
+                data.close()
+            except BufferError:
+                # A record still referenced keeps its segment mapped until released.
+                pass
+        self._maps = []
+        self._entries = []
+        self._latest = None
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
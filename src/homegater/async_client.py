@@ -0,0 +1,686 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Generator, Iterable
+from typing import TYPE_CHECKING, Any, TypeVar, Union
+
+from homegater.client import (
+    DEFAULT_HEADERS,
+    RETRY_STATUS_CODES,
+    BaseHomegate,
+    _next_page_indexes,
+    _page_results,
+)
+from homegater.query import DEFAULT_CATEGORIES, JSON_HEADERS, SearchQuery
+from homegater.ratelimit import RateLimiter, parse_retry_after
+from homegater.singleflight import AsyncSingleFlight
+
+if TYPE_CHECKING:
+    from homegater.archive import ResponseArchive
+    from homegater.cache import Cache, SearchCache
+    from homegater.changes import ChangeStore, ListingChange
+    from homegater.geo_index import GeoIndex
+    from homegater.incremental import CursorStore
+    from homegater.metrics import Instrumentation
+    from homegater.planner import SearchPlan
+    from homegater.store import ListingStore
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class AsyncHomegate(BaseHomegate):
+    def __init__(
+        self,
+        location_search_lang: str = "en",
+        max_search_geo: int = 1,
+        *,
+        base_url: str = None,
+        pool_size: int = 10,
+        timeout: Union[float, tuple[float, float]] = 30.0,
+        retries: int = 0,
+        backoff_factor: float = 0.5,
+        geo_cache: "Cache" = None,
+        geo_index: "GeoIndex" = None,
+        geo_tolerance_m: float = 0,
+        rate_limit: Union[float, dict[str, float], RateLimiter] = None,
+        json_backend: str = "auto",
+        fields: list[str] = None,
+        search_cache: "SearchCache" = None,
+        instrumentation: "Instrumentation" = None,
+        listing_store: "ListingStore" = None,
+        archive: "ResponseArchive" = None,
+        coalesce: bool = True,
+        max_concurrency: int = 10,
+        transport: "httpx.AsyncBaseTransport" = None,
+    ):
+        """
+        Initialize the asyncio Homegate client. It requires the optional httpx dependency (pip install homegater[async]).
+        The arguments are the same as for the Homegate client, plus:
+        max_concurrency (int): The maximum number of geo lookups run concurrently for a search. Defaults to 10.
+        transport (httpx.AsyncBaseTransport, optional): Custom httpx transport, e.g. for tests.
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncHomegate requires httpx. Install it with: pip install homegater[async]"
+            )
+        super().__init__(
+            location_search_lang,
+            max_search_geo,
+            base_url=base_url,
+            timeout=timeout,
+            geo_cache=geo_cache,
+            geo_index=geo_index,
+            geo_tolerance_m=geo_tolerance_m,
+            rate_limit=rate_limit,
+            json_backend=json_backend,
+            fields=fields,
+            search_cache=search_cache,
+            instrumentation=instrumentation,
+            listing_store=listing_store,
+            archive=archive,
+        )
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+        self._refresh_tasks = set()
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            httpx_timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        else:
+            httpx_timeout = httpx.Timeout(timeout)
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx_timeout,
+            headers=DEFAULT_HEADERS,
+            transport=transport,
+        )
+
+    async def _request(
+        self, method: str, url: str, endpoint: str = None, **kwargs
+    ) -> "httpx.Response":
+        """
+        Send a request through the pooled client, retrying connection errors and 429/5xx
+        responses with exponential backoff honouring Retry-After. Throttled requests are
+        retried once the rate limiter of the endpoint allows.
+        """
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(endpoint)
+            try:
+                response = await self._send(method, url, endpoint, **kwargs)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise
+                self._report_retry(endpoint, type(e).__name__)
+                await asyncio.sleep(self.backoff_factor * 2**attempt)
+                continue
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if self.rate_limiter is not None and self.rate_limiter.report(
+                endpoint, response.status_code, retry_after
+            ):
+                if last_attempt:
+                    return response
+                self._report_retry(endpoint, "throttled")
+                continue
+            if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                return self._archived(
+                    endpoint, method, url, kwargs.get("content"), response
+                )
+            self._report_retry(endpoint, str(response.status_code))
+            if retry_after is None:
+                retry_after = self.backoff_factor * 2**attempt
+            await asyncio.sleep(retry_after)
+
+    async def _geo_request(self, url: str) -> "httpx.Response":
+        async with self._semaphore:
+            return await self._request("GET", url, "geo")
+
+    async def _drive_pages(self, pages: Generator[SearchQuery, dict[str, Any], T]) -> T:
+        """Search the pages yielded by a scan. See Homegate._drive_pages."""
+        try:
+            query = next(pages)
+            while True:
+                query = pages.send(await self._search(query, bypass_cache=True))
+        except StopIteration as stop:
+            return stop.value
+
+    async def _coalesce(
+        self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Await fn, or the call in flight with the same key when coalescing. See Homegate._coalesce."""
+        if self.single_flight is None:
+            return await fn(*args, **kwargs)
+        return await self.single_flight.do(key, fn, *args, **kwargs)
+
+    async def _send(
+        self, method: str, url: str, endpoint: str = None, **kwargs
+    ) -> "httpx.Response":
+        """
+        Send a single request through the pooled client, calling the instrumentation hooks.
+        """
+        hooks = self.instrumentation
+        if hooks is None:
+            return await self.session.request(method, url, **kwargs)
+        request = self.session.build_request(method, url, **kwargs)
+        hooks.request_start(endpoint, method, url)
+        start = time.perf_counter()
+        try:
+            response = await self.session.send(request, stream=True)
+            hooks.first_byte(endpoint, time.perf_counter() - start)
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.TransportError:
+            hooks.request_end(endpoint, None, time.perf_counter() - start, 0, 0)
+            raise
+        hooks.request_end(
+            endpoint,
+            response.status_code,
+            time.perf_counter() - start,
+            len(request.content),
+            response.num_bytes_downloaded,
+        )
+        return response
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled connections of the client.
+        """
+        await self.session.aclose()
+
+    async def __aenter__(self) -> "AsyncHomegate":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def get_geo_tags(
+        self, location_name: str, results_count: int = 100, unique: bool = True
+    ) -> list[str]:
+        """
+        Retrieve geo tags based on the location name. See Homegate.get_geo_tags.
+        """
+        geo_tags = self._local_geo_tags(location_name, results_count, unique)
+        if geo_tags is not None:
+            return geo_tags
+
+        geo_tags_url = self._geo_tags_url(location_name, results_count)
+        try:
+            response = await self._coalesce(
+                self._request_key("GET", geo_tags_url), self._geo_request, geo_tags_url
+            )
+            response.raise_for_status()
+            response_data = self._loads("geo", response.content)
+        except (httpx.HTTPError, ValueError) as e:
+            self._report_error("geo", e)
+            raise Exception(f"Error fetching geo tags: {e}") from e
+        return self._geo_tags_from_response(
+            location_name, results_count, unique, response_data
+        )
+
+    async def _resolve_search_geo_tags(
+        self, location: Union[str, list[str], None]
+    ) -> list[str]:
+        """
+        Resolve all the locations of a search concurrently, keeping their order.
+        """
+        locations = self._search_locations(location)
+        retrieved = await asyncio.gather(
+            *(self.get_geo_tags(loc, unique=True) for loc in locations)
+        )
+        for loc, geo_tags in zip(locations, retrieved, strict=True):
+            self._check_search_geo_tags(loc, geo_tags)
+        return list(itertools.chain.from_iterable(retrieved))
+
+    async def search_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        location: Union[str, list[str], dict[str, list[str]]] = None,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        from_index: int = 0,
+        size: int = 20,
+        bypass_cache: bool = False,
+        source: str = "api",
+        **kwargs,
+    ) -> dict[str, Any]:
+        """
+        Search for listings based on various parameters. See Homegate.search_listings.
+        """
+        if source == "local":
+            geo_tags = self._resolve_local_geo_tags(location)
+        else:
+            geo_tags = await self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by,
+            sort_direction,
+            from_index,
+            size,
+            kwargs,
+        )
+        if source == "local":
+            return self._search_local(query)
+        return await self._search(query, bypass_cache)
+
+    async def search(
+        self, query: SearchQuery, *, bypass_cache: bool = False
+    ) -> dict[str, Any]:
+        """
+        Send a precompiled search query. See Homegate.search.
+        """
+        return await self._search(query, bypass_cache)
+
+    async def _search(
+        self, query: Union[dict[str, Any], SearchQuery], bypass_cache: bool = False
+    ) -> dict[str, Any]:
+        """
+        Send the search query, through the search cache if any. A stale cached response
+        is returned while it is refreshed in a background task.
+        """
+        if self.search_cache is None:
+            return await self._fetch_search(query)
+        if not bypass_cache:
+            cached, stale = self.search_cache.get(query)
+            self._report_cache("search_cache", cached is not None)
+            if cached is not None:
+                if stale and self.search_cache.start_refresh(query):
+                    task = asyncio.ensure_future(self._refresh_search(query))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return cached
+        return await self._refresh_search(query)
+
+    async def _refresh_search(
+        self, query: Union[dict[str, Any], SearchQuery]
+    ) -> dict[str, Any]:
+        try:
+            start = time.perf_counter()
+            response = await self._fetch_search(query)
+            if response:
+                self.search_cache.set(query, response, time.perf_counter() - start)
+            return response
+        finally:
+            self.search_cache.end_refresh(query)
+
+    async def _fetch_search(
+        self, query: Union[dict[str, Any], SearchQuery]
+    ) -> dict[str, Any]:
+        try:
+            url = f"{self.BASE_URL}/search/listings"
+            response = await self._coalesce(
+                self._request_key("POST", url, query),
+                self._request,
+                "POST",
+                url,
+                "search",
+                content=self._search_content(query),
+                headers=JSON_HEADERS,
+            )
+            response.raise_for_status()
+            return self._stored_search(query, self._decode_search(response.content))
+        except (httpx.HTTPError, ValueError) as e:
+            self._report_error("search", e)
+            logger.error("Error searching listings: %s", e)
+            return {}
+
+    async def iter_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        location: Union[str, list[str]] = None,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        page_size: int = 20,
+        prefetch: int = 2,
+        max_results: int = None,
+        **kwargs,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Iterate over all the listings of a search, prefetching the next pages. See Homegate.iter_listings.
+        """
+        geo_tags = await self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by,
+            sort_direction,
+            0,
+            page_size,
+            kwargs,
+        )
+        first_page = await self._search(query)
+        for listing in _page_results(first_page, 0, max_results):
+            yield listing
+
+        from_indexes = iter(_next_page_indexes(first_page, page_size, max_results))
+        pending = deque()
+
+        def fill():
+            for from_index in itertools.islice(
+                from_indexes, max(prefetch, 1) - len(pending)
+            ):
+                task = asyncio.ensure_future(self._search(query.page(from_index)))
+                pending.append((from_index, task))
+
+        try:
+            fill()
+            while pending:
+                from_index, task = pending.popleft()
+                page = await task
+                fill()
+                results = _page_results(page, from_index, max_results)
+                if not results:
+                    return
+                for listing in results:
+                    yield listing
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def plan_search_many(
+        self, queries: list[dict[str, Any]], max_merged_size: int = 100
+    ) -> "SearchPlan":
+        """
+        Plan the requests of search_many. See Homegate.plan_search_many.
+        """
+        locations = self._many_locations(queries)
+        geo_tags = await asyncio.gather(
+            *(self.get_geo_tags(loc, unique=True) for loc in locations)
+        )
+        return self._search_plan(
+            queries, dict(zip(locations, geo_tags, strict=True)), max_merged_size
+        )
+
+    async def search_many(
+        self,
+        queries: list[dict[str, Any]],
+        max_merged_size: int = 100,
+        max_workers: int = 8,
+        plan: "SearchPlan" = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Run many searches differing in their location with as few requests as possible.
+        See Homegate.search_many.
+        """
+        if plan is None:
+            plan = await self.plan_search_many(queries, max_merged_size)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def search(query):
+            async with semaphore:
+                return await self._search(query)
+
+        async def run(planned):
+            dispatched, members = planned.dispatch(await search(planned.query))
+            plan.fallback_requests += len(members)
+            fallbacks = await asyncio.gather(*(search(query) for _, query in members))
+            return dispatched + [
+                (index, response)
+                for (index, _), response in zip(members, fallbacks, strict=True)
+            ]
+
+        responses = [None] * len(queries)
+        for dispatched in await asyncio.gather(*(run(s) for s in plan.searches)):
+            for index, response in dispatched:
+                responses[index] = response
+        return responses
+
+    async def crawl_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        location: Union[str, list[str]] = None,
+        split_on: str = None,
+        page_size: int = 20,
+        max_pages: int = 5,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Iterate over all the listings of a large search without deep pages. See Homegate.crawl_listings.
+        """
+        from homegater.crawler import split_field
+
+        geo_tags = await self._resolve_search_geo_tags(location)
+        query = self._build_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        field = split_field(query, split_on)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def crawl(partition):
+            async with semaphore:
+                return await self._crawl_partition(partition, field, max_pages)
+
+        seen = set()
+        pending = {asyncio.ensure_future(crawl(query))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    results, partitions = task.result()
+                    pending.update(asyncio.ensure_future(crawl(p)) for p in partitions)
+                    for result in results:
+                        if result.get("id") not in seen:
+                            seen.add(result.get("id"))
+                            yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _crawl_partition(
+        self, query: dict[str, Any], field: str, max_pages: int
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        from homegater.crawler import CRAWL_ERROR, split_query
+
+        page_size = query["size"]
+        first_page = await self._search(query)
+        if not first_page:
+            raise Exception(CRAWL_ERROR)
+        results = list(first_page.get("results", []))
+        total = first_page.get("total", 0)
+        if total > page_size * max_pages:
+            partitions = split_query(query, field)
+            if partitions:
+                return results, partitions
+        for from_index in range(page_size, total, page_size):
+            page = await self._search({**query, "from": from_index})
+            if not page:
+                raise Exception(CRAWL_ERROR)
+            results.extend(page.get("results", []))
+        return results, []
+
+    async def sync_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        store: "CursorStore",
+        location: Union[str, list[str]] = None,
+        page_size: int = 20,
+        **kwargs,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the listings created since the previous sync of the same search. See Homegate.sync_listings.
+        """
+        geo_tags = await self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        return await self._drive_pages(self._sync_pages(query, store))
+
+    async def track_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        store: "ChangeStore",
+        location: Union[str, list[str]] = None,
+        page_size: int = 20,
+        details: bool = True,
+        max_workers: int = 8,
+        **kwargs,
+    ) -> list["ListingChange"]:
+        """
+        Return the changes of the listings of a search since its previous tracking. See Homegate.track_listings.
+        """
+        geo_tags = await self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        key, scan, complete = await self._drive_pages(self._track_pages(query, store))
+        fetched = {}
+        if details:
+            async for listing_id, listing in self.get_listings(
+                scan.changed, max_workers
+            ):
+                if not isinstance(listing, Exception):
+                    fetched[listing_id] = listing
+        changes = scan.finish(fetched, complete)
+        store.save(key, scan)
+        return changes
+
+    async def search_buy_listings(
+        self,
+        *,
+        location: Union[str, list[str]],
+        categories: list[str] = None,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        from_index: int = 0,
+        size: int = 20,
+        bypass_cache: bool = False,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """
+        Search for buy listings based on various parameters. See Homegate.search_buy_listings.
+        """
+        if categories is None:
+            categories = DEFAULT_CATEGORIES
+        return await self.search_listings(
+            offer_type="BUY",
+            categories=categories,
+            location=location,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            from_index=from_index,
+            size=size,
+            bypass_cache=bypass_cache,
+            **kwargs,
+        )
+
+    async def search_rent_listings(
+        self,
+        *,
+        location: Union[str, list[str]] = None,
+        categories: list[str] = None,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        from_index: int = 0,
+        size: int = 20,
+        bypass_cache: bool = False,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """
+        Search for rent listings based on various parameters. See Homegate.search_rent_listings.
+        """
+        if categories is None:
+            categories = DEFAULT_CATEGORIES
+        return await self.search_listings(
+            offer_type="RENT",
+            categories=categories,
+            location=location,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            from_index=from_index,
+            size=size,
+            bypass_cache=bypass_cache,
+            **kwargs,
+        )
+
+    async def get_listing(self, listing_id):
+        url = self._listing_url(listing_id)
+        response = await self._coalesce(
+            self._request_key("GET", url), self._request, "GET", url, "listing"
+        )
+        response.raise_for_status()
+        return self._stored_listing(self._decode_listing(response.content))
+
+    async def get_listings(
+        self,
+        listing_ids: Iterable,
+        max_workers: int = 8,
+        chunk_size: int = None,
+    ) -> AsyncIterator[tuple[Any, Union[dict[str, Any], Exception]]]:
+        """
+        Fetch the details of many listings concurrently. See Homegate.get_listings.
+        """
+        ids = iter(dict.fromkeys(listing_ids))
+        chunk_size = max(chunk_size or 4 * max_workers, max_workers)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(listing_id):
+            async with semaphore:
+                return await self.get_listing(listing_id)
+
+        pending = {}
+        try:
+            while True:
+                for listing_id in itertools.islice(ids, chunk_size - len(pending)):
+                    pending[asyncio.ensure_future(fetch(listing_id))] = listing_id
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    listing_id = pending.pop(task)
+                    yield listing_id, task.exception() or task.result()
+        finally:
+            for task in pending:
+                task.cancel()
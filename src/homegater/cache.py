@@ -0,0 +1,288 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Protocol, Union
+
+from homegater.query import SearchQuery
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Cache(Protocol):
+    """Interface of the pluggable caches used by the client."""
+
+    stats: CacheStats
+
+    def get(self, key: str, default: Any = None) -> Any: ...
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LRUCache:
+    """
+    Bounded in-memory cache evicting the least recently used entries.
+
+    Args:
+        maxsize (int): The maximum number of entries kept. Defaults to 1024.
+        ttl (float, optional): Time to live of an entry in seconds. Defaults to no expiry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize should be a positive integer.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: OrderedDict[str, tuple[Optional[float], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._data[key]
+            self.stats.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Cache persisted in a SQLite database so that entries survive restarts.
+    Values should be json serializable.
+
+    Args:
+        path (str): The path of the database file.
+        ttl (float, optional): Time to live of an entry in seconds. Defaults to no expiry.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > time.time()):
+                self.stats.hits += 1
+                return json.loads(row[0])
+            self.stats.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def purge_expired(self) -> None:
+        """Delete the expired entries from the database."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TieredCache:
+    """
+    Two level cache, typically a fast LRUCache in front of a persistent SQLiteCache.
+    Hits on the second level are promoted to the first one.
+    """
+
+    def __init__(self, first: Cache, second: Cache):
+        self.first = first
+        self.second = second
+        self.stats = CacheStats()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.first.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.second.get(key, _MISSING)
+            if value is not _MISSING:
+                self.first.set(key, value)
+        if value is _MISSING:
+            self.stats.misses += 1
+            return default
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.first.set(key, value, ttl)
+        self.second.set(key, value, ttl)
+
+    def clear(self) -> None:
+        self.first.clear()
+        self.second.clear()
+
+
+CANONICAL_LISTS = ("categories", "excludeCategories", "geoTags")
+
+
+def _canonical(value: Any) -> Any:
+    """Sort the order insensitive lists of a search query, at any depth."""
+    if isinstance(value, dict):
+        return {
+            key: sorted(item) if key in CANONICAL_LISTS else _canonical(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def query_fingerprint(query: Union[dict[str, Any], SearchQuery]) -> str:
+    """
+    Stable hash of a search query, the same for queries differing only in the order
+    of their keys, categories or geo tags, and for a SearchQuery and its dict.
+    """
+    if isinstance(query, SearchQuery):
+        query = query.to_dict()
+    canonical = json.dumps(
+        _canonical(query), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class SearchCacheStats(CacheStats):
+    """Counters of a search cache, with the stale hits and the request time saved."""
+
+    stale_hits: int = 0
+    saved_seconds: float = 0.0
+
+
+class SearchCache:
+    """
+    Cache of the search responses keyed by the fingerprint of the final query.
+    The cached responses are shared and should not be mutated.
+
+    Args:
+        cache (Cache, optional): The storage of the responses, e.g. SQLiteCache to persist them. Defaults to LRUCache(256).
+        ttl (float | dict): Seconds a response stays fresh, or a dict of seconds by offer type, e.g. {"BUY": 3600, "RENT": 300}.
+            Defaults to 300.
+        stale_ttl (float): Seconds an expired response is still served while it is refreshed in the background. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        cache: Cache = None,
+        ttl: Union[float, dict[str, float]] = 300,
+        stale_ttl: float = 0,
+    ):
+        self.cache = cache if cache is not None else LRUCache(256)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = SearchCacheStats()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _ttl(self, query: Union[dict[str, Any], SearchQuery]) -> float:
+        if isinstance(self.ttl, dict):
+            if isinstance(query, SearchQuery):
+                return self.ttl.get(query.offer_type, 0)
+            return self.ttl.get(query["query"].get("offerType"), 0)
+        return self.ttl
+
+    def get(self, query: dict[str, Any]) -> tuple[Optional[dict[str, Any]], bool]:
+        """
+        The cached response of the query, or None, and whether it is stale.
+        """
+        entry = self.cache.get(query_fingerprint(query))
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None, False
+            stale = time.time() - entry["fetched_at"] > self._ttl(query)
+            self.stats.hits += 1
+            self.stats.stale_hits += stale
+            self.stats.saved_seconds += entry["elapsed"]
+        return entry["response"], stale
+
+    def set(
+        self, query: dict[str, Any], response: dict[str, Any], elapsed: float
+    ) -> None:
+        """Store the response of the query, fetched in `elapsed` seconds."""
+        ttl = self._ttl(query)
+        if ttl <= 0:
+            return
+        entry = {"response": response, "fetched_at": time.time(), "elapsed": elapsed}
+        self.cache.set(query_fingerprint(query), entry, ttl + self.stale_ttl)
+
+    def start_refresh(self, query: dict[str, Any]) -> bool:
+        """
+        Mark the query as being refreshed.
+        Returns False if it is already refreshed by another caller.
+        """
+        key = query_fingerprint(query)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, query: dict[str, Any]) -> None:
+        with self._lock:
+            self._refreshing.discard(query_fingerprint(query))
+
+    def clear(self) -> None:
+        self.cache.clear()
@@ -0,0 +1,251 @@
+"""
+Change tracking of the listings of a search, fetching the details of the changed ones only.
+
+Every listing of a search is tracked with a compact state: an 8 byte hash of its
+relevant fields in the search results (prices, characteristics, categories, address
+and status by default), its price and its status. A scan compares each page of the
+search with the tracked fingerprints in one pass, so that `get_listing` is only
+called for the listings whose fingerprint changed, and reports the changes:
+
+    store = ChangeStore("changes.sqlite")
+    for change in api.track_listings(offer_type="RENT", categories=FLAT_CATEGORY, location="8001", store=store):
+        if change.kind == "price" and change.new < change.old:
+            print(change.listing_id, change.old, change.new)
+
+The states are persisted per search in a SQLite database. A listing of the previous
+scan missing from a complete scan is reported as removed.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from homegater.decoding import compile_fields, project_fields
+from homegater.models import listing_row
+
+CHANGE_KINDS = ("new", "price", "status", "updated", "removed")
+# The fields of the search results hashed into the fingerprint of a listing.
+DEFAULT_FIELDS = (
+    "listing.prices",
+    "listing.characteristics",
+    "listing.categories",
+    "listing.address",
+)
+DEFAULT_STATUS_FIELD = "listing.status"
+# Below the SQLite limit of the number of parameters of a statement.
+_CHUNK = 500
+
+
+def listing_fingerprint(
+    result: dict[str, Any], fields: tuple[tuple[str, ...], ...]
+) -> bytes:
+    """The 8 byte blake2b digest of the compiled fields of a search result, in canonical json."""
+    data = json.dumps(
+        project_fields(result, fields),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(data.encode(), digest_size=8).digest()
+
+
+def _status(data: Any, path: tuple[str, ...]) -> Optional[str]:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return None if data is None else str(data)
+
+
+@dataclass(slots=True)
+class ListingState:
+    """The fingerprint, price and status of a tracked listing."""
+
+    fingerprint: bytes
+    price: Optional[float] = None
+    status: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ListingChange:
+    """
+    A change of a tracked listing: "new", "price", "status", "updated" for the other
+    changes of its fingerprint, or "removed". The price and status changes hold their
+    old and new values, and every change but a removal holds the listing, its details
+    when they were fetched.
+    """
+
+    kind: str
+    listing_id: str
+    old: Any = None
+    new: Any = None
+    listing: Optional[dict[str, Any]] = field(default=None, repr=False)
+
+
+class ChangeScan:
+    """
+    Compare the pages of a search with the states of its listings.
+
+    Args:
+        states (dict, optional): The states of the listings of the previous scan, by id. Defaults to none.
+        fields (Iterable[str]): Dotted paths of the fields hashed into the fingerprints. Defaults to DEFAULT_FIELDS.
+        status_field (str): Dotted path of the status of a listing. Defaults to "listing.status".
+    """
+
+    def __init__(
+        self,
+        states: Optional[dict[str, ListingState]] = None,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        status_field: str = DEFAULT_STATUS_FIELD,
+    ):
+        self.states = states or {}
+        self.fields = compile_fields((*fields, status_field))
+        self.status_path = tuple(status_field.split("."))
+        self.seen = set()
+        # The search results whose fingerprint changed, and their new fingerprint.
+        self.changed: dict[str, dict[str, Any]] = {}
+        self._fingerprints: dict[str, bytes] = {}
+        self.updates: dict[str, ListingState] = {}
+        self.removed: list[str] = []
+
+    def feed(self, results: list[dict[str, Any]]) -> None:
+        """Compare the results of a page with their tracked fingerprints."""
+        for result in results:
+            listing_id = str(result.get("id"))
+            # Results shift between pages when listings are added during the scan.
+            if listing_id in self.seen:
+                continue
+            self.seen.add(listing_id)
+            fingerprint = listing_fingerprint(result, self.fields)
+            state = self.states.get(listing_id)
+            if state is None or state.fingerprint != fingerprint:
+                self.changed[listing_id] = result
+                self._fingerprints[listing_id] = fingerprint
+
+    def finish(
+        self,
+        details: Optional[dict[str, dict[str, Any]]] = None,
+        complete: bool = True,
+    ) -> list[ListingChange]:
+        """
+        The changes of the scan, read from the details of the changed listings when
+        given or else from their search results. The listings not seen by a complete
+        scan, i.e. one that reached the total of the search, are removed. The states to
+        store are then held by `updates` and the ids to forget by `removed`.
+        """
+        details = details or {}
+        changes = []
+        for listing_id, result in self.changed.items():
+            listing = details.get(listing_id, result)
+            state = ListingState(
+                self._fingerprints[listing_id],
+                listing_row(listing)[3],
+                _status(listing, self.status_path),
+            )
+            self.updates[listing_id] = state
+            old = self.states.get(listing_id)
+            if old is None:
+                changes.append(ListingChange("new", listing_id, listing=listing))
+                continue
+            kinds = [
+                ListingChange(kind, listing_id, before, after, listing)
+                for kind, before, after in (
+                    ("price", old.price, state.price),
+                    ("status", old.status, state.status),
+                )
+                if before != after
+            ]
+            changes.extend(
+                kinds or [ListingChange("updated", listing_id, listing=listing)]
+            )
+        if not complete:
+            return changes
+        self.removed = [i for i in self.states if i not in self.seen]
+        changes.extend(
+            ListingChange("removed", i, old=self.states[i].price) for i in self.removed
+        )
+        return changes
+
+
+class ChangeStore:
+    """
+    States of the listings of the tracked searches persisted in a SQLite database.
+    Changing the fields or the status field changes every fingerprint, so that the
+    next scan of every search fetches all its listings once.
+
+    Args:
+        path (str): The path of the database file.
+        fields (Iterable[str]): Dotted paths of the fields hashed into the fingerprints. Defaults to DEFAULT_FIELDS.
+        status_field (str): Dotted path of the status of a listing. Defaults to "listing.status".
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        status_field: str = DEFAULT_STATUS_FIELD,
+    ):
+        self.path = path
+        self.fields = tuple(fields)
+        self.status_field = status_field
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS listing_states "
+                "(search TEXT NOT NULL, id TEXT NOT NULL, fingerprint BLOB NOT NULL, "
+                "price REAL, status TEXT, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (search, id)) WITHOUT ROWID"
+            )
+
+    def get(self, search: str) -> dict[str, ListingState]:
+        """The states of the listings of a search, by id."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, fingerprint, price, status FROM listing_states WHERE search = ?",
+                (search,),
+            ).fetchall()
+        return {row[0]: ListingState(row[1], row[2], row[3]) for row in rows}
+
+    def scan(self, search: str) -> ChangeScan:
+        """A scan of the search against its stored states."""
+        return ChangeScan(self.get(search), self.fields, self.status_field)
+
+    def save(self, search: str, scan: ChangeScan) -> None:
+        """Store the updated states of a finished scan and forget its removed listings."""
+        updated_at = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO listing_states "
+                "(search, id, fingerprint, price, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        search,
+                        listing_id,
+                        state.fingerprint,
+                        state.price,
+                        state.status,
+                        updated_at,
+                    )
+                    for listing_id, state in scan.updates.items()
+                ),
+            )
+            for i in range(0, len(scan.removed), _CHUNK):
+                chunk = scan.removed[i : i + _CHUNK]
+                self._conn.execute(
+                    "DELETE FROM listing_states WHERE search = ? "
+                    f"AND id IN ({','.join('?' * len(chunk))})",
+                    [search, *chunk],
+                )
+
+    def delete(self, search: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listing_states WHERE search = ?", (search,))
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,171 @@
+"""
+Command line interface, writing one json document per line to stdout and the errors
+to stderr:
+
+    homegater search rent 8001 --category APARTMENT --param 'monthlyRent={"to": 2500}' > listings.jsonl
+    homegater geo zurich 8001
+
+The client is imported once the arguments are parsed, so that the help and the
+argument errors are shown without loading the http stack.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from homegater.metrics import Instrumentation
+
+
+class _Errors(Instrumentation):
+    """Count the failed requests, e.g. the search pages the client logs and skips."""
+
+    def __init__(self):
+        self.count = 0
+
+    def error(self, endpoint: str, error: Exception) -> None:
+        self.count += 1
+
+
+def _param(value: str) -> tuple[str, Any]:
+    name, sep, raw = value.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value!r}")
+    try:
+        return name, json.loads(raw)
+    except ValueError:
+        return name, raw
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="homegater", description="Query the homegate.ch API as JSON lines."
+    )
+    parser.add_argument("--lang", default="en", choices=("en", "de", "fr", "it"))
+    parser.add_argument("--base-url", help="Override the API base url.")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--retries", type=int, default=0)
+    parser.add_argument(
+        "--rate-limit", type=float, help="The maximum requests per second."
+    )
+    parser.add_argument(
+        "--geo-index",
+        help="Path of a geo index of recorded lookups, consulted before the API.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser(
+        "search", help="Stream the listings of a search, one per line."
+    )
+    search.add_argument("offer_type", type=str.upper, choices=("RENT", "BUY"))
+    search.add_argument(
+        "location", nargs="+", help="Zip codes, names or geo tags of the locations."
+    )
+    search.add_argument(
+        "--category",
+        action="append",
+        dest="categories",
+        help="A category to search, repeatable. Defaults to the houses and flats.",
+    )
+    search.add_argument("--max-results", type=int)
+    search.add_argument("--page-size", type=int, default=20)
+    search.add_argument("--sort-by", default="dateCreated")
+    search.add_argument("--sort-direction", default="desc", choices=("asc", "desc"))
+    search.add_argument(
+        "--param",
+        action="append",
+        type=_param,
+        default=[],
+        metavar="NAME=VALUE",
+        help="An additional search parameter, the value parsed as json, e.g. 'monthlyRent={\"to\": 2500}'.",
+    )
+    search.add_argument(
+        "--field",
+        action="append",
+        dest="fields",
+        help="A dotted path of the fields kept from the listings, repeatable.",
+    )
+
+    geo = commands.add_parser("geo", help="Resolve location names to geo tags.")
+    geo.add_argument("names", nargs="+")
+    geo.add_argument("--results-count", type=int, default=100)
+    geo.add_argument(
+        "--all",
+        action="store_true",
+        help="Keep the geo tags sharing the same center.",
+    )
+    return parser
+
+
+def _write(records: Iterable[dict[str, Any]]) -> None:
+    write = sys.stdout.write
+    for record in records:
+        write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        write("\n")
+    sys.stdout.flush()
+
+
+def _run(args: argparse.Namespace) -> int:
+    """Run the command, returning the number of failed requests."""
+    from homegater.client import Homegate
+    from homegater.geo_index import GeoIndex
+    from homegater.query import DEFAULT_CATEGORIES
+
+    errors = _Errors()
+    with Homegate(
+        args.lang,
+        base_url=args.base_url,
+        timeout=args.timeout,
+        retries=args.retries,
+        rate_limit=args.rate_limit,
+        geo_index=GeoIndex.load(args.geo_index) if args.geo_index else None,
+        fields=getattr(args, "fields", None),
+        instrumentation=errors,
+    ) as api:
+        if args.command == "geo":
+            _write(
+                {"location": name, "geoTag": geo_tag}
+                for name in args.names
+                for geo_tag in api.get_geo_tags(
+                    name, args.results_count, unique=not args.all
+                )
+            )
+            return errors.count
+        location = args.location[0] if len(args.location) == 1 else args.location
+        _write(
+            api.iter_listings(
+                offer_type=args.offer_type,
+                categories=args.categories or list(DEFAULT_CATEGORIES),
+                location=location,
+                sort_by=args.sort_by,
+                sort_direction=args.sort_direction,
+                page_size=args.page_size,
+                max_results=args.max_results,
+                **dict(args.param),
+            )
+        )
+    return errors.count
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    logging.basicConfig(format="homegater: error: %(message)s", level=logging.ERROR)
+    from homegater.utils import LocationNotFoundException
+
+    try:
+        if _run(args):
+            return 1
+    except BrokenPipeError:
+        # The reader exited, e.g. head: the rest of the output is discarded.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (LocationNotFoundException, OSError) as e:
+        print(f"homegater: error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,94 +1,720 @@
 import itertools
-from typing import Any, Union
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import TYPE_CHECKING, Any, TypeVar, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from homegater.decoding import compile_fields, get_loads, project_fields
+from homegater.query import (
+    DEFAULT_CATEGORIES,
+    FLAT_CATEGORY,  # noqa: F401, re-exported
+    HOUSE_CATEGORY,  # noqa: F401, re-exported
+    JSON_HEADERS,
+    SearchQuery,
+)
+from homegater.ratelimit import RateLimiter, parse_retry_after
+from homegater.singleflight import SingleFlight
 from homegater.utils import (
     LocationNotFoundException,
     _is_valid_geo_tag,
     _unique_geo_set,
-    convert_to_camel_case,
 )
 
-HOUSE_CATEGORY = [
-    "CHALET",
-    "RUSTICO",
-    "FARM_HOUSE",
-    "BUNGALOW",
-    "SINGLE_HOUSE",
-    "ENGADINE_HOUSE",
-    "BIFAMILIAR_HOUSE",
-    "VILLA",
-]
-FLAT_CATEGORY = [
-    "APARTMENT",
-    "MAISONETTE",
-    "DUPLEX",
-    "ATTIC_FLAT",
-    "ROOF_FLAT",
-    "STUDIO",
-    "SINGLE_ROOM",
-    "TERRACE_FLAT",
-    "BACHELOR_FLAT",
-    "LOFT",
-    "ATTIC",
-    "FURNISHED_FLAT",
-]
-
-
-class Homegate:
+if TYPE_CHECKING:
+    # Opt-in components, imported by their users or where they are used.
+    from homegater.archive import ResponseArchive
+    from homegater.cache import Cache, SearchCache
+    from homegater.changes import ChangeScan, ChangeStore, ListingChange
+    from homegater.geo_index import GeoIndex
+    from homegater.incremental import CursorStore
+    from homegater.metrics import Instrumentation
+    from homegater.planner import SearchPlan
+    from homegater.store import ListingStore
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+_ZIP_CODE_PATTERN = re.compile(r"[1-9][0-9]{3}")
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+
+
+def _next_page_indexes(
+    first_page: dict[str, Any], page_size: int, max_results: Union[int, None]
+) -> range:
+    """
+    The start indexes of the pages following the first one, from its total hits.
+    """
+    total = first_page.get("total", 0)
+    if max_results is not None:
+        total = min(total, max_results)
+    return range(page_size, total, page_size)
+
+
+def _page_results(
+    page: dict[str, Any], from_index: int, max_results: Union[int, None]
+) -> list[dict[str, Any]]:
+    results = page.get("results", [])
+    if max_results is not None:
+        results = results[: max(max_results - from_index, 0)]
+    return results
+
+
+class BaseHomegate:
+    """
+    Configuration and request building shared by the sync and async clients.
+    """
+
     BASE_URL = "https://api.homegate.ch"
 
-    def __init__(self, location_search_lang: str = "en", max_search_geo: int = 1):
+    def __init__(
+        self,
+        location_search_lang: str = "en",
+        max_search_geo: int = 1,
+        *,
+        base_url: str = None,
+        timeout: Union[float, tuple[float, float]] = 30.0,
+        geo_cache: "Cache" = None,
+        geo_index: "GeoIndex" = None,
+        geo_tolerance_m: float = 0,
+        rate_limit: Union[float, dict[str, float], RateLimiter] = None,
+        json_backend: str = "auto",
+        fields: list[str] = None,
+        search_cache: "SearchCache" = None,
+        instrumentation: "Instrumentation" = None,
+        listing_store: "ListingStore" = None,
+        archive: "ResponseArchive" = None,
+    ):
+        if location_search_lang not in ("en", "de", "fr", "it"):
+            raise ValueError(
+                "Invalid search language. Only 'en', 'de', 'fr', or 'it' are accepted."
+            )
+        self.location_search_lang = location_search_lang
+        self.max_search_geo = max_search_geo
+        if base_url is not None:
+            self.BASE_URL = base_url.rstrip("/")
+        self.timeout = timeout
+        self.geo_cache = geo_cache
+        # An empty index is skipped.
+        self.geo_index = geo_index or None
+        self.geo_tolerance_m = geo_tolerance_m
+        # Anything else is a RateLimiter, or a proxy of one shared between processes.
+        if rate_limit and isinstance(rate_limit, (int, float, dict)):
+            rate_limit = RateLimiter(rate_limit)
+        self.rate_limiter = rate_limit or None
+        self.json_loads = get_loads(json_backend)
+        self.fields = compile_fields(fields) if fields else None
+        self.search_cache = search_cache
+        self.instrumentation = instrumentation
+        self.listing_store = listing_store
+        self.archive = archive
+
+    def _loads(self, endpoint: str, content: bytes) -> Any:
+        if self.instrumentation is None:
+            return self.json_loads(content)
+        start = time.perf_counter()
+        data = self.json_loads(content)
+        self.instrumentation.decode(endpoint, time.perf_counter() - start, len(content))
+        return data
+
+    def _decode_search(self, content: bytes) -> dict[str, Any]:
+        data = self._loads("search", content)
+        if self.fields is not None and "results" in data:
+            data["results"] = [
+                project_fields(result, self.fields) for result in data["results"]
+            ]
+        return data
+
+    def _decode_listing(self, content: bytes) -> dict[str, Any]:
+        data = self._loads("listing", content)
+        if self.fields is not None:
+            data = project_fields(data, self.fields)
+        return data
+
+    @staticmethod
+    def _request_key(
+        method: str, url: str, query: Union[dict[str, Any], SearchQuery] = None
+    ) -> str:
+        """
+        The single flight key of a request, with the body of its search query: the
+        body of a SearchQuery, serialized once and canonical as its lists are sorted,
+        or the fingerprint of the canonical JSON of a dict.
+        """
+        if query is None:
+            return f"{method} {url}"
+        if isinstance(query, SearchQuery):
+            return f"{method} {url} {query.to_bytes().decode()}"
+        from homegater.cache import query_fingerprint
+
+        return f"{method} {url} {query_fingerprint(query)}"
+
+    def _stored_search(
+        self, query: Union[dict[str, Any], SearchQuery], response: dict[str, Any]
+    ) -> dict[str, Any]:
+        if self.listing_store is not None and response:
+            self.listing_store.add_search(query, response)
+        return response
+
+    def _stored_listing(self, listing: dict[str, Any]) -> dict[str, Any]:
+        if self.listing_store is not None:
+            self.listing_store.add_listing(listing)
+        return listing
+
+    def _archived(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        body: Union[bytes, str, None],
+        response,
+    ):
+        """Record the body of a successful response in the archive, if any."""
+        if self.archive is not None and response.status_code == 200:
+            self.archive.record(endpoint, method, url, body, response.content)
+        return response
+
+    def _search_local(self, query: SearchQuery) -> dict[str, Any]:
+        if self.listing_store is None:
+            raise ValueError('source="local" requires a listing_store.')
+        return self.listing_store.search(query)
+
+    def _report_cache(self, cache: str, hit: bool) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.cache(cache, hit)
+
+    def _report_retry(self, endpoint: str, reason: str) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.retry(endpoint, reason)
+
+    def _report_error(self, endpoint: str, error: Exception) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.error(endpoint, error)
+
+    def _geo_cache_key(
+        self, location_name: str, results_count: int, unique: bool
+    ) -> str:
+        return json.dumps(
+            [
+                location_name,
+                self.location_search_lang,
+                results_count,
+                unique,
+                self.geo_tolerance_m,
+            ]
+        )
+
+    def _local_geo_tags(
+        self, location_name: str, results_count: int, unique: bool
+    ) -> Union[list[str], None]:
+        """
+        Resolve the geo tags without the API, from the offline index or the geo cache.
+        Returns None if the location cannot be resolved locally.
+        """
+        if not location_name:
+            return ["geo-country-switzerland"]
+
+        if _is_valid_geo_tag(location_name):
+            return [location_name]
+
+        if self.geo_index is not None:
+            results = self.geo_index.lookup(
+                location_name, self.location_search_lang, results_count
+            )
+            self._report_cache("geo_index", bool(results))
+            if results:
+                return self._geo_tags_from_results(results, unique)
+
+        if self.geo_cache is not None:
+            cached = self.geo_cache.get(
+                self._geo_cache_key(location_name, results_count, unique)
+            )
+            self._report_cache("geo_cache", cached is not None)
+            if cached is not None:
+                return list(cached)
+        return None
+
+    def _resolve_local_geo_tags(
+        self, location: Union[str, list[str], None]
+    ) -> list[str]:
+        """
+        Resolve the locations of a local search without the API, from the offline index
+        or the geo cache. A zip code not found there is searched by its zip code geo tag.
+        """
+        geo_tags = []
+        for loc in self._search_locations(location):
+            retrieved_geo_tags = self._local_geo_tags(loc, 100, True)
+            if retrieved_geo_tags is None and _ZIP_CODE_PATTERN.fullmatch(loc):
+                retrieved_geo_tags = [f"geo-zipcode-{loc}"]
+            if retrieved_geo_tags is None:
+                raise ValueError(
+                    f"The location {loc} cannot be resolved without the API, "
+                    'give its geo tag or zip code to search it with source="local".'
+                )
+            self._check_search_geo_tags(loc, retrieved_geo_tags)
+            geo_tags.extend(retrieved_geo_tags)
+        return geo_tags
+
+    def _geo_tags_url(self, location_name: str, results_count: int) -> str:
+        return f"{self.BASE_URL}/geo/locations?lang={self.location_search_lang}&name={location_name}&size={results_count}"
+
+    def _geo_tags_from_response(
+        self,
+        location_name: str,
+        results_count: int,
+        unique: bool,
+        response_data: dict[str, Any],
+    ) -> list[str]:
+        if response_data["total"] == 0:
+            raise LocationNotFoundException(location_name)
+
+        geo_tags = self._geo_tags_from_results(response_data["results"], unique)
+        if self.geo_cache is not None:
+            self.geo_cache.set(
+                self._geo_cache_key(location_name, results_count, unique), geo_tags
+            )
+        return geo_tags
+
+    def _geo_tags_from_results(self, results: list[dict], unique: bool) -> list[str]:
+        if unique and self.geo_tolerance_m > 0:
+            from homegater.geo import unique_geo_results
+
+            results = unique_geo_results(results, self.geo_tolerance_m)
+        elif unique:
+            results = _unique_geo_set(results)
+        return [geo["geoLocation"]["id"] for geo in results]
+
+    def _check_search_geo_tags(self, location: str, geo_tags: list[str]) -> None:
+        if len(geo_tags) > self.max_search_geo:
+            raise ValueError(
+                f"{len(geo_tags)} geo-tags found with limit {self.max_search_geo} for the requested location: {location}. "
+                "Please refine your search or incease the limit in the client. "
+                "The sugggested search way is the zip-code."
+            )
+
+    @staticmethod
+    def _search_locations(
+        location: Union[str, list[str], None],
+    ) -> list[Union[str, None]]:
+        if isinstance(location, str) or location is None:
+            return [location]
+        return location
+
+    @staticmethod
+    def _compile_search_query(
+        offer_type: str,
+        categories: list[str],
+        geo_tags: list[str],
+        sort_by: str,
+        sort_direction: str,
+        from_index: int,
+        size: int,
+        kwargs: dict[str, Any],
+    ) -> SearchQuery:
+        return SearchQuery(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            from_index=from_index,
+            size=size,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _build_search_query(
+        offer_type: str,
+        categories: list[str],
+        geo_tags: list[str],
+        sort_by: str,
+        sort_direction: str,
+        from_index: int,
+        size: int,
+        kwargs: dict[str, Any],
+    ) -> dict[str, Any]:
+        return BaseHomegate._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by,
+            sort_direction,
+            from_index,
+            size,
+            kwargs,
+        ).to_dict()
+
+    @staticmethod
+    def _search_content(query: Union[dict[str, Any], SearchQuery]) -> bytes:
+        """The JSON body of a search query, serialized once for a SearchQuery."""
+        if isinstance(query, SearchQuery):
+            return query.to_bytes()
+        return json.dumps(query, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def _many_query(
+        self, params: dict[str, Any], resolved: dict[Union[str, None], list[str]]
+    ) -> dict[str, Any]:
+        """The final query of search_listings keyword arguments, with resolved locations."""
+        params = dict(params)
+        geo_tags = []
+        for loc in self._search_locations(params.pop("location", None)):
+            self._check_search_geo_tags(loc, resolved[loc])
+            geo_tags.extend(resolved[loc])
+        return self._build_search_query(
+            params.pop("offer_type"),
+            params.pop("categories"),
+            geo_tags,
+            params.pop("sort_by", "dateCreated"),
+            params.pop("sort_direction", "desc"),
+            params.pop("from_index", 0),
+            params.pop("size", 20),
+            params,
+        )
+
+    def _search_plan(
+        self,
+        queries: list[dict[str, Any]],
+        resolved: dict[Union[str, None], list[str]],
+        max_merged_size: int,
+    ) -> "SearchPlan":
+        from homegater.planner import SearchPlan, plan_searches
+
+        def lookups(locations):
+            return sum(1 for loc in locations if loc and not _is_valid_geo_tag(loc))
+
+        return SearchPlan(
+            searches=plan_searches(
+                [self._many_query(q, resolved) for q in queries], max_merged_size
+            ),
+            geo_lookups=lookups(resolved),
+            naive_requests=sum(
+                1 + lookups(self._search_locations(q.get("location"))) for q in queries
+            ),
+        )
+
+    @staticmethod
+    def _many_locations(queries: list[dict[str, Any]]) -> list[Union[str, None]]:
+        return list(
+            dict.fromkeys(
+                loc
+                for query in queries
+                for loc in BaseHomegate._search_locations(query.get("location"))
+            )
+        )
+
+    @staticmethod
+    def _cursor_key(query: dict[str, Any]) -> str:
+        """The key of the incremental scan cursor of a query, whatever its page size."""
+        from homegater.cache import query_fingerprint
+
+        return query_fingerprint({**query, "from": 0, "size": 0})
+
+    @staticmethod
+    def _scan_pages(
+        query: SearchQuery, feed: Callable[[list[dict[str, Any]]], Any], error: str
+    ) -> Generator[SearchQuery, dict[str, Any], bool]:
+        """
+        Page through a search: yield the query of every page and receive its response,
+        until feed returns True for its results, a page is empty or the total is reached.
+        Returns whether the pages reached the total. The clients send the responses
+        with `_drive_pages`.
+        """
+        for from_index in itertools.count(0, query.size):
+            page = yield query.page(from_index)
+            if not page:
+                raise Exception(error)
+            results = page.get("results", [])
+            complete = from_index + len(results) >= page.get("total", 0)
+            if feed(results) or complete or not results:
+                return complete
+
+    def _sync_pages(
+        self, query: SearchQuery, store: "CursorStore"
+    ) -> Generator[SearchQuery, dict[str, Any], list[dict[str, Any]]]:
+        """The pages of sync_listings, returning the new results once the cursor is stored."""
+        from homegater.incremental import IncrementalScan
+
+        key = self._cursor_key(query.to_dict())
+        scan = IncrementalScan(store.get(key))
+        yield from self._scan_pages(
+            query, scan.feed, "Error searching listings, the cursor is left unchanged."
+        )
+        if scan.new:
+            store.set(key, scan.next_cursor())
+        return scan.new
+
+    def _track_pages(
+        self, query: SearchQuery, store: "ChangeStore"
+    ) -> Generator[SearchQuery, dict[str, Any], tuple[str, "ChangeScan", bool]]:
+        """
+        The pages of track_listings, returning the key of the search, its scan and
+        whether the scan is complete, so that only its removals are reported.
+        """
+        key = self._cursor_key(query.to_dict())
+        scan = store.scan(key)
+        complete = yield from self._scan_pages(
+            query,
+            scan.feed,
+            "Error searching listings, the tracked listings are left unchanged.",
+        )
+        return key, scan, complete
+
+    def _listing_url(self, listing_id) -> str:
+        return f"{self.BASE_URL}/listings/listing/{listing_id}?sanitize=true"
+
+
+class Homegate(BaseHomegate):
+    def __init__(
+        self,
+        location_search_lang: str = "en",
+        max_search_geo: int = 1,
+        *,
+        base_url: str = None,
+        pool_size: int = 10,
+        timeout: Union[float, tuple[float, float]] = 30.0,
+        retries: int = 0,
+        backoff_factor: float = 0.5,
+        geo_cache: "Cache" = None,
+        geo_index: "GeoIndex" = None,
+        geo_tolerance_m: float = 0,
+        rate_limit: Union[float, dict[str, float], RateLimiter] = None,
+        json_backend: str = "auto",
+        fields: list[str] = None,
+        search_cache: "SearchCache" = None,
+        instrumentation: "Instrumentation" = None,
+        listing_store: "ListingStore" = None,
+        archive: "ResponseArchive" = None,
+        coalesce: bool = True,
+    ):
         """
         Initialize the Homegate client.
         search_lang (str): The language to use for search results. Can be "en", "de", "fr", or "it". Defaults to "en".
         max_search_geo (int): The maximum number of geo tags to search for location. Defaults to 1.
+        base_url (str, optional): Override the API base url, e.g. for a local stand-in server.
+        pool_size (int): The number of keep-alive connections kept open to the API. Defaults to 10.
+        timeout (float | tuple): Timeout in seconds applied to every call, or a (connect, read) tuple. Defaults to 30.
+        retries (int): The number of retries on connection errors and 429/5xx responses. Defaults to 0.
+        backoff_factor (float): Exponential backoff factor between retries, honouring Retry-After. Defaults to 0.5.
+        geo_cache (Cache, optional): Cache for the resolved geo tags, e.g. homegater.cache.LRUCache. Defaults to no caching.
+        geo_index (GeoIndex, optional): Offline index of recorded lookups consulted before the geo api,
+            e.g. GeoIndex.load(path). Defaults to none.
+        geo_tolerance_m (float): The distance in meters within which the centers of geo tags count as the same location
+            when they should be unique, e.g. 1.0. Defaults to 0, the geo tags sharing their exact center.
+        rate_limit (float | dict | RateLimiter, optional): The maximum number of requests per second sent to each endpoint (geo, search, listing),
+            a dict of rates by endpoint, or a RateLimiter shared with other clients. The rates back off on throttling
+            and ramp back up on success up to the given rate (pass a RateLimiter with a higher max_rate to probe above it),
+            and 429 responses are retried through the limiter. Defaults to no limit.
+        json_backend (str): The json decoder of the responses, "orjson", "json" or "auto" for orjson when installed. Defaults to "auto".
+        fields (list[str], optional): Dotted paths of the fields kept from the search results and get_listing responses,
+            e.g. ["id", "listing.prices", "listing.address"]. Defaults to all the fields.
+        search_cache (SearchCache, optional): Cache of the search responses, e.g. homegater.cache.SearchCache. Defaults to no caching.
+        instrumentation (Instrumentation, optional): Hooks called on the requests, decodes, retries, cache lookups and errors,
+            e.g. homegater.metrics.Metrics. Defaults to none.
+        listing_store (ListingStore, optional): Local store filled with the search results and listings,
+            answering the searches sent with source="local". Defaults to none.
+        archive (ResponseArchive, optional): Archive recording the raw geo, search and listing responses,
+            e.g. homegater.archive.ResponseArchive. Defaults to none.
+        coalesce (bool): Share one request between the identical geo lookups, searches and listing fetches
+            in flight concurrently. Defaults to True.
         """
+        super().__init__(
+            location_search_lang,
+            max_search_geo,
+            base_url=base_url,
+            timeout=timeout,
+            geo_cache=geo_cache,
+            geo_index=geo_index,
+            geo_tolerance_m=geo_tolerance_m,
+            rate_limit=rate_limit,
+            json_backend=json_backend,
+            fields=fields,
+            search_cache=search_cache,
+            instrumentation=instrumentation,
+            listing_store=listing_store,
+            archive=archive,
+        )
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.single_flight = SingleFlight() if coalesce else None
+        # With a rate limiter, throttled requests are retried through it instead.
+        self.session = self._create_session(
+            pool_size, retries, backoff_factor, self.rate_limiter is None
+        )
 
-        if location_search_lang not in ("en", "de", "fr", "it"):
-            raise ValueError(
-                "Invalid search language. Only 'en', 'de', 'fr', or 'it' are accepted."
+    @staticmethod
+    def _create_session(
+        pool_size: int,
+        retries: int,
+        backoff_factor: float,
+        retry_throttled: bool = True,
+    ) -> requests.Session:
+        """
+        Create the pooled keep-alive session shared by all the client calls.
+        """
+        status_forcelist = RETRY_STATUS_CODES
+        if not retry_throttled:
+            # The rate limiter retries the 429 and 503 responses after slowing down.
+            status_forcelist = tuple(
+                c for c in RETRY_STATUS_CODES if c not in (429, 503)
             )
-        self.location_search_lang = location_search_lang
-        self.max_search_geo = max_search_geo
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            allowed_methods=None,
+            respect_retry_after_header=retry_throttled,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+
+    def _request(
+        self, method: str, url: str, endpoint: str = None, **kwargs
+    ) -> requests.Response:
+        """
+        Send a request through the pooled session with the client timeout and the rate
+        limit of the endpoint, retrying the throttled requests once the limiter allows
+        and the unavailable ones with exponential backoff.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        body = kwargs.get("data")
+        if self.rate_limiter is None:
+            response = self._send(method, url, endpoint, **kwargs)
+            return self._archived(endpoint, method, url, body, response)
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire(endpoint)
+            response = self._send(method, url, endpoint, **kwargs)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            throttled = self.rate_limiter.report(
+                endpoint, response.status_code, retry_after
+            )
+            if throttled:
+                if attempt == self.retries:
+                    return self._archived(endpoint, method, url, body, response)
+                self._report_retry(endpoint, "throttled")
+                continue
+            if response.status_code != 503 or attempt == self.retries:
+                return self._archived(endpoint, method, url, body, response)
+            # The limiter does not slow down on a 503 without Retry-After.
+            self._report_retry(endpoint, str(response.status_code))
+            time.sleep(self.backoff_factor * 2**attempt)
+
+    def _drive_pages(self, pages: Generator[SearchQuery, dict[str, Any], T]) -> T:
+        """Search the pages yielded by a scan of BaseHomegate, returning its result."""
+        try:
+            query = next(pages)
+            while True:
+                query = pages.send(self._search(query, bypass_cache=True))
+        except StopIteration as stop:
+            return stop.value
+
+    def _coalesce(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn, or wait for the call in flight with the same key when coalescing."""
+        if self.single_flight is None:
+            return fn(*args, **kwargs)
+        return self.single_flight.do(key, fn, *args, **kwargs)
+
+    def _send(
+        self, method: str, url: str, endpoint: str = None, **kwargs
+    ) -> requests.Response:
+        """
+        Send a single request through the session, calling the instrumentation hooks.
+        The retries of the session are reported from the retry history of the response.
+        """
+        hooks = self.instrumentation
+        if hooks is None:
+            return self.session.request(method, url, **kwargs)
+        hooks.request_start(endpoint, method, url)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            hooks.request_end(endpoint, None, time.perf_counter() - start, 0, 0)
+            raise
+        elapsed = time.perf_counter() - start
+        retries = getattr(response.raw, "retries", None)
+        for retried in getattr(retries, "history", ()):
+            hooks.retry(
+                endpoint,
+                str(retried.status) if retried.status else type(retried.error).__name__,
+            )
+        hooks.first_byte(endpoint, response.elapsed.total_seconds())
+        hooks.request_end(
+            endpoint,
+            response.status_code,
+            elapsed,
+            len(response.request.body or b""),
+            response.raw.tell(),
+        )
+        return response
+
+    def close(self) -> None:
+        """
+        Close the pooled connections of the client.
+        """
+        self.session.close()
+
+    def __enter__(self) -> "Homegate":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def get_geo_tags(
         self, location_name: str, results_count: int = 100, unique: bool = True
     ) -> list[str]:
         """
         Retrieve geo tags based on the location name.
+        The offline geo index and the geo cache are consulted before querying the API.
 
         Args:
             location_name (str): The name of the location to search for geo tags. Can be a Kanton name, Gemeinde name, or zip code.
             results_count (int, optional): The number of results to return. Defaults to 100.
+            unique (bool, optional): Drop the results sharing the same center. Defaults to True.
 
         Returns:
             List[str]: A list of geo tags.
         """
+        geo_tags = self._local_geo_tags(location_name, results_count, unique)
+        if geo_tags is not None:
+            return geo_tags
 
-        if not location_name:
-            return ["geo-country-switzerland"]
-
-        if _is_valid_geo_tag(location_name):
-            return [location_name]
-
-        geo_tags_url = f"{self.BASE_URL}/geo/locations?lang={self.location_search_lang}&name={location_name}&size={results_count}"
+        geo_tags_url = self._geo_tags_url(location_name, results_count)
         try:
-            response = requests.get(geo_tags_url)
+            response = self._coalesce(
+                self._request_key("GET", geo_tags_url),
+                self._request,
+                "GET",
+                geo_tags_url,
+                "geo",
+            )
             response.raise_for_status()
-            response_data = response.json()
-        except requests.RequestException as e:
+            response_data = self._loads("geo", response.content)
+        except (requests.RequestException, ValueError) as e:
+            self._report_error("geo", e)
             raise Exception(f"Error fetching geo tags: {e}") from e
-        if response_data["total"] == 0:
-            return LocationNotFoundException(location_name)
-
-        if unique:
-            to_return = _unique_geo_set(response_data["results"])
-        else:
-            to_return = response_data["results"]
-
-        return [geo["geoLocation"]["id"] for geo in to_return]
+        return self._geo_tags_from_response(
+            location_name, results_count, unique, response_data
+        )
 
     def search_listings(
         self,
@@ -100,6 +726,8 @@ class Homegate:
         sort_direction: str = "desc",
         from_index: int = 0,
         size: int = 20,
+        bypass_cache: bool = False,
+        source: str = "api",
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -113,54 +741,430 @@ class Homegate:
             sort_direction (str, optional): The direction to sort (e.g., "asc" or "desc"). Defaults to "desc".
             from_index (int, optional): The starting index for the search results. Defaults to 0.
             size (int, optional): The number of results to return. Defaults to 20.
+            bypass_cache (bool, optional): Skip the cached response of the search cache and refresh it. Defaults to False.
+            source (str, optional): "api", or "local" to answer from the listing store without querying the API,
+                the location being resolved from a geo tag, zip code, the geo index or the geo cache. Defaults to "api".
             **kwargs: Additional search parameters.
 
         Returns:
             Dict[str, Any]: The search results.
         """
-        if isinstance(location, str) or location is None:
-            location = [location]
+        if source == "local":
+            geo_tags = self._resolve_local_geo_tags(location)
+        else:
+            geo_tags = self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by,
+            sort_direction,
+            from_index,
+            size,
+            kwargs,
+        )
+        if source == "local":
+            return self._search_local(query)
+        return self._search(query, bypass_cache)
 
+    def search(
+        self, query: SearchQuery, *, bypass_cache: bool = False
+    ) -> dict[str, Any]:
+        """
+        Send a precompiled search query, e.g. one built once and polled repeatedly
+        or paged with query.page(from_index).
+
+        Args:
+            query (SearchQuery): The search query, with resolved geo tags.
+            bypass_cache (bool, optional): Skip the cached response of the search cache and refresh it. Defaults to False.
+
+        Returns:
+            Dict[str, Any]: The search results.
+        """
+        return self._search(query, bypass_cache)
+
+    def _resolve_search_geo_tags(
+        self, location: Union[str, list[str], None]
+    ) -> list[str]:
         geo_tags = []
-        for loc in location:
+        for loc in self._search_locations(location):
             retrieved_geo_tags = self.get_geo_tags(loc, unique=True)
-            if len(retrieved_geo_tags) > self.max_search_geo:
-                raise ValueError(
-                    f"{len(geo_tags)} geo-tags found with limit {self.max_search_geo} for the requested location: {loc}. "
-                    "Please refine your search or incease the limit in the client. "
-                    "The sugggested search way is the zip-code."
-                )
+            self._check_search_geo_tags(loc, retrieved_geo_tags)
             geo_tags.append(retrieved_geo_tags)
+        return list(itertools.chain.from_iterable(geo_tags))
 
-        geo_tags = list(itertools.chain.from_iterable(geo_tags))
-        search_listings_url = f"{self.BASE_URL}/search/listings"
+    def _search(
+        self, query: Union[dict[str, Any], SearchQuery], bypass_cache: bool = False
+    ) -> dict[str, Any]:
+        """
+        Send the search query, through the search cache if any. A stale cached response
+        is returned while it is refreshed in a background thread.
+        """
+        if self.search_cache is None:
+            return self._fetch_search(query)
+        if not bypass_cache:
+            cached, stale = self.search_cache.get(query)
+            self._report_cache("search_cache", cached is not None)
+            if cached is not None:
+                if stale and self.search_cache.start_refresh(query):
+                    threading.Thread(
+                        target=self._refresh_search, args=(query,), daemon=True
+                    ).start()
+                return cached
+        return self._refresh_search(query)
+
+    def _refresh_search(
+        self, query: Union[dict[str, Any], SearchQuery]
+    ) -> dict[str, Any]:
+        try:
+            start = time.perf_counter()
+            response = self._fetch_search(query)
+            if response:
+                self.search_cache.set(query, response, time.perf_counter() - start)
+            return response
+        finally:
+            self.search_cache.end_refresh(query)
 
-        # Prepare the base query
-        query = {
-            "query": {
-                "offerType": offer_type,
-                "categories": categories,
-                "location": {"geoTags": geo_tags},
-            },
-            "sortBy": sort_by,
-            "sortDirection": sort_direction,
-            "from": from_index,
-            "size": size,
-            "trackTotalHits": True,
-            "fieldset": "srp-list",
-        }
-
-        # Include any extra parameters passed as kwargs to the query.
-        if kwargs:
-            query["query"].update(convert_to_camel_case(kwargs))
+    def _fetch_search(
+        self, query: Union[dict[str, Any], SearchQuery]
+    ) -> dict[str, Any]:
+        search_listings_url = f"{self.BASE_URL}/search/listings"
         try:
-            response = requests.post(search_listings_url, json=query)
+            response = self._coalesce(
+                self._request_key("POST", search_listings_url, query),
+                self._request,
+                "POST",
+                search_listings_url,
+                "search",
+                data=self._search_content(query),
+                headers=JSON_HEADERS,
+            )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Error searching listings: {e}")
+            return self._stored_search(query, self._decode_search(response.content))
+        except (requests.RequestException, ValueError) as e:
+            self._report_error("search", e)
+            logger.error("Error searching listings: %s", e)
             return {}
 
+    def iter_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        location: Union[str, list[str]] = None,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        page_size: int = 20,
+        prefetch: int = 2,
+        max_results: int = None,
+        **kwargs,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over all the listings of a search, one at a time.
+        The geo tags are resolved once and the next pages are fetched in the background
+        while the current one is consumed, so at most `prefetch` pages are held in memory.
+
+        Args:
+            offer_type (str): The type of offer (e.g., "BUY" or "RENT").
+            categories (List[str]): List of categories to search within.
+            location (str): The name of the location to search within. Can be a Kanton name, Gemeinde name, or zip code.
+            sort_by (str, optional): The field to sort by. Defaults to "dateCreated".
+            sort_direction (str, optional): The direction to sort (e.g., "asc" or "desc"). Defaults to "desc".
+            page_size (int, optional): The number of results per request. Defaults to 20.
+            prefetch (int, optional): The number of pages fetched ahead. Defaults to 2.
+            max_results (int, optional): Stop after this number of listings. Defaults to all the results.
+            **kwargs: Additional search parameters.
+
+        Yields:
+            Dict[str, Any]: The search results, one listing at a time.
+        """
+        geo_tags = self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            sort_by,
+            sort_direction,
+            0,
+            page_size,
+            kwargs,
+        )
+        first_page = self._search(query)
+        yield from _page_results(first_page, 0, max_results)
+
+        executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        pending = deque()
+
+        def prefetched_pages():
+            for from_index in _next_page_indexes(first_page, page_size, max_results):
+                future = executor.submit(self._search, query.page(from_index))
+                pending.append((from_index, future))
+                if len(pending) > prefetch:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+
+        try:
+            for from_index, future in prefetched_pages():
+                results = _page_results(future.result(), from_index, max_results)
+                if not results:
+                    return
+                yield from results
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def plan_search_many(
+        self,
+        queries: list[dict[str, Any]],
+        max_merged_size: int = 100,
+        max_workers: int = 8,
+    ) -> "SearchPlan":
+        """
+        Plan the requests of search_many, resolving every distinct location once, concurrently.
+        The plan reports the planned and the naive number of requests.
+        """
+        locations = self._many_locations(queries)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            geo_tags = executor.map(
+                lambda loc: self.get_geo_tags(loc, unique=True), locations
+            )
+            resolved = dict(zip(locations, geo_tags, strict=True))
+        return self._search_plan(queries, resolved, max_merged_size)
+
+    def search_many(
+        self,
+        queries: list[dict[str, Any]],
+        max_merged_size: int = 100,
+        max_workers: int = 8,
+        plan: "SearchPlan" = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Run many searches differing in their location with as few requests as possible.
+        The locations are resolved once, and the first pages of the searches sharing their other parameters
+        and searching zip codes are merged into combined requests, whose results are dispatched back by postal code.
+        When a combined response is incomplete, the searches whose first page it does not fill are sent one by one,
+        and the total of the others counts their listings in the combined response.
+
+        Args:
+            queries (List[Dict[str, Any]]): The keyword arguments of search_listings of every search.
+            max_merged_size (int, optional): The number of results of a combined request. Defaults to 100.
+            max_workers (int, optional): The number of requests sent concurrently. Defaults to 8.
+            plan (SearchPlan, optional): The plan_search_many plan of the queries, which then counts the searches
+                sent one by one in its fallback_requests. Planned here by default.
+
+        Returns:
+            List[Dict[str, Any]]: The search results of every query, in order.
+        """
+        if plan is None:
+            plan = self.plan_search_many(queries, max_merged_size, max_workers)
+        responses = [None] * len(queries)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._search, search.query): search
+                for search in plan.searches
+            }
+            fallbacks = {}
+            for future in as_completed(futures):
+                dispatched, members = futures[future].dispatch(future.result())
+                for index, query in members:
+                    fallbacks[index] = executor.submit(self._search, query)
+                for index, response in dispatched:
+                    responses[index] = response
+            plan.fallback_requests += len(fallbacks)
+            for index, future in fallbacks.items():
+                responses[index] = future.result()
+        return responses
+
+    def crawl_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        location: Union[str, list[str]] = None,
+        split_on: str = None,
+        page_size: int = 20,
+        max_pages: int = 5,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over all the listings of a large search without deep pages.
+        The search is split in partitions, by geo tags and then by ranges of the split field,
+        until each one has at most page_size * max_pages results. The partitions are crawled in parallel
+        and the listings are yielded once, in no particular order.
+        Once a partition is split on a range of the field, the listings without a value for it
+        (e.g. prices on request) are not matched, so the crawl is partial.
+        A partition whose search fails raises an exception, instead of leaving its listings out.
+
+        Args:
+            offer_type (str): The type of offer (e.g., "BUY" or "RENT").
+            categories (List[str]): List of categories to search within.
+            location (str): The name of the location to search within. Can be a Kanton name, Gemeinde name, or zip code.
+            split_on (str, optional): The numeric field split in ranges, e.g. "numberOfRooms". Defaults to the price.
+            page_size (int, optional): The number of results per request. Defaults to 20.
+            max_pages (int, optional): The maximum number of pages requested per partition. Defaults to 5.
+            max_workers (int, optional): The number of partitions crawled concurrently. Defaults to 4.
+            **kwargs: Additional search parameters. A range of the split field bounds the partitions.
+
+        Yields:
+            Dict[str, Any]: The search results, one listing at a time.
+        """
+        from homegater.crawler import split_field
+
+        geo_tags = self._resolve_search_geo_tags(location)
+        query = self._build_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        field = split_field(query, split_on)
+        seen = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(self._crawl_partition, query, field, max_pages)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results, partitions = future.result()
+                        for partition in partitions:
+                            pending.add(
+                                executor.submit(
+                                    self._crawl_partition, partition, field, max_pages
+                                )
+                            )
+                        for result in results:
+                            if result.get("id") not in seen:
+                                seen.add(result.get("id"))
+                                yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _crawl_partition(
+        self, query: dict[str, Any], field: str, max_pages: int
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        The results of a partition and, if it does not fit in max_pages, its sub partitions.
+        """
+        from homegater.crawler import CRAWL_ERROR, split_query
+
+        page_size = query["size"]
+        first_page = self._search(query)
+        if not first_page:
+            raise Exception(CRAWL_ERROR)
+        results = list(first_page.get("results", []))
+        total = first_page.get("total", 0)
+        if total > page_size * max_pages:
+            partitions = split_query(query, field)
+            if partitions:
+                return results, partitions
+        for from_index in range(page_size, total, page_size):
+            page = self._search({**query, "from": from_index})
+            if not page:
+                raise Exception(CRAWL_ERROR)
+            results.extend(page.get("results", []))
+        return results, []
+
+    def sync_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        store: "CursorStore",
+        location: Union[str, list[str]] = None,
+        page_size: int = 20,
+        **kwargs,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the listings created since the previous sync of the same search.
+        The results are paged newest first, only until the listings seen by the previous sync,
+        and the cursor of the search is then updated in the store. The first sync returns all the listings.
+
+        Args:
+            offer_type (str): The type of offer (e.g., "BUY" or "RENT").
+            categories (List[str]): List of categories to search within.
+            store (CursorStore): The store of the cursors, e.g. CursorStore("cursors.sqlite").
+            location (str): The name of the location to search within. Can be a Kanton name, Gemeinde name, or zip code.
+            page_size (int, optional): The number of results per request. Defaults to 20.
+            **kwargs: Additional search parameters.
+
+        Returns:
+            List[Dict[str, Any]]: The new search results, newest first.
+        """
+        geo_tags = self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        return self._drive_pages(self._sync_pages(query, store))
+
+    def track_listings(
+        self,
+        *,
+        offer_type: str,
+        categories: list[str],
+        store: "ChangeStore",
+        location: Union[str, list[str]] = None,
+        page_size: int = 20,
+        details: bool = True,
+        max_workers: int = 8,
+        **kwargs,
+    ) -> list["ListingChange"]:
+        """
+        Return the changes of the listings of a search since its previous tracking.
+        Every page of the search is compared with the fingerprints of its listings stored by the previous run,
+        and only the listings whose fingerprint changed are fetched with get_listing. The first run reports
+        every listing as new. The listings missing from a scan that reached the total of the search are
+        reported as removed; a scan ended early by an empty page reports no removal.
+
+        Args:
+            offer_type (str): The type of offer (e.g., "BUY" or "RENT").
+            categories (List[str]): List of categories to search within.
+            store (ChangeStore): The store of the listing fingerprints, e.g. ChangeStore("changes.sqlite").
+            location (str): The name of the location to search within. Can be a Kanton name, Gemeinde name, or zip code.
+            page_size (int, optional): The number of results per request. Defaults to 20.
+            details (bool, optional): Fetch the details of the changed listings, falling back to their search result
+                when the fetch fails. Defaults to True.
+            max_workers (int, optional): The number of listings fetched concurrently. Defaults to 8.
+            **kwargs: Additional search parameters.
+
+        Returns:
+            List[ListingChange]: The new, price, status, updated and removed listings.
+        """
+        geo_tags = self._resolve_search_geo_tags(location)
+        query = self._compile_search_query(
+            offer_type,
+            categories,
+            geo_tags,
+            "dateCreated",
+            "desc",
+            0,
+            page_size,
+            kwargs,
+        )
+        key, scan, complete = self._drive_pages(self._track_pages(query, store))
+        fetched = {}
+        if details:
+            for listing_id, listing in self.get_listings(scan.changed, max_workers):
+                if not isinstance(listing, Exception):
+                    fetched[listing_id] = listing
+        changes = scan.finish(fetched, complete)
+        store.save(key, scan)
+        return changes
+
     def search_buy_listings(
         self,
         *,
@@ -170,6 +1174,7 @@ class Homegate:
         sort_direction: str = "desc",
         from_index: int = 0,
         size: int = 20,
+        bypass_cache: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -182,13 +1187,14 @@ class Homegate:
             sort_direction (str, optional): The direction to sort (e.g., "asc" or "desc"). Defaults to "desc".
             from_index (int, optional): The starting index for the search results. Defaults to 0.
             size (int, optional): The number of results to return. Defaults to 20.
+            bypass_cache (bool, optional): Skip the cached response of the search cache and refresh it. Defaults to False.
             **kwargs: Additional search parameters.
 
         Returns:
             Dict[str, Any]: The search results.
         """
         if categories is None:
-            categories = HOUSE_CATEGORY + FLAT_CATEGORY
+            categories = DEFAULT_CATEGORIES
         return self.search_listings(
             offer_type="BUY",
             categories=categories,
@@ -197,6 +1203,7 @@ class Homegate:
             sort_direction=sort_direction,
             from_index=from_index,
             size=size,
+            bypass_cache=bypass_cache,
             **kwargs,
         )
 
@@ -209,6 +1216,7 @@ class Homegate:
         sort_direction: str = "desc",
         from_index: int = 0,
         size: int = 20,
+        bypass_cache: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -221,13 +1229,14 @@ class Homegate:
             sort_direction (str, optional): The direction to sort (e.g., "asc" or "desc"). Defaults to "desc".
             from_index (int, optional): The starting index for the search results. Defaults to 0.
             size (int, optional): The number of results to return. Defaults to 20.
+            bypass_cache (bool, optional): Skip the cached response of the search cache and refresh it. Defaults to False.
             **kwargs: Additional search parameters.
 
         Returns:
             Dict[str, Any]: The search results.
         """
         if categories is None:
-            categories = HOUSE_CATEGORY + FLAT_CATEGORY
+            categories = DEFAULT_CATEGORIES
         return self.search_listings(
             offer_type="RENT",
             categories=categories,
@@ -236,10 +1245,53 @@ class Homegate:
             sort_direction=sort_direction,
             from_index=from_index,
             size=size,
+            bypass_cache=bypass_cache,
             **kwargs,
         )
 
     def get_listing(self, listing_id):
-        url = f"{self.BASE_URL}/listings/listing/{listing_id}?sanitize=true"
-        response = requests.get(url)
-        return response.json()
+        url = self._listing_url(listing_id)
+        response = self._coalesce(
+            self._request_key("GET", url), self._request, "GET", url, "listing"
+        )
+        response.raise_for_status()
+        return self._stored_listing(self._decode_listing(response.content))
+
+    def get_listings(
+        self,
+        listing_ids: Iterable,
+        max_workers: int = 8,
+        chunk_size: int = None,
+    ) -> Iterator[tuple[Any, Union[dict[str, Any], Exception]]]:
+        """
+        Fetch the details of many listings in parallel.
+        Duplicated ids are fetched once and the pairs are yielded as soon as every listing completes,
+        with the exception instead of the listing for the failed ids.
+
+        Args:
+            listing_ids (Iterable): The ids of the listings.
+            max_workers (int, optional): The number of listings fetched concurrently. Defaults to 8.
+            chunk_size (int, optional): The number of ids submitted ahead of the completed ones. Defaults to 4 * max_workers.
+
+        Yields:
+            Tuple[Any, Union[Dict[str, Any], Exception]]: The listing id and its details or the raised exception.
+        """
+        ids = iter(dict.fromkeys(listing_ids))
+        chunk_size = chunk_size or 4 * max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            try:
+                while True:
+                    for listing_id in itertools.islice(ids, chunk_size - len(pending)):
+                        pending[executor.submit(self.get_listing, listing_id)] = (
+                            listing_id
+                        )
+                    if not pending:
+                        return
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        listing_id = pending.pop(future)
+                        yield listing_id, future.exception() or future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
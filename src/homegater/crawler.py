@@ -0,0 +1,70 @@
+"""
+Partitioning of the searches whose results do not fit in a shallow page window.
+
+A search is split in two, first by halving its list of geo tags and then by halving
+the range of a numeric field (the price by default), until every partition has at
+most `page_size * max_pages` results. Listings without a value for the split field,
+e.g. prices on request, are not matched by the range partitions: a crawl split on
+the price is partial. A partition whose search fails fails the crawl.
+"""
+
+import copy
+from typing import Any, Optional
+
+CRAWL_ERROR = "Error crawling listings, a partition of the search failed."
+
+DEFAULT_SPLIT_FIELDS = {"BUY": "purchasePrice", "RENT": "monthlyRent"}
+
+# Range of a split field when the search does not restrict it, and the smallest
+# range that is still split.
+SPLIT_BOUNDS = {
+    "purchasePrice": (0, 100_000_000, 1),
+    "monthlyRent": (0, 100_000, 1),
+    "numberOfRooms": (0, 20, 0.5),
+    "livingSpace": (0, 10_000, 1),
+    "lotSize": (0, 1_000_000, 1),
+}
+
+
+def split_field(query: dict[str, Any], field: Optional[str] = None) -> str:
+    """The field the ranges of the query are split on, by default its price."""
+    if field is not None:
+        return field
+    offer_type = query["query"]["offerType"]
+    if offer_type not in DEFAULT_SPLIT_FIELDS:
+        raise ValueError(f"No default split field for the offer type {offer_type}.")
+    return DEFAULT_SPLIT_FIELDS[offer_type]
+
+
+def split_query(query: dict[str, Any], field: str) -> list[dict[str, Any]]:
+    """
+    Split the search query in two partitions covering its results, or return an empty
+    list if it cannot be split further.
+    """
+    geo_tags = query["query"]["location"]["geoTags"]
+    if len(geo_tags) > 1:
+        middle = len(geo_tags) // 2
+        return [
+            _with_query(query, "location", {"geoTags": geo_tags[:middle]}),
+            _with_query(query, "location", {"geoTags": geo_tags[middle:]}),
+        ]
+
+    low, high, step = SPLIT_BOUNDS.get(field, (0, None, 1))
+    bounds = query["query"].get(field) or {}
+    low = bounds.get("from", low)
+    high = bounds.get("to", high)
+    if high is None:
+        raise ValueError(f"The range of {field} should be restricted to split on it.")
+    middle = low + (high - low) // (2 * step) * step
+    if middle <= low or middle >= high:
+        return []
+    return [
+        _with_query(query, field, {"from": low, "to": middle}),
+        _with_query(query, field, {"from": middle, "to": high}),
+    ]
+
+
+def _with_query(query: dict[str, Any], key: str, value: Any) -> dict[str, Any]:
+    partition = copy.deepcopy(query)
+    partition["query"][key] = value
+    return partition
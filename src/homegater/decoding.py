@@ -0,0 +1,69 @@
+"""
+Json decoding of the API responses.
+
+The responses are decoded straight from their raw bytes, skipping the charset
+detection and text decoding of `response.json()`, with orjson when installed
+(pip install homegater[fast]) and the standard library otherwise. orjson is only
+imported when a decoder is first asked for, not with the package.
+"""
+
+import json
+from collections.abc import Callable, Iterable
+from typing import Any
+
+BACKENDS = ("auto", "orjson", "json")
+
+
+def _orjson():
+    """The orjson module, or None if it is not installed."""
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover
+        return None
+    return orjson
+
+
+def get_loads(backend: str = "auto") -> Callable[[bytes], Any]:
+    """
+    The json loads function of the backend: "orjson", "json" or "auto" for orjson
+    when installed and json otherwise.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Invalid json backend {backend}. Only {BACKENDS} are accepted."
+        )
+    orjson = None if backend == "json" else _orjson()
+    if backend == "orjson" and orjson is None:
+        raise ImportError(
+            "The orjson backend requires orjson. Install it with: pip install homegater[fast]"
+        )
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+def compile_fields(fields: Iterable[str]) -> tuple[tuple[str, ...], ...]:
+    """Split the dotted field paths, e.g. "listing.prices.rent", into their keys."""
+    return tuple(tuple(field.split(".")) for field in fields)
+
+
+def project_fields(
+    data: dict[str, Any], fields: tuple[tuple[str, ...], ...]
+) -> dict[str, Any]:
+    """
+    Keep only the given compiled field paths of the data, dropping the other keys
+    so that they can be freed. The missing paths are skipped.
+    """
+    projected = {}
+    for path in fields:
+        source = data
+        for key in path:
+            if not isinstance(source, dict) or key not in source:
+                break
+            source = source[key]
+        else:
+            target = projected
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = source
+    return projected
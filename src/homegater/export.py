@@ -0,0 +1,125 @@
+"""
+Columnar export of search results to NumPy structured arrays, Arrow record batches
+and Parquet files, with a fixed schema.
+
+The results are consumed from any iterable, e.g. `Homegate.iter_listings`, and
+converted in batches of `batch_size` rows so that the memory stays bounded:
+
+    for batch in to_arrow(api.iter_listings(offer_type="RENT", categories=FLAT_CATEGORY)):
+        ...
+
+It requires the optional numpy and pyarrow dependencies (pip install homegater[export]).
+"""
+
+import itertools
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from homegater.incremental import listing_created_at
+from homegater.models import LISTING_FIELDS, listing_row
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+# Column name, numpy dtype and arrow type name of every exported field. The text
+# fields longer than their numpy width are truncated in the structured arrays.
+SCHEMA = (
+    ("id", "U16", "string"),
+    ("offer_type", "U8", "string"),
+    ("category", "U32", "string"),
+    ("price", "f8", "float64"),
+    ("currency", "U3", "string"),
+    ("rooms", "f8", "float64"),
+    ("living_space", "f8", "float64"),
+    ("postal_code", "U8", "string"),
+    ("locality", "U64", "string"),
+    ("latitude", "f8", "float64"),
+    ("longitude", "f8", "float64"),
+    ("created_at", "U32", "string"),
+)
+COLUMNS = (*LISTING_FIELDS, "created_at")
+
+
+def column_batches(
+    results: Iterable[dict[str, Any]], batch_size: int = 10_000
+) -> Iterator[dict[str, list]]:
+    """Batches of at most batch_size results as lists of values by column."""
+    results = iter(results)
+    while True:
+        rows = [
+            (*listing_row(result), listing_created_at(result) or None)
+            for result in itertools.islice(results, batch_size)
+        ]
+        if not rows:
+            return
+        yield dict(zip(COLUMNS, map(list, zip(*rows, strict=True)), strict=True))
+
+
+def numpy_dtype() -> "np.dtype":
+    if np is None:
+        raise ImportError(
+            "The numpy export requires numpy. Install it with: pip install homegater[export]"
+        )
+    return np.dtype([(name, dtype) for name, dtype, _ in SCHEMA])
+
+
+def to_numpy(
+    results: Iterable[dict[str, Any]], batch_size: int = 10_000
+) -> Iterator["np.ndarray"]:
+    """
+    Structured arrays of at most batch_size results, with NaN for the missing numbers
+    and empty strings for the missing texts.
+    """
+    dtype = numpy_dtype()
+    for columns in column_batches(results, batch_size):
+        batch = np.empty(len(columns["id"]), dtype=dtype)
+        for name, column_dtype, _ in SCHEMA:
+            if column_dtype == "f8":
+                batch[name] = np.array(columns[name], dtype=float)
+            else:
+                batch[name] = ["" if v is None else v for v in columns[name]]
+        yield batch
+
+
+def arrow_schema() -> "pa.Schema":
+    if pa is None:
+        raise ImportError(
+            "The arrow export requires pyarrow. Install it with: pip install homegater[export]"
+        )
+    return pa.schema(
+        [(name, getattr(pa, type_name)()) for name, _, type_name in SCHEMA]
+    )
+
+
+def to_arrow(
+    results: Iterable[dict[str, Any]], batch_size: int = 10_000
+) -> Iterator["pa.RecordBatch"]:
+    """Arrow record batches of at most batch_size results, with nulls for the missing values."""
+    schema = arrow_schema()
+    for columns in column_batches(results, batch_size):
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_parquet(
+    results: Iterable[dict[str, Any]], path: str, batch_size: int = 10_000
+) -> int:
+    """
+    Write the results to a Parquet file, one row group per batch.
+    Returns the number of rows written.
+    """
+    schema = arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in to_arrow(results, batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
@@ -0,0 +1,230 @@
+"""
+Geo locations of the `/geo/locations` results held as packed coordinate arrays.
+
+The locations are de-duplicated within a distance tolerance instead of by exact
+float equality of their centers. The exact duplicates are dropped first, and only
+the remaining centers with a close latitude, found by sorting them (with numpy when
+installed), are compared by distance. A grid index answers the "nearest geo tag"
+and "geo tags within a radius" queries. The grid hashes every center to a cell of
+`cell_m` meters so that only the neighbouring cells are compared.
+"""
+
+import itertools
+import math
+from array import array
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+DEFAULT_TOLERANCE_M = 1.0
+# Below it the fixed cost of the numpy calls exceeds the sort in Python.
+_NUMPY_MIN_POINTS = 48
+
+
+def _close_latitudes(lat: Sequence[float], lat_deg: float) -> list[int]:
+    """The positions, in order, of the latitudes within lat_deg of another one."""
+    if np is not None and len(lat) >= _NUMPY_MIN_POINTS:
+        values = np.fromiter(lat, dtype=float, count=len(lat))
+        order = values.argsort(kind="stable")
+        close = np.diff(values[order]) <= lat_deg
+        if not close.any():
+            return []
+        flags = np.zeros(len(values), dtype=bool)
+        flags[order[1:][close]] = True
+        flags[order[:-1][close]] = True
+        return np.flatnonzero(flags).tolist()
+    order = sorted(range(len(lat)), key=lat.__getitem__)
+    close = set()
+    for i, j in itertools.pairwise(order):
+        if lat[j] - lat[i] <= lat_deg:
+            close.update((i, j))
+    return sorted(close)
+
+
+def _drop_near(
+    lat: Sequence[float], lon: Sequence[float], tolerance_m: float
+) -> list[int]:
+    """
+    The positions, in order, of the points without a previous kept point within
+    tolerance_m meters. The latitudes are compared first, with numpy when installed,
+    so that only the points having a close latitude are compared on a grid.
+    """
+    lat_deg = tolerance_m / METERS_PER_DEGREE
+    candidates = _close_latitudes(lat, lat_deg)
+    if not candidates:
+        return list(range(len(lat)))
+    # Cells of at least tolerance_m in both directions: the points within
+    # tolerance_m of a point lie in its cell or in a neighbouring one.
+    max_lat = max(abs(lat[i]) for i in candidates)
+    lon_deg = lat_deg / max(math.cos(math.radians(max_lat)), 1e-6)
+    cells: dict[tuple[int, int], list[int]] = {}
+    dropped = set()
+    for i in candidates:
+        row, col = math.floor(lat[i] / lat_deg), math.floor(lon[i] / lon_deg)
+        if any(
+            distance_m(lat[i], lon[i], lat[j], lon[j]) <= tolerance_m
+            for r in (row - 1, row, row + 1)
+            for c in (col - 1, col, col + 1)
+            for j in cells.get((r, c), ())
+        ):
+            dropped.add(i)
+        else:
+            cells.setdefault((row, col), []).append(i)
+    return [i for i in range(len(lat)) if i not in dropped]
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """The haversine distance in meters between two coordinates."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(math.sqrt(a), 1.0))
+
+
+class GeoPoints:
+    """
+    Geo tags with their center coordinates in packed arrays.
+
+    Args:
+        ids (list[str]): The geo tags.
+        lat (Iterable[float]): Center latitude of every geo tag.
+        lon (Iterable[float]): Center longitude of every geo tag.
+    """
+
+    def __init__(self, ids: list[str], lat: Iterable[float], lon: Iterable[float]):
+        self.ids = ids
+        self.lat = array("d", lat)
+        self.lon = array("d", lon)
+        if not len(ids) == len(self.lat) == len(self.lon):
+            raise ValueError("ids, lat and lon should have the same length.")
+
+    @classmethod
+    def from_results(cls, results: list[dict[str, Any]]) -> "GeoPoints":
+        """The points of the results of the `/geo/locations` endpoint."""
+        locations = [geo["geoLocation"] for geo in results]
+        return cls(
+            [location["id"] for location in locations],
+            (location["center"]["lat"] for location in locations),
+            (location["center"]["lon"] for location in locations),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def unique(self, tolerance_m: float = DEFAULT_TOLERANCE_M) -> list[int]:
+        """
+        The indexes of the points without a previous point within tolerance_m meters,
+        in order. A tolerance of 0 compares the exact coordinates.
+        """
+        first = {}
+        for i, center in enumerate(zip(self.lat, self.lon, strict=True)):
+            first.setdefault(center, i)
+        kept = list(first.values())
+        if tolerance_m <= 0 or len(kept) < 2:
+            return kept
+        lat, lon = zip(*first, strict=True)
+        return [kept[i] for i in _drop_near(lat, lon, tolerance_m)]
+
+    def index(self, cell_m: float = 1000.0) -> "GridIndex":
+        """A grid index of the points with cells of cell_m meters."""
+        return GridIndex(self, cell_m)
+
+
+class GridIndex:
+    """
+    Spatial index of GeoPoints hashing the centers to a grid of square cells in degrees,
+    `cell_m` meters high.
+
+    Args:
+        points (GeoPoints): The indexed points.
+        cell_m (float): The height of a cell in meters. Defaults to 1000.
+        indexes (Iterable[int], optional): The indexes of the points to add. Defaults to all of them.
+    """
+
+    def __init__(
+        self,
+        points: GeoPoints,
+        cell_m: float = 1000.0,
+        indexes: Optional[Iterable[int]] = None,
+    ):
+        if cell_m <= 0:
+            raise ValueError("cell_m should be a positive number.")
+        self.points = points
+        self.cell_deg = cell_m / METERS_PER_DEGREE
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        for i in range(len(points)) if indexes is None else indexes:
+            self.add(i)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, i: int) -> None:
+        """Add the point at index i."""
+        cell = self._cell(self.points.lat[i], self.points.lon[i])
+        self._cells.setdefault(cell, []).append(i)
+
+    def within_indexes(
+        self, lat: float, lon: float, radius_m: float
+    ) -> list[tuple[float, int]]:
+        """The (distance, index) of the indexed points within radius_m, nearest first."""
+        radius_deg = radius_m / METERS_PER_DEGREE
+        lon_radius_deg = radius_deg / max(math.cos(math.radians(lat)), 1e-6)
+        row, col = self._cell(lat, lon)
+        rows = math.ceil(radius_deg / self.cell_deg)
+        cols = math.ceil(lon_radius_deg / self.cell_deg)
+        points = self.points
+        found = []
+        if (2 * rows + 1) * (2 * cols + 1) > len(self._cells):
+            candidates = (i for cell in self._cells.values() for i in cell)
+        else:
+            candidates = (
+                i
+                for r in range(row - rows, row + rows + 1)
+                for c in range(col - cols, col + cols + 1)
+                for i in self._cells.get((r, c), ())
+            )
+        for i in candidates:
+            distance = distance_m(lat, lon, points.lat[i], points.lon[i])
+            if distance <= radius_m:
+                found.append((distance, i))
+        found.sort()
+        return found
+
+    def within(self, lat: float, lon: float, radius_m: float) -> list[str]:
+        """The geo tags within radius_m meters of the coordinates, nearest first."""
+        return [self.points.ids[i] for _, i in self.within_indexes(lat, lon, radius_m)]
+
+    def nearest(self, lat: float, lon: float) -> Optional[str]:
+        """The geo tag nearest to the coordinates, or None if the index is empty."""
+        radius_m = self.cell_deg * METERS_PER_DEGREE
+        while self._cells:
+            found = self.within_indexes(lat, lon, radius_m)
+            if found:
+                return self.points.ids[found[0][1]]
+            radius_m *= 2
+        return None
+
+
+def unique_geo_results(
+    results: list[dict[str, Any]], tolerance_m: float = DEFAULT_TOLERANCE_M
+) -> list[dict[str, Any]]:
+    """The `/geo/locations` results without the ones centered within tolerance_m of a previous one."""
+    # The geo tags of a place share its exact center, so that the exact duplicates are
+    # dropped first and the tolerance only compares the remaining centers.
+    first = {}
+    for result in results:
+        center = result["geoLocation"]["center"]
+        first.setdefault((center["lat"], center["lon"]), result)
+    unique = list(first.values())
+    if tolerance_m <= 0 or len(unique) < 2:
+        return unique
+    lat, lon = zip(*first, strict=True)
+    return [unique[i] for i in _drop_near(lat, lon, tolerance_m)]
@@ -0,0 +1,197 @@
+"""
+Offline index of the geo tags returned by the `/geo/locations` endpoint.
+
+The index maps a normalized (language, location name) pair to the geo locations
+the API answered for it. It is stored as sorted keys with flat parallel arrays
+(CSR layout) and looked up with a binary search.
+
+Build an index from saved responses, and pass it with
+`Homegate(geo_index=GeoIndex.load(path))`:
+
+    python -m homegater.geo_index build OUTPUT INPUT [INPUT ...]
+
+Every input is a json file with an object or a list of objects, or a jsonl file,
+of the form {"name": "Horgen", "lang": "en", "response": {...}} where response
+is the saved body of `/geo/locations?lang=en&name=Horgen`.
+"""
+
+import json
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any, Optional
+
+INDEX_VERSION = 1
+ANY_LANG = "*"
+
+
+def normalize_location_name(name: str) -> str:
+    """Lowercase the name, strip the accents and collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", name.strip().lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def _index_key(name: str, lang: str) -> str:
+    name = normalize_location_name(name)
+    if name.isdigit():
+        # Zip codes resolve the same way in every language.
+        lang = ANY_LANG
+    return f"{lang}:{name}"
+
+
+class GeoIndex:
+    """
+    Read only index of recorded geo location lookups.
+
+    Args:
+        keys (list[str]): Sorted "lang:name" keys.
+        offsets (list[int]): Start of the results of every key, followed by the total length.
+        totals (list[int]): The total number of results the API reported for every key.
+        ids (list[str]): Geo tag of every result.
+        lat (Iterable[float]): Center latitude of every result.
+        lon (Iterable[float]): Center longitude of every result.
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        offsets: list[int],
+        totals: list[int],
+        ids: list[str],
+        lat: Iterable[float],
+        lon: Iterable[float],
+    ):
+        if len(offsets) != len(keys) + 1 or len(totals) != len(keys):
+            raise ValueError("Corrupted geo index: keys and offsets do not match.")
+        self.keys = keys
+        self.offsets = array("I", offsets)
+        self.totals = array("I", totals)
+        self.ids = ids
+        self.lat = array("d", lat)
+        self.lon = array("d", lon)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(
+        self, location_name: str, lang: str, results_count: int = 100
+    ) -> Optional[list[dict[str, Any]]]:
+        """
+        Return the recorded `/geo/locations` results for the location, or None when
+        the index cannot answer the lookup as the API would.
+        """
+        key = _index_key(location_name, lang)
+        pos = bisect_left(self.keys, key)
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return None
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        if end - start < min(results_count, self.totals[pos]):
+            # The recorded response was smaller than the requested one.
+            return None
+        end = min(end, start + results_count)
+        return [
+            {
+                "geoLocation": {
+                    "id": self.ids[i],
+                    "center": {"lat": self.lat[i], "lon": self.lon[i]},
+                }
+            }
+            for i in range(start, end)
+        ]
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> "GeoIndex":
+        """
+        Build an index from saved lookups of the form {"name", "lang", "response"}.
+        Later records of the same key replace earlier ones.
+        """
+        entries = {}
+        for record in records:
+            response = record["response"]
+            results = [
+                (
+                    geo["geoLocation"]["id"],
+                    geo["geoLocation"]["center"]["lat"],
+                    geo["geoLocation"]["center"]["lon"],
+                )
+                for geo in response["results"]
+            ]
+            key = _index_key(record["name"], record["lang"])
+            entries[key] = (response.get("total", len(results)), results)
+
+        keys, offsets, totals, ids, lat, lon = [], [0], [], [], [], []
+        for key in sorted(entries):
+            total, results = entries[key]
+            keys.append(key)
+            totals.append(total)
+            for geo_id, geo_lat, geo_lon in results:
+                ids.append(geo_id)
+                lat.append(geo_lat)
+                lon.append(geo_lon)
+            offsets.append(len(ids))
+        return cls(keys, offsets, totals, ids, lat, lon)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "keys": self.keys,
+            "offsets": self.offsets.tolist(),
+            "totals": self.totals.tolist(),
+            "ids": self.ids,
+            "lat": self.lat.tolist(),
+            "lon": self.lon.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "GeoIndex":
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported geo index version: {data.get('version')}")
+        return cls(
+            data["keys"],
+            data["offsets"],
+            data["totals"],
+            data["ids"],
+            data["lat"],
+            data["lon"],
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "GeoIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _read_records(path: str) -> Iterable[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m homegater.geo_index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser(
+        "build", help="Build a geo index from saved /geo/locations responses."
+    )
+    build.add_argument("output", help="Path of the index file to write.")
+    build.add_argument("inputs", nargs="+", help="Saved json or jsonl lookups.")
+    args = parser.parse_args(argv)
+
+    records = [record for path in args.inputs for record in _read_records(path)]
+    index = GeoIndex.from_records(records)
+    index.save(args.output)
+    print(f"Wrote {len(index)} locations to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
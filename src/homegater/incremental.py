@@ -0,0 +1,130 @@
+"""
+Incremental "new since last run" scans of a search.
+
+The search results are sorted by creation date, newest first, and paged only down
+to the cursor of the previous run: the creation date of the newest listing seen,
+plus the ids of the listings seen at that date. The cursors are persisted per query
+in a SQLite database so that steady state polling usually takes a single request.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+def listing_created_at(result: dict[str, Any]) -> str:
+    """The ISO creation date of a search result."""
+    listing = result.get("listing") or {}
+    meta = listing.get("meta") or {}
+    return meta.get("createdAt") or listing.get("createdAt") or ""
+
+
+@dataclass
+class Cursor:
+    """The newest creation date seen for a query, and the ids seen at that date."""
+
+    created_at: str
+    seen_ids: list[str] = field(default_factory=list)
+
+
+class CursorStore:
+    """
+    Cursors of the incremental scans persisted in a SQLite database.
+
+    Args:
+        path (str): The path of the database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors "
+                "(key TEXT PRIMARY KEY, created_at TEXT NOT NULL, seen_ids TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Cursor]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, seen_ids FROM cursors WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Cursor(row[0], json.loads(row[1]))
+
+    def set(self, key: str, cursor: Cursor) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursors (key, created_at, seen_ids, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, cursor.created_at, json.dumps(cursor.seen_ids), time.time()),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cursors WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class IncrementalScan:
+    """
+    Collect the new results of the pages of a search sorted by creation date, newest
+    first, until the cursor of the previous run is reached.
+
+    Args:
+        cursor (Cursor, optional): The cursor of the previous run. Defaults to none, every result is new.
+        created_at (Callable): The ISO creation date of a search result. Defaults to listing_created_at.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[Cursor] = None,
+        created_at: Callable[[dict[str, Any]], str] = listing_created_at,
+    ):
+        self.cursor = cursor
+        self.created_at = created_at
+        self.new = []
+        self._seen = set(cursor.seen_ids) if cursor is not None else set()
+        self._new_ids = set()
+
+    def feed(self, results: list[dict[str, Any]]) -> bool:
+        """
+        Collect the new results of a page.
+        Returns True once the cursor is reached and no further page is needed.
+        """
+        for result in results:
+            listing_id = str(result.get("id"))
+            if self.cursor is not None:
+                created_at = self.created_at(result)
+                if created_at < self.cursor.created_at:
+                    return True
+                if created_at == self.cursor.created_at and listing_id in self._seen:
+                    continue
+            # Results shift between pages when listings are added during the scan.
+            if listing_id not in self._new_ids:
+                self._new_ids.add(listing_id)
+                self.new.append(result)
+        return False
+
+    def next_cursor(self) -> Optional[Cursor]:
+        """The cursor of the next run."""
+        if not self.new:
+            return self.cursor
+        newest = max(self.created_at(result) for result in self.new)
+        seen_ids = {
+            str(result.get("id"))
+            for result in self.new
+            if self.created_at(result) == newest
+        }
+        if self.cursor is not None and self.cursor.created_at == newest:
+            seen_ids.update(self.cursor.seen_ids)
+        return Cursor(newest, sorted(seen_ids))
@@ -0,0 +1,316 @@
+"""
+Instrumentation hooks of the clients.
+
+An `Instrumentation` passed to `Homegate(instrumentation=...)` is called at every
+stage of the API requests: start, first byte, end (status, duration and bytes),
+JSON decode, retry and cache lookup, and on the errors of the searches and geo
+lookups. Without instrumentation the clients skip the hooks entirely.
+
+`Metrics` aggregates the hooks into per-endpoint latency histograms and counters,
+exported in the Prometheus text format:
+
+    metrics = Metrics()
+    api = Homegate(instrumentation=metrics)
+    api.search_rent_listings(location="8001")
+    print(metrics.to_prometheus())
+
+`OpenTelemetryMetrics` records the same measurements with the instruments of an
+OpenTelemetry meter, e.g. `opentelemetry.metrics.get_meter("homegater")`.
+"""
+
+import bisect
+import threading
+from typing import Any, Optional
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Instrumentation:
+    """
+    Hooks called by the clients, doing nothing by default. Subclass it and override
+    the hooks of interest. The endpoint is "geo", "search" or "listing".
+    """
+
+    def request_start(self, endpoint: str, method: str, url: str) -> None:
+        """A request is sent."""
+
+    def first_byte(self, endpoint: str, seconds: float) -> None:
+        """The response headers arrived, seconds after the request start."""
+
+    def request_end(
+        self,
+        endpoint: str,
+        status: Optional[int],
+        seconds: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        """
+        The response body was read, or the request failed with a None status.
+        bytes_received counts the bytes on the wire, before decompression.
+        """
+
+    def decode(self, endpoint: str, seconds: float, size: int) -> None:
+        """A response body of size bytes was decoded."""
+
+    def retry(self, endpoint: str, reason: str) -> None:
+        """A request is retried, the reason is the status code, "throttled" or the error type."""
+
+    def cache(self, cache: str, hit: bool) -> None:
+        """A lookup of the "geo_index", "geo_cache" or "search_cache"."""
+
+    def error(self, endpoint: str, error: Exception) -> None:
+        """A search or geo lookup failed."""
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values.
+
+    Args:
+        buckets (tuple[float, ...]): The upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """The (upper bound, count of the values below it) of every bucket, +Inf last."""
+        total = 0
+        cumulative = []
+        for bound, count in zip(
+            self.buckets + (float("inf"),), self.counts, strict=True
+        ):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for _, value in pairs
+    )
+    return (
+        "{"
+        + ",".join(
+            f'{name}="{value}"' for (name, _), value in zip(pairs, escaped, strict=True)
+        )
+        + "}"
+    )
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics(Instrumentation):
+    """
+    Per-endpoint latency histograms and request, byte, retry, cache and error counters.
+
+    Args:
+        buckets (tuple[float, ...]): The upper bounds in seconds of the latency buckets. Defaults to DEFAULT_BUCKETS.
+        prefix (str): The prefix of the exported metric names. Defaults to "homegater".
+    """
+
+    HELP = {
+        "requests_total": ("counter", "API requests by endpoint and status."),
+        "request_duration_seconds": ("histogram", "Duration of the API requests."),
+        "first_byte_seconds": ("histogram", "Time to the response headers."),
+        "decode_seconds": ("histogram", "Time to decode the response bodies."),
+        "request_bytes_total": ("counter", "Bytes of the request bodies."),
+        "response_bytes_total": ("counter", "Bytes of the responses on the wire."),
+        "decoded_bytes_total": ("counter", "Bytes of the decoded response bodies."),
+        "retries_total": ("counter", "Retried requests by reason."),
+        "cache_lookups_total": ("counter", "Cache lookups by cache and result."),
+        "errors_total": ("counter", "Failed searches and geo lookups by error type."),
+    }
+
+    def __init__(
+        self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "homegater"
+    ):
+        self.buckets = buckets
+        self.prefix = prefix
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def first_byte(self, endpoint: str, seconds: float) -> None:
+        self._observe("first_byte_seconds", seconds, endpoint=endpoint)
+
+    def request_end(
+        self,
+        endpoint: str,
+        status: Optional[int],
+        seconds: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        self._inc(
+            "requests_total",
+            endpoint=endpoint,
+            status="error" if status is None else str(status),
+        )
+        self._observe("request_duration_seconds", seconds, endpoint=endpoint)
+        self._inc("request_bytes_total", bytes_sent, endpoint=endpoint)
+        self._inc("response_bytes_total", bytes_received, endpoint=endpoint)
+
+    def decode(self, endpoint: str, seconds: float, size: int) -> None:
+        self._observe("decode_seconds", seconds, endpoint=endpoint)
+        self._inc("decoded_bytes_total", size, endpoint=endpoint)
+
+    def retry(self, endpoint: str, reason: str) -> None:
+        self._inc("retries_total", endpoint=endpoint, reason=reason)
+
+    def cache(self, cache: str, hit: bool) -> None:
+        self._inc("cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+    def error(self, endpoint: str, error: Exception) -> None:
+        self._inc("errors_total", endpoint=endpoint, type=type(error).__name__)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """The value of a counter, e.g. metrics.counter("requests_total", endpoint="search", status="200")."""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        """The histogram of a metric, e.g. metrics.histogram("request_duration_seconds", endpoint="geo")."""
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in self._histograms.items()
+            )
+        lines = []
+        for name, (kind, help_text) in self.HELP.items():
+            full_name = f"{self.prefix}_{name}"
+            if kind == "counter":
+                samples = [
+                    f"{full_name}{_labels(labels)} {_number(value)}"
+                    for (metric, labels), value in counters
+                    if metric == name
+                ]
+            else:
+                samples = []
+                for (metric, labels), buckets, total, count in histograms:
+                    if metric != name:
+                        continue
+                    samples.extend(
+                        f"{full_name}_bucket{_labels(labels, le=_number(bound))} {n}"
+                        for bound, n in buckets
+                    )
+                    samples.append(f"{full_name}_sum{_labels(labels)} {total!r}")
+                    samples.append(f"{full_name}_count{_labels(labels)} {count}")
+            if samples:
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class OpenTelemetryMetrics(Instrumentation):
+    """
+    Record the hooks with the counters and histograms of an OpenTelemetry meter.
+
+    Args:
+        meter: The meter, e.g. opentelemetry.metrics.get_meter("homegater").
+        prefix (str): The prefix of the instrument names. Defaults to "homegater".
+    """
+
+    def __init__(self, meter: Any, prefix: str = "homegater"):
+        self.requests = meter.create_counter(
+            f"{prefix}.requests", unit="1", description="API requests."
+        )
+        self.duration = meter.create_histogram(
+            f"{prefix}.request.duration",
+            unit="s",
+            description="Duration of the API requests.",
+        )
+        self.first_byte_duration = meter.create_histogram(
+            f"{prefix}.request.first_byte",
+            unit="s",
+            description="Time to the response headers.",
+        )
+        self.decode_duration = meter.create_histogram(
+            f"{prefix}.decode.duration",
+            unit="s",
+            description="Time to decode the response bodies.",
+        )
+        self.bytes = meter.create_counter(
+            f"{prefix}.bytes", unit="By", description="Bytes sent and received."
+        )
+        self.retries = meter.create_counter(
+            f"{prefix}.retries", unit="1", description="Retried requests."
+        )
+        self.cache_lookups = meter.create_counter(
+            f"{prefix}.cache.lookups", unit="1", description="Cache lookups."
+        )
+        self.errors = meter.create_counter(
+            f"{prefix}.errors", unit="1", description="Failed searches and geo lookups."
+        )
+
+    def first_byte(self, endpoint: str, seconds: float) -> None:
+        self.first_byte_duration.record(seconds, {"endpoint": endpoint})
+
+    def request_end(
+        self,
+        endpoint: str,
+        status: Optional[int],
+        seconds: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        attributes = {"endpoint": endpoint, "status": str(status or "error")}
+        self.requests.add(1, attributes)
+        self.duration.record(seconds, attributes)
+        self.bytes.add(bytes_sent, {"endpoint": endpoint, "direction": "sent"})
+        self.bytes.add(bytes_received, {"endpoint": endpoint, "direction": "received"})
+
+    def decode(self, endpoint: str, seconds: float, size: int) -> None:
+        self.decode_duration.record(seconds, {"endpoint": endpoint})
+
+    def retry(self, endpoint: str, reason: str) -> None:
+        self.retries.add(1, {"endpoint": endpoint, "reason": reason})
+
+    def cache(self, cache: str, hit: bool) -> None:
+        self.cache_lookups.add(1, {"cache": cache, "result": "hit" if hit else "miss"})
+
+    def error(self, endpoint: str, error: Exception) -> None:
+        self.errors.add(1, {"endpoint": endpoint, "type": type(error).__name__})
@@ -0,0 +1,215 @@
+"""
+Typed, compact models of the `/search/listings` and `/listings/listing` responses.
+
+The commonly used fields of a listing are decoded eagerly into slotted attributes,
+while the full payload is kept as compact json bytes and only decoded when `raw`
+is accessed. This keeps tens of thousands of listings cheap to hold in memory:
+
+    page = SearchPage.from_response(api.search_rent_listings(location="8001"))
+    prices = page.to_columns()["price"]
+
+A page built from the raw body of a response with `SearchPage.from_bytes` keeps the
+json text of every result as it was received, without encoding it again.
+"""
+
+import json
+import re
+from array import array
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar, Union
+
+LISTING_FIELDS = (
+    "id",
+    "offer_type",
+    "category",
+    "price",
+    "currency",
+    "rooms",
+    "living_space",
+    "postal_code",
+    "locality",
+    "latitude",
+    "longitude",
+)
+NUMERIC_COLUMNS = ("price", "rooms", "living_space", "latitude", "longitude")
+TEXT_COLUMNS = ("id", "offer_type", "category", "currency", "postal_code", "locality")
+
+T = TypeVar("T")
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _price(prices: dict[str, Any]) -> Optional[float]:
+    """The gross rent of a rent listing, or the price of a buy listing."""
+    rent = prices.get("rent") or {}
+    buy = prices.get("buy") or {}
+    for value in (rent.get("gross"), rent.get("net"), buy.get("price")):
+        if value is not None:
+            return _number(value)
+    return None
+
+
+def listing_row(result: dict[str, Any]) -> tuple:
+    """
+    The LISTING_FIELDS of a search result or of a `get_listing` response, in order.
+    """
+    listing = result.get("listing") or result
+    prices = listing.get("prices") or {}
+    characteristics = listing.get("characteristics") or {}
+    address = listing.get("address") or {}
+    coordinates = address.get("geoCoordinates") or {}
+    categories = listing.get("categories") or [None]
+    return (
+        str(result.get("id") or listing.get("id")),
+        listing.get("offerType"),
+        categories[0],
+        _price(prices),
+        prices.get("currency"),
+        _number(characteristics.get("numberOfRooms")),
+        _number(characteristics.get("livingSpace")),
+        address.get("postalCode"),
+        address.get("locality"),
+        _number(coordinates.get("latitude")),
+        _number(coordinates.get("longitude")),
+    )
+
+
+def _expect(text: str, end: int, char: str) -> int:
+    """The position after char and the whitespace following it, at end."""
+    if text[end : end + 1] != char:
+        raise json.JSONDecodeError(f"Expecting {char!r}", text, end)
+    return _WHITESPACE.match(text, end + 1).end()
+
+
+def _split_results(
+    text: str, build: Callable[[Any, str], T]
+) -> tuple[dict[str, Any], list[T]]:
+    """
+    Decode a search response but its results, which are passed one by one with their
+    json text to build, so that their decoded dicts are not all held at once.
+    """
+    decode, skip = _DECODER.raw_decode, _WHITESPACE.match
+    response, results = {}, []
+    end = _expect(text, skip(text, 0).end(), "{")
+    while text[end : end + 1] != "}":
+        key, end = decode(text, end)
+        end = _expect(text, skip(text, end).end(), ":")
+        if key == "results" and text[end : end + 1] == "[":
+            end = skip(text, end + 1).end()
+            while text[end : end + 1] != "]":
+                result, stop = decode(text, end)
+                results.append(build(result, text[end:stop]))
+                end = skip(text, stop).end()
+                if text[end : end + 1] == ",":
+                    end = skip(text, end + 1).end()
+            end += 1
+        else:
+            response[key], end = decode(text, end)
+        end = skip(text, end).end()
+        if text[end : end + 1] == ",":
+            end = skip(text, end + 1).end()
+    return response, results
+
+
+@dataclass(slots=True)
+class Listing:
+    """
+    A listing with its commonly used fields. The other fields are available from `raw`,
+    decoded from the stored payload on first access.
+    """
+
+    id: str
+    offer_type: Optional[str] = None
+    category: Optional[str] = None
+    price: Optional[float] = None
+    currency: Optional[str] = None
+    rooms: Optional[float] = None
+    living_space: Optional[float] = None
+    postal_code: Optional[str] = None
+    locality: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    _payload: bytes = field(default=b"{}", repr=False, compare=False)
+    _raw: Optional[dict[str, Any]] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_result(
+        cls, result: dict[str, Any], payload: Union[bytes, str, None] = None
+    ) -> "Listing":
+        """
+        Build the listing from a search result or from a `get_listing` response, and
+        the json text it was decoded from when known, else it is encoded again.
+        """
+        if payload is None:
+            payload = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        return cls(*listing_row(result), _payload=payload)
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        """The full payload of the listing, decoded once and then kept."""
+        if self._raw is None:
+            self._raw = json.loads(self._payload)
+        return self._raw
+
+
+@dataclass(slots=True)
+class SearchPage:
+    """A page of search results as Listing objects."""
+
+    from_index: int
+    size: int
+    total: int
+    listings: list[Listing]
+
+    @classmethod
+    def from_response(cls, response: dict[str, Any]) -> "SearchPage":
+        return cls(
+            from_index=response.get("from", 0),
+            size=response.get("size", 0),
+            total=response.get("total", 0),
+            listings=[Listing.from_result(r) for r in response.get("results", [])],
+        )
+
+    @classmethod
+    def from_bytes(cls, content: Union[bytes, str]) -> "SearchPage":
+        """
+        The page of the raw body of a `/search/listings` response, keeping the json
+        text of every result as the payload of its listing.
+        """
+        text = content.decode() if isinstance(content, bytes) else content
+        response, listings = _split_results(text, Listing.from_result)
+        return cls(
+            from_index=response.get("from", 0),
+            size=response.get("size", 0),
+            total=response.get("total", 0),
+            listings=listings,
+        )
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def __iter__(self) -> Iterator[Listing]:
+        return iter(self.listings)
+
+    def to_columns(self) -> dict[str, Union[array, list[Optional[str]]]]:
+        """
+        The eager fields of the listings as columns: the numeric ones as `array("d")`
+        with NaN for the missing values, usable with numpy.frombuffer, and the text
+        ones as lists.
+        """
+        columns = {}
+        for name in NUMERIC_COLUMNS:
+            values = (getattr(listing, name) for listing in self.listings)
+            columns[name] = array(
+                "d", (float("nan") if v is None else v for v in values)
+            )
+        for name in TEXT_COLUMNS:
+            columns[name] = [getattr(listing, name) for listing in self.listings]
+        return columns
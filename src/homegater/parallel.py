@@ -0,0 +1,411 @@
+"""
+Multi-process crawls of many searches, for refreshes whose JSON decoding does not
+fit in one core.
+
+A crawl plan is a list of searches, e.g. every location and category with
+`crawl_plan`. The first page of every search is fetched by a worker process, which
+resolves its location, and its other pages are then fetched by any worker. Every
+worker keeps its own pooled `Homegate` client, and all of them draw their requests
+from a single rate budget kept by a coordinator process.
+
+The results stream to one sink in the calling process: a `JsonlSink`, a
+`ParquetSink` or any callable taking a list of results. With a `CrawlCheckpoint`
+the plan of every search and the pages written are persisted, each time the sink is
+flushed, so that an interrupted crawl resumes with the missing pages only. The
+results of the pages written after the last checkpoint are written again on resume.
+
+    with JsonlSink("listings.jsonl") as sink:
+        stats = ProcessCrawler(processes=4, rate_limit=20, checkpoint="crawl.sqlite").crawl(
+            crawl_plan("RENT", ["8001", "8002"], ["APARTMENT", "HOUSE"]), sink
+        )
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseManager
+from typing import Any, Optional, Union
+
+from homegater.cache import query_fingerprint
+from homegater.client import Homegate
+from homegater.export import arrow_schema, pq, to_arrow
+from homegater.ratelimit import RateLimiter
+
+Sink = Union["JsonlSink", "ParquetSink", Callable[[list[dict[str, Any]]], Any]]
+
+# The client of the worker process, created by _init_worker.
+_client: Optional[Homegate] = None
+
+
+def crawl_plan(
+    offer_type: str, locations: Iterable[str], categories: Iterable[str], **kwargs
+) -> list[dict[str, Any]]:
+    """
+    The searches of every location and category, each category searched on its own.
+    The keyword arguments are the additional search parameters of every search.
+    """
+    categories = list(categories)
+    return [
+        {
+            "offer_type": offer_type,
+            "categories": [category],
+            "location": location,
+            **kwargs,
+        }
+        for location in locations
+        for category in categories
+    ]
+
+
+@dataclass
+class CrawlStats:
+    """Counters of a crawl, with the pages restored from the checkpoint and the errors."""
+
+    searches: int = 0
+    pages: int = 0
+    results: int = 0
+    skipped_pages: int = 0
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+class CrawlCheckpoint:
+    """
+    Plans and written pages of the searches of a crawl, persisted in a SQLite database.
+
+    Args:
+        path (str): The path of the database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches "
+                "(key TEXT PRIMARY KEY, query TEXT NOT NULL, total INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages "
+                "(key TEXT NOT NULL, from_index INTEGER NOT NULL, PRIMARY KEY (key, from_index))"
+            )
+
+    def get_search(self, key: str) -> Optional[tuple[dict[str, Any], int]]:
+        """The final query and the total results of a search, if its first page was fetched."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query, total FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set_search(self, key: str, query: dict[str, Any], total: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, query, total) VALUES (?, ?, ?)",
+                (key, json.dumps(query), total),
+            )
+
+    def done_pages(self, key: str) -> set[int]:
+        """The first indexes of the pages of a search already written to the sink."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT from_index FROM pages WHERE key = ?", (key,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_pages(self, pages: list[tuple[str, int]]) -> None:
+        """Record the (search key, first index) of pages written to the sink."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pages (key, from_index) VALUES (?, ?)", pages
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class JsonlSink:
+    """
+    Append the results to a JSON lines file, one result per line.
+
+    Args:
+        path (str): The path of the file, appended to when it exists.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, results: list[dict[str, Any]]) -> None:
+        self._file.writelines(
+            json.dumps(result, ensure_ascii=False) + "\n" for result in results
+        )
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ParquetSink:
+    """
+    Write the results to Parquet files in a directory, with the schema of homegater.export.
+    Every flush completes a file, so the files of an interrupted crawl stay readable, and
+    the directory can be read as one dataset, e.g. with pyarrow.parquet.read_table.
+    It requires the optional pyarrow dependency (pip install homegater[export]).
+
+    Args:
+        directory (str): The directory of the files, created if missing.
+        batch_size (int): The number of rows of the row groups. Defaults to 10000.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 10_000):
+        if pq is None:
+            raise ImportError(
+                "ParquetSink requires pyarrow. Install it with: pip install homegater[export]"
+            )
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch_size = batch_size
+        self._parts = len(os.listdir(directory))
+        self._rows = []
+        self._writer = None
+
+    def write(self, results: list[dict[str, Any]]) -> None:
+        self._rows.extend(results)
+        if len(self._rows) >= self.batch_size:
+            self._write_rows()
+
+    def _write_rows(self) -> None:
+        if not self._rows:
+            return
+        if self._writer is None:
+            path = os.path.join(self.directory, f"part-{self._parts:05d}.parquet")
+            self._parts += 1
+            self._writer = pq.ParquetWriter(path, arrow_schema())
+        for batch in to_arrow(self._rows, self.batch_size):
+            self._writer.write_batch(batch)
+        self._rows = []
+
+    def flush(self) -> None:
+        self._write_rows()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _Coordinator(BaseManager):
+    """Server process keeping the rate budget shared by the workers."""
+
+
+_Coordinator.register("RateLimiter", RateLimiter)
+
+
+def _init_worker(client_kwargs: dict[str, Any], rate_limiter: Any) -> None:
+    global _client
+    _client = Homegate(**client_kwargs, rate_limit=rate_limiter)
+
+
+def _first_page(
+    search: dict[str, Any], page_size: int
+) -> tuple[dict[str, Any], Optional[dict[str, Any]]]:
+    """The final query of a search, with its resolved location, and its first page."""
+    params = dict(search)
+    geo_tags = _client._resolve_search_geo_tags(params.pop("location", None))
+    query = _client._build_search_query(
+        params.pop("offer_type"),
+        params.pop("categories"),
+        geo_tags,
+        params.pop("sort_by", "dateCreated"),
+        params.pop("sort_direction", "desc"),
+        0,
+        page_size,
+        params,
+    )
+    return query, _client._search(query) or None
+
+
+def _page(query: dict[str, Any], from_index: int) -> Optional[list[dict[str, Any]]]:
+    """The results of a page of a search, or None if the search failed."""
+    page = _client._search({**query, "from": from_index})
+    return page.get("results", []) if page else None
+
+
+class ProcessCrawler:
+    """
+    Crawl the pages of many searches in worker processes under a shared rate budget.
+
+    Args:
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        rate_limit (float | dict, optional): The requests per second sent to each endpoint by all the workers together,
+            or a dict of rates by endpoint. Defaults to no limit.
+        checkpoint (CrawlCheckpoint | str, optional): The checkpoint of the crawl, or the path of its database. Defaults to none.
+        page_size (int): The number of results per request. Defaults to 20.
+        checkpoint_every (int): The number of pages written between two flushes of the sink and the checkpoint. Defaults to 50.
+        max_pending (int, optional): The number of pages requested at once. Defaults to twice the number of processes.
+        **client_kwargs: The arguments of the Homegate client of every worker, which should be picklable.
+    """
+
+    def __init__(
+        self,
+        processes: int = None,
+        *,
+        rate_limit: Union[float, dict[str, float]] = None,
+        checkpoint: Union[CrawlCheckpoint, str] = None,
+        page_size: int = 20,
+        checkpoint_every: int = 50,
+        max_pending: int = None,
+        **client_kwargs,
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self.rate_limit = rate_limit
+        if isinstance(checkpoint, str):
+            checkpoint = CrawlCheckpoint(checkpoint)
+        self.checkpoint = checkpoint
+        self.page_size = page_size
+        self.checkpoint_every = checkpoint_every
+        self.max_pending = max_pending or 2 * self.processes
+        self.client_kwargs = client_kwargs
+
+    def _search_key(self, search: dict[str, Any]) -> str:
+        return query_fingerprint({**search, "size": self.page_size})
+
+    def crawl(self, searches: Iterable[dict[str, Any]], sink: Sink) -> CrawlStats:
+        """
+        Crawl all the pages of the searches into the sink, each listing written once.
+
+        Args:
+            searches (Iterable[Dict[str, Any]]): The keyword arguments of search_listings of every search, e.g. from crawl_plan.
+            sink (JsonlSink | ParquetSink | Callable): The sink of the results, or a callable called with every page of new results.
+
+        Returns:
+            CrawlStats: The counters of the crawl.
+        """
+        stats = CrawlStats()
+        start = time.perf_counter()
+        write = sink.write if hasattr(sink, "write") else sink
+        context = multiprocessing.get_context("spawn")
+        coordinator = None
+        rate_limiter = None
+        if self.rate_limit:
+            coordinator = _Coordinator(ctx=context)
+            coordinator.start()
+            rate_limiter = coordinator.RateLimiter(self.rate_limit)
+
+        searches = iter(searches)
+        tasks = deque()
+        pending = {}
+        written = []
+        seen = set()
+
+        def plan(key: str, query: dict[str, Any], total: int, done: set[int]) -> None:
+            tasks.extend(
+                (key, query, from_index)
+                for from_index in range(0, total, self.page_size)
+                if from_index not in done
+            )
+
+        def submit(executor: ProcessPoolExecutor) -> bool:
+            while not tasks:
+                search = next(searches, None)
+                if search is None:
+                    return False
+                stats.searches += 1
+                key = self._search_key(search)
+                planned = self.checkpoint.get_search(key) if self.checkpoint else None
+                if planned is None:
+                    future = executor.submit(_first_page, search, self.page_size)
+                    pending[future] = (key, 0, search)
+                    return True
+                done = self.checkpoint.done_pages(key)
+                stats.skipped_pages += len(done)
+                plan(key, *planned, done)
+            key, query, from_index = tasks.popleft()
+            future = executor.submit(_page, query, from_index)
+            pending[future] = (key, from_index, None)
+            return True
+
+        def flush() -> None:
+            if hasattr(sink, "flush"):
+                sink.flush()
+            if self.checkpoint is not None and written:
+                self.checkpoint.mark_pages(written)
+            written.clear()
+
+        executor = ProcessPoolExecutor(
+            self.processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.client_kwargs, rate_limiter),
+        )
+        try:
+            while len(pending) < self.max_pending and submit(executor):
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, from_index, search = pending.pop(future)
+                    try:
+                        results = future.result()
+                        if search is not None:
+                            query, first_page = results
+                            results = first_page and first_page.get("results", [])
+                        if results is None:
+                            raise Exception("Error searching listings.")
+                    except Exception as e:
+                        stats.failed += 1
+                        stats.errors.append(f"{search or key} from {from_index}: {e}")
+                        continue
+                    if search is not None:
+                        total = first_page.get("total", 0)
+                        if self.checkpoint is not None:
+                            self.checkpoint.set_search(key, query, total)
+                        plan(key, query, total, {0})
+                    new = []
+                    for result in results:
+                        if result.get("id") not in seen:
+                            seen.add(result.get("id"))
+                            new.append(result)
+                    if new:
+                        write(new)
+                    stats.pages += 1
+                    stats.results += len(new)
+                    written.append((key, from_index))
+                    if len(written) >= self.checkpoint_every:
+                        flush()
+                while len(pending) < self.max_pending and submit(executor):
+                    pass
+        finally:
+            flush()
+            executor.shutdown(wait=True, cancel_futures=True)
+            if coordinator is not None:
+                coordinator.shutdown()
+            stats.seconds = time.perf_counter() - start
+        return stats
@@ -0,0 +1,147 @@
+"""
+Planning of many searches differing only in their location.
+
+The searches with the same parameters, first page and zip code locations are merged
+into a single request on the union of their geo tags, and the merged results are
+dispatched back to every search by the postal code of the listings. When a merged
+response does not hold all the results of its searches, the searches whose first
+page it does not fill are sent one by one.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from homegater.cache import _canonical
+
+ZIPCODE_TAG_PREFIX = "geo-zipcode-"
+
+
+def _postal_code(result: dict[str, Any]) -> Optional[str]:
+    listing = result.get("listing") or {}
+    return (listing.get("address") or {}).get("postalCode")
+
+
+def _merge_key(query: dict[str, Any]) -> Optional[str]:
+    """The parameters shared by the mergeable searches, None if it cannot be merged."""
+    geo_tags = query["query"]["location"]["geoTags"]
+    if query["from"] != 0 or not all(
+        tag.startswith(ZIPCODE_TAG_PREFIX) for tag in geo_tags
+    ):
+        return None
+    shared = {k: v for k, v in query.items() if k != "size"}
+    shared["query"] = {k: v for k, v in query["query"].items() if k != "location"}
+    return json.dumps(_canonical(shared), sort_keys=True)
+
+
+@dataclass
+class PlannedSearch:
+    """A search request and the indexes of the searches it answers."""
+
+    query: dict[str, Any]
+    members: list[tuple[int, dict[str, Any]]] = field(default_factory=list)
+
+    @property
+    def merged(self) -> bool:
+        return len(self.members) > 1
+
+    def dispatch(
+        self, response: dict[str, Any]
+    ) -> tuple[list[tuple[int, dict[str, Any]]], list[tuple[int, dict[str, Any]]]]:
+        """
+        The response of the member searches answered by the merged response, and the
+        member searches to send one by one. When the merged response is incomplete, a member
+        is answered only if its first page is full, and its total then counts its
+        matches in the merged response. All the members are sent one by one if the response
+        has listings without a postal code of its geo tags.
+        """
+        if not self.merged:
+            return [(self.members[0][0], response)], []
+        results = response.get("results")
+        if results is None:
+            return [], list(self.members)
+        postal_codes = {
+            tag[len(ZIPCODE_TAG_PREFIX) :]
+            for tag in self.query["query"]["location"]["geoTags"]
+        }
+        if any(_postal_code(r) not in postal_codes for r in results):
+            return [], list(self.members)
+        complete = response.get("total", 0) <= len(results)
+        dispatched, fallbacks = [], []
+        for index, query in self.members:
+            postal_codes = {
+                tag[len(ZIPCODE_TAG_PREFIX) :]
+                for tag in query["query"]["location"]["geoTags"]
+            }
+            matches = [r for r in results if _postal_code(r) in postal_codes]
+            if not complete and len(matches) < query["size"]:
+                fallbacks.append((index, query))
+                continue
+            dispatched.append(
+                (
+                    index,
+                    {
+                        "from": 0,
+                        "size": query["size"],
+                        "total": len(matches),
+                        "results": matches[: query["size"]],
+                    },
+                )
+            )
+        return dispatched, fallbacks
+
+
+@dataclass
+class SearchPlan:
+    """
+    The requests planned for many searches, against the naive one by one requests.
+    The searches sent one by one after an incomplete merged response are counted in
+    fallback_requests once the plan has run.
+    """
+
+    searches: list[PlannedSearch]
+    geo_lookups: int
+    naive_requests: int
+    fallback_requests: int = 0
+
+    @property
+    def planned_requests(self) -> int:
+        return self.geo_lookups + len(self.searches) + self.fallback_requests
+
+
+def plan_searches(
+    queries: list[dict[str, Any]], max_merged_size: int = 100
+) -> list[PlannedSearch]:
+    """
+    Merge the final search queries sharing their parameters, as long as the sizes
+    they request add up to at most max_merged_size. Merged searches request
+    max_merged_size results.
+    """
+    planned = []
+    groups = {}
+    for index, query in enumerate(queries):
+        key = _merge_key(query)
+        group = groups.get(key)
+        if (
+            group is None
+            or sum(member["size"] for _, member in group.members) + query["size"]
+            > max_merged_size
+        ):
+            group = PlannedSearch(query, [(index, query)])
+            planned.append(group)
+            if key is not None:
+                groups[key] = group
+            continue
+        geo_tags = group.query["query"]["location"]["geoTags"]
+        location = {
+            "geoTags": list(
+                dict.fromkeys(geo_tags + query["query"]["location"]["geoTags"])
+            )
+        }
+        group.query = {
+            **group.query,
+            "query": {**group.query["query"], "location": location},
+            "size": max_merged_size,
+        }
+        group.members.append((index, query))
+    return planned
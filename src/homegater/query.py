@@ -0,0 +1,273 @@
+"""
+Precompiled search queries.
+
+A SearchQuery validates its offer type and categories and converts its extra
+parameters to camelCase once, sorts its categories and geo tags, which the API
+matches in any order, and serializes the request body once around its
+`from` and `size`. The pages of a query share that serialization and only format
+their own `from` and `size`, and the queries with the same parameters share their
+compilation:
+
+    query = SearchQuery("RENT", FLAT_CATEGORY, ["geo-zipcode-8001"], monthly_rent={"to": 3000})
+    for from_index in range(0, 100, 20):
+        body = query.page(from_index).to_bytes()
+"""
+
+import functools
+import json
+import re
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
+from typing import Any, Optional
+
+from homegater.utils import camel_case
+
+OFFER_TYPES = ("BUY", "RENT")
+HOUSE_CATEGORY = [
+    "CHALET",
+    "RUSTICO",
+    "FARM_HOUSE",
+    "BUNGALOW",
+    "SINGLE_HOUSE",
+    "ENGADINE_HOUSE",
+    "BIFAMILIAR_HOUSE",
+    "VILLA",
+]
+FLAT_CATEGORY = [
+    "APARTMENT",
+    "MAISONETTE",
+    "DUPLEX",
+    "ATTIC_FLAT",
+    "ROOF_FLAT",
+    "STUDIO",
+    "SINGLE_ROOM",
+    "TERRACE_FLAT",
+    "BACHELOR_FLAT",
+    "LOFT",
+    "ATTIC",
+    "FURNISHED_FLAT",
+]
+DEFAULT_CATEGORIES = (*HOUSE_CATEGORY, *FLAT_CATEGORY)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# The API accepts more categories than HOUSE_CATEGORY and FLAT_CATEGORY, e.g. "HOUSE".
+_CATEGORY_PATTERN = re.compile(r"[A-Z][A-Z_]*")
+
+
+@functools.lru_cache(maxsize=256)
+def _checked_categories(categories: tuple[str, ...]) -> tuple[str, ...]:
+    """The categories once validated, the same few lists recur in every query."""
+    if not categories:
+        raise ValueError("At least one category should be given.")
+    for category in categories:
+        if not isinstance(category, str) or not _CATEGORY_PATTERN.fullmatch(category):
+            raise ValueError(f"Invalid category: {category!r}.")
+    return categories
+
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+_COMPILED_FIELDS = (
+    "offer_type",
+    "categories",
+    "geo_tags",
+    "sort_by",
+    "sort_direction",
+    "params",
+    "_head",
+    "_tail",
+)
+
+
+def _frozen(value: Any) -> Any:
+    """A hashable copy of a JSON parameter value, typed so that 1, 1.0 and True differ."""
+    if isinstance(value, dict):
+        return (dict, tuple((key, _frozen(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(_frozen(item) for item in value))
+    return (type(value), value)
+
+
+def _thawed(value: Any) -> Any:
+    kind, item = value
+    if kind is dict:
+        return {key: _thawed(v) for key, v in item}
+    if kind is list:
+        return [_thawed(v) for v in item]
+    return item
+
+
+def _search_body(
+    offer_type: str,
+    categories: tuple[str, ...],
+    geo_tags: tuple[str, ...],
+    sort_by: str,
+    sort_direction: str,
+    params: Mapping[str, Any],
+    from_index: int,
+    size: int,
+) -> dict[str, Any]:
+    query = {
+        "offerType": offer_type,
+        "categories": list(categories),
+        "location": {"geoTags": list(geo_tags)},
+    }
+    query.update(params)
+    return {
+        "query": query,
+        "sortBy": sort_by,
+        "sortDirection": sort_direction,
+        "from": from_index,
+        "size": size,
+        "trackTotalHits": True,
+        "fieldset": "srp-list",
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def _compiled(
+    offer_type: str,
+    categories: tuple[str, ...],
+    geo_tags: tuple[str, ...],
+    sort_by: str,
+    sort_direction: str,
+    params: tuple[tuple[str, Any], ...],
+) -> tuple[Any, ...]:
+    """
+    The values of the _COMPILED_FIELDS of a query, compiled once: a client repeats the
+    same few searches. The categories and geo tags are sorted, so that the body is the
+    same whatever their order, and the parameters are copied from their frozen values.
+    """
+    categories = tuple(sorted(_checked_categories(categories)))
+    geo_tags = tuple(sorted(geo_tags))
+    params = MappingProxyType(
+        {camel_case(key): _thawed(value) for key, value in params}
+    )
+    # The body up to the value of "from", and after the value of "size".
+    body = _ENCODER.encode(
+        _search_body(
+            offer_type, categories, geo_tags, sort_by, sort_direction, params, 0, 0
+        )
+    )
+    head, tail = body.rsplit('"from":0,"size":0', 1)
+    return (
+        offer_type,
+        categories,
+        geo_tags,
+        sort_by,
+        sort_direction,
+        params,
+        (head + '"from":').encode(),
+        tail.encode(),
+    )
+
+
+class SearchQuery:
+    """
+    Immutable search query of the `/search/listings` endpoint.
+
+    Args:
+        offer_type (str): The type of offer, "BUY" or "RENT".
+        categories (Iterable[str]): The categories to search within.
+        geo_tags (Iterable[str], optional): The resolved geo tags of the location. Defaults to none.
+        sort_by (str, optional): The field to sort by. Defaults to "dateCreated".
+        sort_direction (str, optional): The direction to sort. Defaults to "desc".
+        from_index (int, optional): The starting index for the search results. Defaults to 0.
+        size (int, optional): The number of results to return. Defaults to 20.
+        **params: Additional search parameters, in snake_case or camelCase.
+    """
+
+    __slots__ = (
+        "offer_type",
+        "categories",
+        "geo_tags",
+        "sort_by",
+        "sort_direction",
+        "params",
+        "from_index",
+        "size",
+        "_head",
+        "_tail",
+    )
+
+    def __init__(
+        self,
+        offer_type: str,
+        categories: Iterable[str],
+        geo_tags: Iterable[str] = (),
+        *,
+        sort_by: str = "dateCreated",
+        sort_direction: str = "desc",
+        from_index: int = 0,
+        size: int = 20,
+        **params,
+    ):
+        if offer_type not in OFFER_TYPES:
+            raise ValueError(
+                f"Invalid offer type: {offer_type}. Only {', '.join(OFFER_TYPES)} are accepted."
+            )
+        if isinstance(categories, str):
+            raise ValueError("categories should be a list of categories, not a string.")
+        compiled = _compiled(
+            offer_type,
+            tuple(categories),
+            tuple(geo_tags),
+            sort_by,
+            sort_direction,
+            tuple((key, _frozen(value)) for key, value in params.items()),
+        )
+        for name, value in zip(_COMPILED_FIELDS, compiled, strict=True):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "from_index", from_index)
+        object.__setattr__(self, "size", size)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("SearchQuery is immutable, use page() to change its page.")
+
+    def __repr__(self) -> str:
+        return (
+            f"SearchQuery({self.offer_type!r}, {list(self.categories)!r}, "
+            f"{list(self.geo_tags)!r}, from_index={self.from_index}, size={self.size})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SearchQuery):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    __hash__ = None
+
+    def _body(self, from_index: int, size: int) -> dict[str, Any]:
+        return _search_body(
+            self.offer_type,
+            self.categories,
+            self.geo_tags,
+            self.sort_by,
+            self.sort_direction,
+            self.params,
+            from_index,
+            size,
+        )
+
+    def page(self, from_index: int, size: Optional[int] = None) -> "SearchQuery":
+        """The same query starting at from_index, with size results (the same size by default)."""
+        page = object.__new__(SearchQuery)
+        for name in self.__slots__:
+            object.__setattr__(page, name, getattr(self, name))
+        object.__setattr__(page, "from_index", from_index)
+        if size is not None:
+            object.__setattr__(page, "size", size)
+        return page
+
+    def to_bytes(self) -> bytes:
+        """The JSON request body."""
+        return b'%s%d,"size":%d%s' % (
+            self._head,
+            self.from_index,
+            self.size,
+            self._tail,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """The request body as a new dict, e.g. for the search cache or the planner."""
+        return self._body(self.from_index, self.size)
@@ -0,0 +1,203 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
+
+ENDPOINTS = ("geo", "search", "listing")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    The seconds to wait from a Retry-After header, given in seconds or as an http date.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of requests, shared by threads and coroutines.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        burst (int): The maximum number of tokens that can be accumulated. Defaults to 1.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate should be a positive number.")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of callers currently waiting for tokens."""
+        return self._waiting
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """
+        Take the tokens, possibly in advance, and return the seconds to wait for them.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            delay = max(-self._tokens / self.rate, 0.0)
+            if delay:
+                self._waiting += 1
+            return delay
+
+    def _release(self) -> None:
+        with self._lock:
+            self._waiting -= 1
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block the calling thread until the tokens are available."""
+        delay = self._reserve(tokens)
+        if delay:
+            try:
+                time.sleep(delay)
+            finally:
+                self._release()
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        """Wait without blocking the event loop until the tokens are available."""
+        # asyncio is imported on the first async call, not by the sync clients.
+        import asyncio
+
+        delay = self._reserve(tokens)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._release()
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket adjusting its rate with additive increase, multiplicative decrease:
+    the rate grows by `increase` on every success up to `max_rate`, and is multiplied
+    by `decrease` when the API throttles, at most once per `cooldown` seconds.
+
+    Args:
+        rate (float): The initial number of tokens added per second.
+        burst (int): The maximum number of tokens that can be accumulated. Defaults to 1.
+        min_rate (float, optional): The lowest rate. Defaults to 1% of the initial rate.
+        max_rate (float, optional): The highest rate. Defaults to the initial rate, so that the rate
+            only recovers after a throttling and never probes above it: pass a higher ceiling to probe.
+        increase (float): The rate added on every success. Defaults to 0.1.
+        decrease (float): The factor applied to the rate when throttled. Defaults to 0.5.
+        cooldown (float): The minimum seconds between two decreases. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        min_rate: float = None,
+        max_rate: float = None,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        super().__init__(rate, burst)
+        if not 0 < decrease < 1:
+            raise ValueError("decrease should be between 0 and 1.")
+        self.min_rate = min_rate if min_rate is not None else rate / 100
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._decreased_at = None
+
+    def on_success(self) -> None:
+        """Ramp the rate up after a request went through."""
+        with self._lock:
+            self._refill()
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def on_throttle(self, retry_after: float = None) -> None:
+        """
+        Back off after a throttled request: cut the rate and hold every new request
+        for at least `retry_after` seconds, or one token interval when not given.
+        """
+        with self._lock:
+            self._refill()
+            now = time.monotonic()
+            if self._decreased_at is None or now - self._decreased_at >= self.cooldown:
+                self.rate = max(self.rate * self.decrease, self.min_rate)
+                self._decreased_at = now
+            self._tokens = min(self._tokens, 0.0) - (retry_after or 0.0) * self.rate
+
+
+class RateLimiter:
+    """
+    Adaptive rate limits of the API endpoints (geo, search and listing), each with its
+    own AdaptiveTokenBucket. Shared by threads and coroutines, and by several clients.
+
+    Args:
+        rate (float | dict): The requests per second sent to each endpoint, or a dict of rates by endpoint.
+            The endpoints missing from the dict are not limited.
+        **kwargs: The AIMD arguments of AdaptiveTokenBucket (burst, min_rate, max_rate, increase, decrease, cooldown).
+    """
+
+    def __init__(self, rate: Union[float, dict[str, float]], **kwargs):
+        rates = rate if isinstance(rate, dict) else dict.fromkeys(ENDPOINTS, rate)
+        self.buckets = {
+            endpoint: AdaptiveTokenBucket(endpoint_rate, **kwargs)
+            for endpoint, endpoint_rate in rates.items()
+        }
+
+    def acquire(self, endpoint: str) -> None:
+        """Block the calling thread until a request can be sent to the endpoint."""
+        bucket = self.buckets.get(endpoint)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """Wait without blocking the event loop until a request can be sent to the endpoint."""
+        bucket = self.buckets.get(endpoint)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+    def report(
+        self, endpoint: str, status_code: int, retry_after: float = None
+    ) -> bool:
+        """
+        Adapt the rate of the endpoint to the status of a response.
+        Returns True if the request was throttled, i.e. a 429 or a 503 with Retry-After,
+        and can be retried once the limiter allows.
+        """
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return False
+        if status_code == 429 or (status_code == 503 and retry_after is not None):
+            bucket.on_throttle(retry_after)
+            return True
+        if status_code < 500:
+            bucket.on_success()
+        return False
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """The current rate and queue depth of every endpoint."""
+        return {
+            endpoint: {"rate": bucket.rate, "queue_depth": bucket.queue_depth}
+            for endpoint, bucket in self.buckets.items()
+        }
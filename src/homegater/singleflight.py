@@ -0,0 +1,94 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+The first caller of a key runs the call, and the callers arriving with the same key
+while it is in flight wait for it and get its result or its exception. Once the
+call completes the key is released, so the next caller runs a new call.
+
+The clients coalesce their requests keyed by method, URL and canonical body, so the
+herd of identical geo lookups, listing fetches or searches sent right after a cache
+expiry results in a single request. The response is shared and decoded by every
+caller, so they do not share the decoded data.
+"""
+
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    """The calls run, and the calls served by the call in flight of another caller."""
+
+    calls: int = 0
+    shared: int = 0
+
+
+class SingleFlight:
+    """Single flight of the calls of threads."""
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run fn(*args, **kwargs), or wait for the call in flight with the same key."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.stats.calls += 1
+            else:
+                self.stats.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Single flight of the calls of coroutines, on the event loop of the client."""
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Await fn(*args, **kwargs), or the call in flight with the same key."""
+        # asyncio is imported on the first async call, not by the sync clients.
+        import asyncio
+
+        task = self._calls.get(key)
+        if task is not None:
+            self.stats.shared += 1
+        else:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            self.stats.calls += 1
+
+            def release(done: Any) -> None:
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            task.add_done_callback(release)
+        # A cancelled caller does not cancel the call awaited by the others.
+        return await asyncio.shield(task)
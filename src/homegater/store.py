@@ -0,0 +1,299 @@
+"""
+Local store of the listings returned by the API, answering searches without it.
+
+A `ListingStore` passed to `Homegate(listing_store=...)` keeps every search result
+and `get_listing` response in a SQLite database, indexed on offer type, category,
+geo tag, price, rooms, living space and creation date. The searches sent with
+`source="local"` are then answered from the store, in the shape of the API
+responses:
+
+    store = ListingStore("listings.sqlite")
+    api = Homegate(listing_store=store)
+    api.search_rent_listings(location="8001", size=100)
+    api.search_rent_listings(location="8001", monthlyRent={"to": 2500}, source="local")
+
+A listing matches the geo tag of the single location searches that returned it (a
+search over several locations does not tell which one a listing lies in) and the
+zip code of its address, and the range filters of price (monthlyRent or purchasePrice), rooms
+(numberOfRooms) and living space (livingSpace). Every local result has a
+`fetchedAt` timestamp, the epoch seconds when the API last returned it.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Union
+
+from homegater.incremental import listing_created_at
+from homegater.models import listing_row
+from homegater.query import SearchQuery
+
+# The column filtered by the range parameters of a search query.
+RANGE_COLUMNS = {
+    "monthlyRent": "price",
+    "purchasePrice": "price",
+    "numberOfRooms": "rooms",
+    "livingSpace": "living_space",
+}
+SORT_COLUMNS = {"dateCreated": "created_at", **RANGE_COLUMNS}
+
+# The listings hold the indexed columns only, their payloads are read for the page
+# returned. The categories and geo tags reference the integer key of the listings.
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS listings (key INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+    "offer_type TEXT, price REAL, rooms REAL, living_space REAL, created_at TEXT, "
+    "fetched_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS listing_payloads (key INTEGER PRIMARY KEY, payload TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS listing_categories "
+    "(listing INTEGER NOT NULL, category TEXT NOT NULL, PRIMARY KEY (listing, category)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS listing_geo_tags "
+    "(geo_tag TEXT NOT NULL, listing INTEGER NOT NULL, PRIMARY KEY (geo_tag, listing)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS listings_price ON listings (offer_type, price)",
+    "CREATE INDEX IF NOT EXISTS listings_rooms ON listings (offer_type, rooms)",
+    "CREATE INDEX IF NOT EXISTS listings_living_space ON listings (offer_type, living_space)",
+    "CREATE INDEX IF NOT EXISTS listings_created_at ON listings (offer_type, created_at)",
+)
+_UPSERT = (
+    "INSERT INTO listings (id, offer_type, price, rooms, living_space, created_at, fetched_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+    "offer_type = excluded.offer_type, price = excluded.price, rooms = excluded.rooms, "
+    "living_space = excluded.living_space, created_at = excluded.created_at, "
+    "fetched_at = excluded.fetched_at"
+)
+# Below the SQLite limit of the number of parameters of a statement.
+_CHUNK = 500
+# The geo tags matching fewer listings select the candidates of a search.
+_NARROW_GEO_TAG_ROWS = 1000
+# The searches matching more listings are paged along the index of their sort.
+_SORTED_INDEX_ROWS = 2000
+# The number of totals of recent searches kept until the next write.
+_TOTALS_SIZE = 256
+
+
+def _query_dict(query: Union[dict[str, Any], SearchQuery]) -> dict[str, Any]:
+    return query.to_dict() if isinstance(query, SearchQuery) else query
+
+
+class ListingStore:
+    """
+    Listings persisted in an indexed SQLite database.
+
+    Args:
+        path (str): The path of the database file. Defaults to an in-memory database.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        # The planner statistics are refreshed each time the store grew by a quarter.
+        self._analyzed_rows = 0
+        self._analyze()
+        self._totals: OrderedDict[tuple, int] = OrderedDict()
+
+    def _analyze(self) -> None:
+        rows = self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+        if rows >= self._analyzed_rows * 1.25 + 100:
+            self._conn.execute("ANALYZE")
+            self._analyzed_rows = rows
+
+    def add_search(
+        self,
+        query: Union[dict[str, Any], SearchQuery],
+        response: dict[str, Any],
+    ) -> None:
+        """Store the results of a search response, matched by the geo tags of its query."""
+        body = _query_dict(query)["query"]
+        geo_tags = body.get("location", {}).get("geoTags", [])
+        self.add(response.get("results", []), geo_tags, body.get("offerType"))
+
+    def add_listing(self, listing: dict[str, Any]) -> None:
+        """Store a get_listing response."""
+        self.add([listing])
+
+    def add(
+        self,
+        results: Iterable[dict[str, Any]],
+        geo_tags: Iterable[str] = (),
+        offer_type: str = None,
+    ) -> int:
+        """
+        Store search results or listings, replacing the stored payload of the same ids.
+        The listings are tagged with the geo tag of a single location search only.
+        Returns the number of listings stored.
+        """
+        geo_tags = list(geo_tags)
+        fetched_at = time.time()
+        rows, payloads, categories, tags = {}, {}, [], []
+        for result in results:
+            row = listing_row(result)
+            listing_id, postal_code = row[0], row[7]
+            listing = result.get("listing") or result
+            rows[listing_id] = (
+                listing_id,
+                row[1] or offer_type,
+                row[3],
+                row[5],
+                row[6],
+                listing_created_at(result) or None,
+                fetched_at,
+            )
+            payloads[listing_id] = json.dumps(
+                result, separators=(",", ":"), ensure_ascii=False
+            )
+            categories.extend(
+                (listing_id, category) for category in listing.get("categories") or ()
+            )
+            if len(geo_tags) == 1:
+                tags.append((geo_tags[0], listing_id))
+            if postal_code:
+                tags.append((f"geo-zipcode-{postal_code}", listing_id))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, rows.values())
+            ids = list(rows)
+            keys = {}
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i : i + _CHUNK]
+                keys.update(
+                    self._conn.execute(
+                        "SELECT id, key FROM listings "
+                        f"WHERE id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO listing_payloads VALUES (?, ?)",
+                (
+                    (keys[listing_id], payload)
+                    for listing_id, payload in payloads.items()
+                ),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO listing_categories VALUES (?, ?)",
+                ((keys[listing_id], category) for listing_id, category in categories),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO listing_geo_tags VALUES (?, ?)",
+                ((geo_tag, keys[listing_id]) for geo_tag, listing_id in tags),
+            )
+            self._analyze()
+            self._totals.clear()
+        return len(rows)
+
+    def search(self, query: Union[dict[str, Any], SearchQuery]) -> dict[str, Any]:
+        """
+        Answer a search query from the stored listings, in the shape of a search response.
+        Raises a ValueError for the parameters the store cannot filter or sort on.
+        """
+        query = _query_dict(query)
+        body = dict(query["query"])
+        where = ["offer_type = ?"]
+        args = [body.pop("offerType")]
+
+        categories = body.pop("categories")
+        # Scan the few categories of every listing rather than seek each one.
+        where.append(
+            "EXISTS (SELECT 1 FROM listing_categories WHERE listing = key "
+            f"AND +category IN ({','.join('?' * len(categories))}))"
+        )
+        args.extend(categories)
+
+        for name, bounds in body.items():
+            if name == "location":
+                continue
+            column = RANGE_COLUMNS.get(name)
+            if column is None or not isinstance(bounds, dict):
+                raise ValueError(f"The listing store cannot filter on {name}.")
+            if bounds.get("from") is not None:
+                where.append(f"{column} >= ?")
+                args.append(bounds["from"])
+            if bounds.get("to") is not None:
+                where.append(f"{column} <= ?")
+                args.append(bounds["to"])
+
+        sort_column = SORT_COLUMNS.get(query.get("sortBy", "dateCreated"))
+        if sort_column is None:
+            raise ValueError(f"The listing store cannot sort on {query['sortBy']}.")
+        direction = "ASC" if query.get("sortDirection") == "asc" else "DESC"
+        geo_tags = body.get("location", {}).get("geoTags", [])
+        from_index, size = query.get("from", 0), query.get("size", 20)
+        with self._lock:
+            if geo_tags:
+                where.append(self._geo_condition(geo_tags))
+                args.extend(geo_tags)
+            condition = " AND ".join(where)
+            total_key = (condition, tuple(args))
+            total = self._totals.get(total_key)
+            if total is None:
+                total = self._conn.execute(
+                    f"SELECT COUNT(*) FROM listings WHERE {condition}", args
+                ).fetchone()[0]
+                self._totals[total_key] = total
+                if len(self._totals) > _TOTALS_SIZE:
+                    self._totals.popitem(last=False)
+            # Few matches are sorted once selected by the filter indexes, more are
+            # read in the order of the sort index until the page is complete.
+            order = sort_column if total > _SORTED_INDEX_ROWS else f"+{sort_column}"
+            rows = []
+            if from_index < total:
+                rows = self._conn.execute(
+                    f"SELECT key, fetched_at FROM listings WHERE {condition} "
+                    f"ORDER BY {order} {direction}, key {direction} LIMIT ? OFFSET ?",
+                    [*args, size, from_index],
+                ).fetchall()
+            payloads = dict(
+                self._conn.execute(
+                    "SELECT key, payload FROM listing_payloads "
+                    f"WHERE key IN ({','.join('?' * len(rows))})",
+                    [key for key, _ in rows],
+                )
+            )
+        results = []
+        for key, fetched_at in rows:
+            result = json.loads(payloads[key])
+            result["fetchedAt"] = fetched_at
+            results.append(result)
+        return {"from": from_index, "size": size, "total": total, "results": results}
+
+    def _geo_condition(self, geo_tags: list[str]) -> str:
+        """
+        The condition on the geo tags: the listings of narrow geo tags, e.g. zip codes,
+        are the candidates, while broad ones, e.g. cantons, are checked for every
+        listing selected by the range and sort indexes.
+        """
+        placeholders = ",".join("?" * len(geo_tags))
+        matched = self._conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM listing_geo_tags "
+            f"WHERE geo_tag IN ({placeholders}) LIMIT ?)",
+            [*geo_tags, _NARROW_GEO_TAG_ROWS],
+        ).fetchone()[0]
+        if matched < _NARROW_GEO_TAG_ROWS:
+            return f"key IN (SELECT listing FROM listing_geo_tags WHERE geo_tag IN ({placeholders}))"
+        return f"EXISTS (SELECT 1 FROM listing_geo_tags WHERE listing = key AND geo_tag IN ({placeholders}))"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            for table in (
+                "listings",
+                "listing_payloads",
+                "listing_categories",
+                "listing_geo_tags",
+            ):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._analyzed_rows = 0
+            self._totals.clear()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,16 +1,19 @@
+import functools
 import re
 from typing import Any
 
 
+@functools.lru_cache(maxsize=1024)
+def camel_case(key: str) -> str:
+    """Convert a snake_case key to camelCase, memoized as the same keys recur."""
+    return "".join(
+        word.title() if i > 0 else word for i, word in enumerate(key.split("_"))
+    )
+
+
 def convert_to_camel_case(snake_case_dict: dict[str, Any]) -> dict[str, Any]:
     """Convert snake_case keys to camelCase."""
-    camel_case_dict = {}
-    for key, value in snake_case_dict.items():
-        camel_case_key = "".join(
-            word.title() if i > 0 else word for i, word in enumerate(key.split("_"))
-        )
-        camel_case_dict[camel_case_key] = value
-    return camel_case_dict
+    return {camel_case(key): value for key, value in snake_case_dict.items()}
 
 
 class LocationNotFoundException(Exception):
@@ -21,14 +24,14 @@ class LocationNotFoundException(Exception):
         super().__init__(self.message)
 
 
+_GEO_TAG_PATTERN = re.compile(r"geo-(canton|region|zipcode|city|country)-[a-zA-Z0-9-]+")
+
+
 def _is_valid_geo_tag(location: str) -> bool:
     """
     Check if the location string is a valid homegate geo tag.
     """
-
-    pattern = r"geo-(canton|region|zipcode|city|country)-[a-zA-Z0-9-]+"
-    match = re.search(pattern, location)
-    return match is not None
+    return _GEO_TAG_PATTERN.search(location) is not None
 
 
 def _is_unique_geo_set(geo_list: list[dict]) -> bool:
@@ -36,24 +39,17 @@ def _is_unique_geo_set(geo_list: list[dict]) -> bool:
     geo_list: List of geo locations.
     Check if the geo_list contains actual unique locations by comparing the center lat and lon.
     """
-    center_lat = {geo["geoLocation"]["center"]["lat"] for geo in geo_list}
-    center_lon = {geo["geoLocation"]["center"]["lon"] for geo in geo_list}
-    return 1 == len(center_lat) == len(center_lon)
+    return len(_unique_geo_set(geo_list)) == 1
 
 
 def _unique_geo_set(geo_list: list[dict]) -> list[dict]:
     """
     geo_list: List of geo locations.
     Return a list of unique geo locations by comparing the center lat and lon.
+    See homegater.geo.unique_geo_results for a comparison within a distance tolerance.
     """
-    seen = set()
-    unique_geo_list = []
+    first = {}
     for geo in geo_list:
-        keys = (
-            geo["geoLocation"]["center"]["lat"],
-            geo["geoLocation"]["center"]["lon"],
-        )
-        if keys not in seen:
-            unique_geo_list.append(geo)
-            seen.add(keys)
-    return unique_geo_list
+        center = geo["geoLocation"]["center"]
+        first.setdefault((center["lat"], center["lon"]), geo)
+    return list(first.values())
@@ -1,3 +1,6 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock
 
 import pytest
@@ -62,3 +65,149 @@ def mock_geo_request_double_response(requests_mock):
 
     for endpoint, response in endpoints.items():
         requests_mock.get(f"https://api.example.com/{endpoint}", json=response)
+
+
+class LocalApi:
+    """Local stand-in for api.homegate.ch serving canned json per path."""
+
+    def __init__(self):
+        self.routes = {}
+        self.failures = []
+        self.requests = []
+        self.connections = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = self.path.split("?")[0]
+                # A failure is a status, with Retry-After: 0 when throttled, or a
+                # (status, headers) pair.
+                headers = None
+                if api.failures:
+                    status, payload = api.failures.pop(0), {}
+                    if isinstance(status, tuple):
+                        status, headers = status
+                elif path in api.routes:
+                    status, payload = 200, api.routes[path]
+                else:
+                    status, payload = 404, {}
+                if callable(payload):
+                    payload = payload(self.path, body)
+                api.connections.add(self.client_address)
+                api.requests.append(
+                    {
+                        "method": self.command,
+                        "path": self.path,
+                        "body": body,
+                        "headers": dict(self.headers),
+                        "status": status,
+                    }
+                )
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if headers is None and status in (429, 503):
+                    headers = {"Retry-After": "0"}
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def local_api():
+    api = LocalApi()
+    api.start()
+    yield api
+    api.stop()
+
+
+def srp_result(
+    listing_id,
+    rent=None,
+    price=None,
+    rooms=3.5,
+    created_at="2024-05-01T10:00:00Z",
+    status="ACTIVE",
+    category="APARTMENT",
+    zip_code="8001",
+):
+    """A /search/listings result for a rent listing, or a buy one given a price."""
+    return {
+        "id": listing_id,
+        "listingType": {"type": "STANDARD"},
+        "listing": {
+            "id": listing_id,
+            "status": status,
+            "offerType": "RENT" if rent else "BUY",
+            "categories": [category],
+            "prices": {
+                "currency": "CHF",
+                "rent": {"gross": rent} if rent else None,
+                "buy": {"price": price} if price else None,
+            },
+            "characteristics": {"numberOfRooms": rooms, "livingSpace": 80},
+            "address": {
+                "postalCode": zip_code,
+                "locality": "Zürich",
+                "geoCoordinates": {"latitude": 47.37, "longitude": 8.54},
+            },
+            "localization": {"de": {"text": {"title": f"Wohnung {listing_id}"}}},
+            "meta": {"createdAt": created_at},
+        },
+    }
+
+
+def paged_search(listings, select=None):
+    """Stand-in /search/listings handler paging over the listings.
+
+    Args:
+        listings: The results, read on every request, or a number of numbered ones.
+        select: Optional ``select(query, listings)`` returning the listings matching
+            a search body, in result order.
+    """
+
+    def handler(path, body):
+        query = json.loads(body)
+        results = (
+            [{"id": str(i)} for i in range(listings)]
+            if isinstance(listings, int)
+            else listings
+        )
+        if select is not None:
+            results = select(query, results)
+        start = query["from"]
+        return {
+            "from": start,
+            "size": query["size"],
+            "total": len(results),
+            "results": results[start : start + query["size"]],
+        }
+
+    return handler
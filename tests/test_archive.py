@@ -0,0 +1,94 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from homegater.archive import ArchiveReader, ResponseArchive, request_fingerprint
+from homegater.client import Homegate
+
+SEARCH = {
+    "from": 0,
+    "size": 20,
+    "total": 1,
+    "results": [{"id": "1", "listing": {"prices": {"rent": {"gross": 1500}}}}],
+}
+
+
+def test_fingerprint_ignores_base_url():
+    assert request_fingerprint(
+        "GET", "https://api.homegate.ch/listings/listing/1?sanitize=true"
+    ) == request_fingerprint(
+        "get", "http://127.0.0.1:8080/listings/listing/1?sanitize=true"
+    )
+    assert request_fingerprint(
+        "POST", "/search/listings", b"{}"
+    ) != request_fingerprint("POST", "/search/listings", b"[]")
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_append_and_read(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    with ResponseArchive(str(tmp_path), compression=compression) as archive:
+        archive.append("listing", b"a" * 32, b'{"id": "1"}', timestamp=1.5)
+        archive.append("listing", b"a" * 32, b'{"id": "2"}')
+        archive.append("search", b"b" * 32, b'{"total": 0}')
+
+    with ArchiveReader(str(tmp_path)) as reader:
+        records = list(reader)
+        assert len(reader) == 3
+        assert [r.endpoint for r in records] == ["listing", "listing", "search"]
+        assert records[0].timestamp == 1.5
+        assert bytes(records[2].content) == b'{"total": 0}'
+        assert bytes(reader.get(b"a" * 32).content) == b'{"id": "2"}'
+        assert reader.get(b"c" * 32) is None
+        if compression == "none":
+            assert isinstance(records[0].content, memoryview)
+
+
+def test_segments_rotate_and_resume(tmp_path):
+    with ResponseArchive(str(tmp_path), segment_size=64) as archive:
+        for i in range(5):
+            archive.append(
+                "listing",
+                bytes([i]) * 32,
+                json.dumps({"id": i, "pad": "x" * 40}).encode(),
+            )
+    with ResponseArchive(str(tmp_path), segment_size=64) as archive:
+        archive.append("listing", b"z" * 32, b'{"id": 5}')
+    # A partly written index entry is ignored.
+    with open(tmp_path / "segment-00000.index", "ab") as f:
+        f.write(b"\0" * 10)
+
+    assert len(list(tmp_path.glob("*.data"))) > 1
+    # Every gzip segment is also a stream of the recorded responses.
+    assert gzip.decompress((tmp_path / "segment-00000.data").read_bytes())
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert [json.loads(bytes(r.content))["id"] for r in reader] == list(range(6))
+
+
+def test_client_records_and_replays(local_api, tmp_path):
+    local_api.routes["/search/listings"] = SEARCH
+    local_api.routes["/listings/listing/1"] = SEARCH["results"][0]
+    with ResponseArchive(str(tmp_path)) as archive:
+        client = Homegate(base_url=local_api.url, archive=archive)
+        client.search_rent_listings(location="geo-zipcode-8001")
+        client.get_listing("1")
+        # The failed responses are not recorded.
+        local_api.failures.append(500)
+        with pytest.raises(requests.HTTPError):
+            client.get_listing("2")
+
+    replay_client = Homegate(json_backend="json", fields=["id"])
+    with ArchiveReader(str(tmp_path)) as reader:
+        replayed = list(reader.replay(replay_client))
+        search_request = next(r for r in local_api.requests if r["method"] == "POST")
+        recorded = reader.get(
+            request_fingerprint("POST", "/search/listings", search_request["body"])
+        )
+
+        assert [r.endpoint for r, _ in replayed] == ["search", "listing"]
+        assert replayed[0][1]["results"] == [{"id": "1"}]
+        assert replayed[1][1] == {"id": "1"}
+        assert json.loads(recorded.content) == SEARCH
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from homegater.async_client import AsyncHomegate
+from homegater.client import Homegate
+from homegater.ratelimit import RateLimiter
+from tests.conftest import paged_search
+
+
+def geo_response(geo_id):
+    return {
+        "total": 1,
+        "results": [{"geoLocation": {"id": geo_id, "center": {"lat": 1, "lon": 2}}}],
+    }
+
+
+def test_matches_sync_client(local_api):
+    local_api.routes["/geo/locations"] = geo_response("geo-zipcode-8001")
+    local_api.routes["/search/listings"] = lambda path, body: {
+        "query": json.loads(body)
+    }
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    kwargs = {"location": ["8001", "geo-canton-zurich"], "monthly_rent": {"to": 3000}}
+
+    async def run():
+        async with AsyncHomegate(base_url=local_api.url, max_search_geo=2) as client:
+            return (
+                await client.get_geo_tags("8001"),
+                await client.search_rent_listings(**kwargs),
+                await client.search_buy_listings(**kwargs),
+                await client.get_listing("1"),
+            )
+
+    with Homegate(base_url=local_api.url, max_search_geo=2) as client:
+        expected = (
+            client.get_geo_tags("8001"),
+            client.search_rent_listings(**kwargs),
+            client.search_buy_listings(**kwargs),
+            client.get_listing("1"),
+        )
+
+    assert asyncio.run(run()) == expected
+
+
+def test_locations_resolved_concurrently():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request):
+        nonlocal in_flight, max_in_flight
+        if request.url.path == "/geo/locations":
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            name = request.url.params["name"]
+            return httpx.Response(200, json=geo_response(f"geo-zipcode-{name}"))
+        return httpx.Response(200, json=json.loads(request.content))
+
+    locations = [str(8000 + i) for i in range(20)]
+
+    async def run():
+        async with AsyncHomegate(
+            max_concurrency=5, transport=httpx.MockTransport(handler)
+        ) as client:
+            return await client.search_rent_listings(location=locations)
+
+    query = asyncio.run(run())
+
+    assert max_in_flight == 5
+    assert query["query"]["location"]["geoTags"] == [
+        f"geo-zipcode-{loc}" for loc in locations
+    ]
+
+
+def test_retries_throttled_requests():
+    statuses = [429, 503, 200]
+
+    def handler(request):
+        return httpx.Response(
+            statuses.pop(0), json={"id": "1"}, headers={"Retry-After": "0"}
+        )
+
+    async def run():
+        async with AsyncHomegate(
+            retries=2, backoff_factor=0, transport=httpx.MockTransport(handler)
+        ) as client:
+            return await client.get_listing("1")
+
+    assert asyncio.run(run()) == {"id": "1"}
+    assert statuses == []
+
+
+def test_iter_listings(local_api):
+    local_api.routes["/search/listings"] = paged_search(95)
+
+    async def run():
+        async with AsyncHomegate(base_url=local_api.url) as client:
+            return [
+                listing["id"]
+                async for listing in client.iter_listings(
+                    offer_type="BUY", categories=["VILLA"], page_size=10, max_results=42
+                )
+            ]
+
+    assert asyncio.run(run()) == [str(i) for i in range(42)]
+    assert len(local_api.requests) == 5
+
+
+def test_get_listings():
+    calls = []
+
+    def handler(request):
+        listing_id = request.url.path.rsplit("/", 1)[-1]
+        calls.append(listing_id)
+        if listing_id == "404":
+            return httpx.Response(404, json={})
+        return httpx.Response(200, json={"id": listing_id})
+
+    async def run():
+        async with AsyncHomegate(transport=httpx.MockTransport(handler)) as client:
+            return {
+                listing_id: result
+                async for listing_id, result in client.get_listings(
+                    ["1", "2", "404", "1"], max_workers=2, chunk_size=2
+                )
+            }
+
+    results = asyncio.run(run())
+
+    assert results["1"] == {"id": "1"}
+    assert results["2"] == {"id": "2"}
+    assert isinstance(results["404"], httpx.HTTPStatusError)
+    assert sorted(calls) == ["1", "2", "404"]
+
+
+def test_throttled_requests_back_off(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    local_api.failures.extend([429, 429])
+    limiter = RateLimiter(100)
+
+    async def run():
+        async with AsyncHomegate(
+            base_url=local_api.url, rate_limit=limiter, retries=2
+        ) as client:
+            return await client.get_listing("1")
+
+    assert asyncio.run(run()) == {"id": "1"}
+    assert [r["status"] for r in local_api.requests] == [429, 429, 200]
+    assert limiter.stats()["listing"]["rate"] == pytest.approx(50.1)
@@ -0,0 +1,95 @@
+from homegater.cache import (
+    LRUCache,
+    SearchCache,
+    SQLiteCache,
+    TieredCache,
+    query_fingerprint,
+)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert (cache.stats.hits, cache.stats.misses) == (3, 1)
+
+
+def test_lru_cache_ttl(mocker):
+    now = mocker.patch("homegater.cache.time.monotonic", return_value=100.0)
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+
+    now.return_value = 120.0
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "geo.sqlite")
+    cache = SQLiteCache(path)
+    cache.set("8001", ["geo-zipcode-8001"])
+    cache.close()
+
+    cache = SQLiteCache(path)
+    assert cache.get("8001") == ["geo-zipcode-8001"]
+    assert cache.get("8002") is None
+    assert cache.stats.hit_ratio == 0.5
+
+
+def test_tiered_cache_promotes_hits(tmp_path):
+    memory = LRUCache()
+    disk = SQLiteCache(str(tmp_path / "geo.sqlite"))
+    disk.set("8001", ["geo-zipcode-8001"])
+    cache = TieredCache(memory, disk)
+
+    assert cache.get("8001") == ["geo-zipcode-8001"]
+    assert memory.get("8001") == ["geo-zipcode-8001"]
+    assert cache.get("8002") is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def search_query(offer_type="RENT", categories=("APARTMENT", "LOFT"), **query):
+    return {
+        "query": {"offerType": offer_type, "categories": list(categories), **query},
+        "from": 0,
+        "size": 20,
+    }
+
+
+def test_query_fingerprint_is_canonical():
+    query = search_query(location={"geoTags": ["geo-zipcode-8001", "geo-city-thalwil"]})
+    reordered = {
+        "size": 20,
+        "from": 0,
+        "query": {
+            "location": {"geoTags": ["geo-city-thalwil", "geo-zipcode-8001"]},
+            "categories": ["LOFT", "APARTMENT"],
+            "offerType": "RENT",
+        },
+    }
+
+    assert query_fingerprint(query) == query_fingerprint(reordered)
+    assert query_fingerprint(query) != query_fingerprint({**query, "from": 20})
+
+
+def test_search_cache_ttl_by_offer_type(mocker):
+    now = mocker.patch("homegater.cache.time.time", return_value=1000.0)
+    mocker.patch("homegater.cache.time.monotonic", return_value=1000.0)
+    cache = SearchCache(ttl={"BUY": 60, "RENT": 10}, stale_ttl=30)
+    cache.set(search_query("BUY"), {"total": 1}, elapsed=0.5)
+    cache.set(search_query("RENT"), {"total": 2}, elapsed=0.25)
+
+    now.return_value = 1020.0
+    assert cache.get(search_query("BUY")) == ({"total": 1}, False)
+    assert cache.get(search_query("RENT")) == ({"total": 2}, True)
+    assert cache.get(search_query("RENT", categories=["VILLA"])) == (None, False)
+    assert (cache.stats.hits, cache.stats.stale_hits, cache.stats.misses) == (2, 1, 1)
+    assert cache.stats.saved_seconds == 0.75
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from homegater.async_client import AsyncHomegate
+from homegater.changes import ChangeScan, ChangeStore, ListingState
+from homegater.client import Homegate
+from tests.conftest import paged_search, srp_result
+
+
+def kinds(changes):
+    return sorted((c.kind, c.listing_id, c.old, c.new) for c in changes)
+
+
+def test_scan_reports_changes():
+    first = ChangeScan()
+    first.feed([srp_result("1", 1500), srp_result("2", 2000), srp_result("3", 2500)])
+    first.feed([srp_result("3", 2500), srp_result("4", 3000)])
+    assert kinds(first.finish()) == [("new", i, None, None) for i in "1234"]
+
+    scan = ChangeScan(first.updates)
+    scan.feed(
+        [
+            srp_result("1", 1400),
+            srp_result("2", 2000, status="RESERVED"),
+            srp_result("3", 2500, rooms=4.5),
+        ]
+    )
+    scan.feed([srp_result("5", 900)])
+
+    assert set(scan.changed) == {"1", "2", "3", "5"}
+    assert kinds(scan.finish()) == [
+        ("new", "5", None, None),
+        ("price", "1", 1500.0, 1400.0),
+        ("removed", "4", 3000.0, None),
+        ("status", "2", "ACTIVE", "RESERVED"),
+        ("updated", "3", None, None),
+    ]
+    assert scan.removed == ["4"]
+
+
+def test_details_are_preferred():
+    scan = ChangeScan({"1": ListingState(b"", 1500.0, "ACTIVE")})
+    scan.feed([srp_result("1", 1500)])
+
+    changes = scan.finish({"1": srp_result("1", 1450)})
+
+    assert kinds(changes) == [("price", "1", 1500.0, 1450.0)]
+    assert changes[0].listing["listing"]["prices"]["rent"]["gross"] == 1450
+
+
+def track_api(local_api, listings):
+    local_api.routes["/search/listings"] = paged_search(listings)
+    for listing in listings:
+        local_api.routes[f"/listings/listing/{listing['id']}"] = (
+            lambda path, body, i=listing["id"]: next(
+                r for r in listings if r["id"] == i
+            )
+        )
+
+
+def fetched_ids(local_api):
+    return sorted(
+        r["path"].split("?")[0].rsplit("/", 1)[1]
+        for r in local_api.requests
+        if r["path"].startswith("/listings/")
+    )
+
+
+def test_track_listings(local_api, tmp_path):
+    listings = [srp_result(str(i), 1000 + i) for i in range(25)]
+    track_api(local_api, listings)
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    search = {"offer_type": "RENT", "categories": ["APARTMENT"], "page_size": 10}
+
+    with Homegate(base_url=local_api.url, coalesce=False) as client:
+        first = client.track_listings(store=store, **search)
+        assert len(first) == 25
+        assert len(fetched_ids(local_api)) == 25
+
+        local_api.requests.clear()
+        assert client.track_listings(store=store, **search) == []
+        assert fetched_ids(local_api) == []
+
+        listings[3] = srp_result("3", 950)
+        del listings[7]
+        local_api.requests.clear()
+        changes = client.track_listings(store=store, **search)
+        assert kinds(changes) == [
+            ("price", "3", 1003.0, 950.0),
+            ("removed", "7", 1007.0, None),
+        ]
+        assert fetched_ids(local_api) == ["3"]
+        assert client.track_listings(store=store, **search) == []
+
+
+def test_incomplete_scan_reports_no_removal(local_api, tmp_path):
+    listings = [srp_result(str(i), 1000 + i) for i in range(25)]
+    track_api(local_api, listings)
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    search = {"offer_type": "RENT", "categories": ["APARTMENT"], "page_size": 10}
+
+    with Homegate(base_url=local_api.url, coalesce=False) as client:
+        client.track_listings(store=store, **search)
+        # The pages after the first one come back empty, short of the total.
+        handler = paged_search(listings)
+        local_api.routes["/search/listings"] = lambda path, body: (
+            handler(path, body)
+            if json.loads(body)["from"] == 0
+            else {"total": 25, "results": []}
+        )
+        listings[3] = srp_result("3", 950)
+        changes = client.track_listings(store=store, **search)
+        assert kinds(changes) == [("price", "3", 1003.0, 950.0)]
+        # The listings not seen by the incomplete scan are still tracked.
+        track_api(local_api, listings)
+        assert client.track_listings(store=store, **search) == []
+
+
+def test_async_track_listings(local_api, tmp_path):
+    listings = [srp_result(str(i), 1000 + i) for i in range(5)]
+    track_api(local_api, listings)
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+
+    async def track():
+        async with AsyncHomegate(base_url=local_api.url) as client:
+            return await client.track_listings(
+                offer_type="RENT", categories=["APARTMENT"], store=store, details=False
+            )
+
+    assert len(asyncio.run(track())) == 5
+    listings[0] = srp_result("0", 1000, status="RESERVED")
+    assert kinds(asyncio.run(track())) == [("status", "0", "ACTIVE", "RESERVED")]
+    assert fetched_ids(local_api) == []
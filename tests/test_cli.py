@@ -0,0 +1,119 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from homegater.cli import main
+
+
+def lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_search_streams_jsonl(local_api, capsys):
+    local_api.routes["/search/listings"] = {
+        "from": 0,
+        "size": 20,
+        "total": 2,
+        "results": [{"id": "1", "listing": {"a": 1}}, {"id": "2", "listing": {}}],
+    }
+
+    code = main(
+        [
+            "--base-url",
+            local_api.url,
+            "search",
+            "rent",
+            "geo-zipcode-8001",
+            "--category",
+            "APARTMENT",
+            "--param",
+            'monthlyRent={"to": 2500}',
+            "--field",
+            "id",
+        ]
+    )
+
+    assert code == 0
+    assert lines(capsys) == [{"id": "1"}, {"id": "2"}]
+    query = json.loads(local_api.requests[0]["body"])
+    assert query["query"]["categories"] == ["APARTMENT"]
+    assert query["query"]["monthlyRent"] == {"to": 2500}
+
+
+def test_geo(local_api, capsys):
+    local_api.routes["/geo/locations"] = {
+        "total": 1,
+        "results": [
+            {"geoLocation": {"id": "geo-city-zurich", "center": {"lat": 1, "lon": 2}}}
+        ],
+    }
+
+    assert main(["--base-url", local_api.url, "geo", "zurich"]) == 0
+    assert lines(capsys) == [{"location": "zurich", "geoTag": "geo-city-zurich"}]
+
+
+def test_geo_from_index(local_api, capsys, tmp_path):
+    from homegater.geo_index import GeoIndex
+
+    response = {
+        "total": 1,
+        "results": [
+            {"geoLocation": {"id": "geo-city-zurich", "center": {"lat": 1, "lon": 2}}}
+        ],
+    }
+    path = str(tmp_path / "index.json")
+    GeoIndex.from_records(
+        [{"name": "Zurich", "lang": "en", "response": response}]
+    ).save(path)
+
+    code = main(["--base-url", local_api.url, "--geo-index", path, "geo", "zurich"])
+
+    assert code == 0
+    assert lines(capsys) == [{"location": "zurich", "geoTag": "geo-city-zurich"}]
+    assert local_api.requests == []
+
+
+def test_errors(local_api, capsys):
+    local_api.routes["/geo/locations"] = {"total": 0, "results": []}
+
+    code = main(["--base-url", local_api.url, "search", "buy", "x"])
+
+    assert code == 1
+    assert "Location not found" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["search", "lease", "8001"])
+
+
+def test_failed_search_exits_non_zero(local_api, capsys, caplog):
+    local_api.failures.append(500)
+
+    code = main(["--base-url", local_api.url, "search", "rent", "geo-zipcode-8001"])
+
+    assert code == 1
+    assert capsys.readouterr().out == ""
+    assert "Error searching listings" in caplog.text
+
+
+def test_import_is_lazy():
+    """The package and the command line do not load the http stack until it is used."""
+    code = (
+        "import sys, homegater, homegater.cli; "
+        "print([m for m in ('requests', 'httpx', 'asyncio') if m in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "[]"
+
+
+def test_lazy_clients():
+    import homegater
+    from homegater.client import Homegate
+
+    assert homegater.Homegate is Homegate
+    assert "AsyncHomegate" in dir(homegater)
+    with pytest.raises(AttributeError):
+        homegater.__getattr__("Missing")
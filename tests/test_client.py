@@ -1,17 +1,37 @@
+import json
+import time
 from unittest.mock import ANY, MagicMock
 
+import pytest
 import requests
 
+from homegater.cache import LRUCache, SearchCache
+from homegater.client import Homegate
+from homegater.query import JSON_HEADERS, SearchQuery
+from tests.conftest import paged_search
+
+
+def mock_session(mocker, client, get=None, post=None):
+    """Route the pooled session calls of the client to the given mock responses."""
+    responses = {"GET": get, "POST": post}
+    for response in filter(None, responses.values()):
+        response.content = json.dumps(response.json.return_value).encode()
+    return mocker.patch.object(
+        client.session,
+        "request",
+        side_effect=lambda method, url, **kwargs: responses[method],
+    )
+
 
 def test_get_geo_tags(client, mocker, mock_geo_tag):
     # Mock response for the get_geo_tags function
-    mocker.patch("homegater.client.requests.get", return_value=mock_geo_tag)
+    request = mock_session(mocker, client, get=mock_geo_tag)
 
     geo_tags = client.get_geo_tags("Zürich", results_count=1)
 
     # Assert the correct URL is called
     expected_url = "https://api.homegate.ch/geo/locations?lang=en&name=Zürich&size=1"
-    requests.get.assert_called_once_with(expected_url)
+    request.assert_called_once_with("GET", expected_url, timeout=client.timeout)
 
     # Assert that the method returns the expected geo tags
     assert geo_tags == ["12345", "67890"]
@@ -19,11 +39,9 @@ def test_get_geo_tags(client, mocker, mock_geo_tag):
 
 def test_search_buy_listings(client, mocker, mock_geo_tag):
     # Mock response for the search_buy_listings function
-    mocker.patch("homegater.client.requests.get", return_value=mock_geo_tag)
-
     mock_response = MagicMock()
     mock_response.json.return_value = {"listings": [{"id": "1", "title": "Nice House"}]}
-    mocker.patch("homegater.client.requests.post", return_value=mock_response)
+    request = mock_session(mocker, client, get=mock_geo_tag, post=mock_response)
 
     categories = ["HOUSE", "VILLA"]
     result = client.search_buy_listings(categories=categories, location="Zürich")
@@ -42,21 +60,24 @@ def test_search_buy_listings(client, mocker, mock_geo_tag):
         "trackTotalHits": True,
         "fieldset": "srp-list",
     }
-    requests.post.assert_called_once_with(
-        "https://api.homegate.ch/search/listings", json=expected_payload
+    request.assert_called_with(
+        "POST",
+        "https://api.homegate.ch/search/listings",
+        data=ANY,
+        headers=JSON_HEADERS,
+        timeout=client.timeout,
     )
+    assert json.loads(request.call_args[1]["data"]) == expected_payload
     assert result == {"listings": [{"id": "1", "title": "Nice House"}]}
 
 
 def test_search_rent_listings(client, mocker, mock_geo_tag):
-    mocker.patch("homegater.client.requests.get", return_value=mock_geo_tag)
-
     # Mock response for the search_rent_listings function
     mock_response = MagicMock()
     mock_response.json.return_value = {
         "listings": [{"id": "2", "title": "Nice Apartment"}]
     }
-    mocker.patch("homegater.client.requests.post", return_value=mock_response)
+    request = mock_session(mocker, client, get=mock_geo_tag, post=mock_response)
 
     categories = ["APARTMENT", "DUPLEX"]
     result = client.search_rent_listings(
@@ -78,10 +99,14 @@ def test_search_rent_listings(client, mocker, mock_geo_tag):
         "trackTotalHits": True,
         "fieldset": "srp-list",
     }
-    requests.post.assert_called_once_with(
-        "https://api.homegate.ch/search/listings", json=ANY
+    request.assert_called_with(
+        "POST",
+        "https://api.homegate.ch/search/listings",
+        data=ANY,
+        headers=JSON_HEADERS,
+        timeout=ANY,
     )
-    actual_payload = requests.post.call_args[1]["json"]
+    actual_payload = json.loads(request.call_args[1]["data"])
     assert actual_payload == expected_payload
 
     assert result == {"listings": [{"id": "2", "title": "Nice Apartment"}]}
@@ -91,7 +116,7 @@ def test_get_listing(client, mocker):
     # Mock response for the get_listing function
     mock_response = MagicMock()
     mock_response.json.return_value = {"id": "4001544515", "title": "Beautiful Villa"}
-    mocker.patch("homegater.client.requests.get", return_value=mock_response)
+    request = mock_session(mocker, client, get=mock_response)
 
     listing_id = "4001544515"
     result = client.get_listing(listing_id)
@@ -100,7 +125,188 @@ def test_get_listing(client, mocker):
     expected_url = (
         f"https://api.homegate.ch/listings/listing/{listing_id}?sanitize=true"
     )
-    requests.get.assert_called_once_with(expected_url)
+    request.assert_called_once_with("GET", expected_url, timeout=client.timeout)
 
     # Assert that the method returns the expected result
     assert result == {"id": "4001544515", "title": "Beautiful Villa"}
+
+
+def test_connections_are_reused(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+
+    with Homegate(base_url=local_api.url) as client:
+        results = [client.get_listing("1") for _ in range(5)]
+
+    assert results == 5 * [{"id": "1"}]
+    assert len(local_api.requests) == 5
+    assert len(local_api.connections) == 1
+    assert local_api.requests[0]["headers"]["Accept-Encoding"] == "gzip, deflate"
+
+
+def test_retry_on_server_error(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    local_api.failures.extend([503, 429])
+
+    with Homegate(base_url=local_api.url, retries=2, backoff_factor=0) as client:
+        result = client.get_listing("1")
+
+    assert result == {"id": "1"}
+    assert [r["status"] for r in local_api.requests] == [503, 429, 200]
+
+
+def test_close_releases_pool(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+
+    client = Homegate(base_url=local_api.url)
+    client.get_listing("1")
+    client.close()
+    client.get_listing("1")
+
+    assert len(local_api.connections) == 2
+
+
+def test_warm_search_makes_no_geo_calls(local_api):
+    local_api.routes["/geo/locations"] = {
+        "total": 1,
+        "results": [
+            {"geoLocation": {"id": "geo-zipcode-8001", "center": {"lat": 1, "lon": 2}}}
+        ],
+    }
+    local_api.routes["/search/listings"] = {"total": 0, "results": []}
+    cache = LRUCache()
+
+    with Homegate(base_url=local_api.url, geo_cache=cache) as client:
+        for from_index in (0, 20, 40):
+            client.search_rent_listings(location="8001", from_index=from_index)
+
+    paths = [r["path"].split("?")[0] for r in local_api.requests]
+    assert paths.count("/geo/locations") == 1
+    assert paths.count("/search/listings") == 3
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
+def test_iter_listings(local_api):
+    local_api.routes["/geo/locations"] = {
+        "total": 1,
+        "results": [
+            {"geoLocation": {"id": "geo-zipcode-8001", "center": {"lat": 1, "lon": 2}}}
+        ],
+    }
+    local_api.routes["/search/listings"] = paged_search(95)
+
+    with Homegate(base_url=local_api.url) as client:
+        listings = list(
+            client.iter_listings(
+                offer_type="RENT", categories=["APARTMENT"], location="8001", prefetch=3
+            )
+        )
+        limited = list(
+            client.iter_listings(
+                offer_type="RENT",
+                categories=["APARTMENT"],
+                location="geo-zipcode-8001",
+                max_results=25,
+            )
+        )
+
+    assert [listing["id"] for listing in listings] == [str(i) for i in range(95)]
+    assert [listing["id"] for listing in limited] == [str(i) for i in range(25)]
+    paths = [r["path"].split("?")[0] for r in local_api.requests]
+    assert paths.count("/geo/locations") == 1
+    assert paths.count("/search/listings") == 5 + 2
+
+
+def test_get_listings(local_api):
+    for listing_id in ("1", "2", "3"):
+        local_api.routes[f"/listings/listing/{listing_id}"] = {"id": listing_id}
+
+    with Homegate(base_url=local_api.url) as client:
+        results = dict(
+            client.get_listings(["1", "2", "1", "404", "3", "2"], max_workers=2)
+        )
+
+    assert {k: v for k, v in results.items() if k != "404"} == {
+        "1": {"id": "1"},
+        "2": {"id": "2"},
+        "3": {"id": "3"},
+    }
+    assert isinstance(results["404"], requests.HTTPError)
+    assert len(local_api.requests) == 4
+
+
+def test_throttled_requests_back_off(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    local_api.failures.extend([429, 429])
+
+    with Homegate(base_url=local_api.url, rate_limit=100, retries=2) as client:
+        result = client.get_listing("1")
+        stats = client.rate_limiter.stats()
+
+    assert result == {"id": "1"}
+    assert [r["status"] for r in local_api.requests] == [429, 429, 200]
+    assert stats["listing"] == {"rate": pytest.approx(50.1), "queue_depth": 0}
+    assert stats["search"]["rate"] == 100
+
+
+def test_unavailable_requests_retried_by_the_limiter(local_api):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    local_api.failures.extend([503] * 9)
+
+    with Homegate(base_url=local_api.url, rate_limit=100, retries=2) as client:
+        response = client._request(
+            "GET", f"{local_api.url}/listings/listing/1", "listing"
+        )
+
+    assert response.status_code == 503
+    assert len(local_api.requests) == 3
+
+
+def test_unavailable_requests_back_off(local_api, mocker):
+    local_api.routes["/listings/listing/1"] = {"id": "1"}
+    local_api.failures.extend([(503, {}), (503, {})])
+    sleep = mocker.patch("homegater.client.time.sleep")
+
+    with Homegate(base_url=local_api.url, rate_limit=100, retries=2) as client:
+        assert client.get_listing("1") == {"id": "1"}
+
+    assert [r["status"] for r in local_api.requests] == [503, 503, 200]
+    # The rate limiter also sleeps between the requests.
+    backoff = [c.args[0] for c in sleep.call_args_list if c.args[0] >= 0.5]
+    assert backoff == [0.5, 1.0]
+
+
+def test_search_cache(local_api, mocker):
+    local_api.routes["/search/listings"] = {"total": 0, "results": []}
+    search_cache = SearchCache(ttl=60, stale_ttl=60)
+    search = {"location": "geo-zipcode-8001", "categories": ["APARTMENT", "LOFT"]}
+
+    with Homegate(base_url=local_api.url, search_cache=search_cache) as client:
+        client.search_rent_listings(**search)
+        client.search_rent_listings(**{**search, "categories": ["LOFT", "APARTMENT"]})
+        client.search_rent_listings(**search, bypass_cache=True)
+        assert len(local_api.requests) == 2
+
+        mocker.patch("homegater.cache.time.time", return_value=time.time() + 90)
+        assert client.search_rent_listings(**search) == {"total": 0, "results": []}
+        for _ in range(100):
+            if len(local_api.requests) == 3:
+                break
+            time.sleep(0.01)
+
+    assert len(local_api.requests) == 3
+    assert (search_cache.stats.hits, search_cache.stats.stale_hits) == (2, 1)
+
+
+def test_search_precompiled_query(local_api):
+    local_api.routes["/search/listings"] = paged_search(30)
+    query = SearchQuery("RENT", ["APARTMENT"], ["geo-zipcode-8001"], size=20)
+
+    with Homegate(base_url=local_api.url) as client:
+        first = client.search(query)
+        second = client.search(query.page(20))
+
+    assert [len(first["results"]), len(second["results"])] == [20, 10]
+    bodies = [json.loads(r["body"]) for r in local_api.requests]
+    assert [body["from"] for body in bodies] == [0, 20]
+    assert bodies[0] == query.to_dict()
+    assert local_api.requests[0]["headers"]["Content-Type"] == "application/json"
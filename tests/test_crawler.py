@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+from homegater.async_client import AsyncHomegate
+from homegater.client import Homegate
+from homegater.crawler import split_query
+from tests.conftest import paged_search
+
+
+def search_query(geo_tags, **query):
+    return {
+        "query": {"offerType": "BUY", "location": {"geoTags": geo_tags}, **query},
+        "from": 0,
+        "size": 20,
+    }
+
+
+def by_geo_and_price(query, listings):
+    price = query["query"].get("purchasePrice", {})
+    return [
+        listing
+        for listing in listings
+        if listing["geoTag"] in query["query"]["location"]["geoTags"]
+        and price.get("from", 0) <= listing["price"] <= price.get("to", 1e12)
+    ]
+
+
+def test_split_query():
+    by_geo = split_query(search_query(["a", "b", "c"]), "purchasePrice")
+    by_price = split_query(
+        search_query(["a"], purchasePrice={"from": 100, "to": 301}), "purchasePrice"
+    )
+
+    assert [q["query"]["location"]["geoTags"] for q in by_geo] == [["a"], ["b", "c"]]
+    assert [q["query"]["purchasePrice"] for q in by_price] == [
+        {"from": 100, "to": 200},
+        {"from": 200, "to": 301},
+    ]
+    assert (
+        split_query(
+            search_query(["a"], numberOfRooms={"from": 3, "to": 3.5}), "numberOfRooms"
+        )
+        == []
+    )
+    with pytest.raises(ValueError):
+        split_query(search_query(["a"]), "floor")
+
+
+@pytest.fixture
+def listings(local_api):
+    listings = [
+        {"id": str(i), "geoTag": f"geo-zipcode-{8001 + i % 3}", "price": i * 10_000}
+        for i in range(300)
+    ]
+    local_api.routes["/search/listings"] = paged_search(listings, by_geo_and_price)
+    return listings
+
+
+def test_crawl_listings(local_api, listings):
+    location = ["geo-zipcode-8001", "geo-zipcode-8002", "geo-zipcode-8003"]
+
+    with Homegate(base_url=local_api.url, max_search_geo=3) as client:
+        crawled = list(
+            client.crawl_listings(
+                offer_type="BUY", categories=["VILLA"], location=location, max_pages=2
+            )
+        )
+
+    assert sorted(int(r["id"]) for r in crawled) == list(range(300))
+    assert max(json.loads(r["body"])["from"] for r in local_api.requests) < 40
+
+
+def test_crawl_listings_async(local_api, listings):
+    async def run():
+        async with AsyncHomegate(base_url=local_api.url) as client:
+            return [
+                r
+                async for r in client.crawl_listings(
+                    offer_type="BUY",
+                    categories=["VILLA"],
+                    location="geo-zipcode-8001",
+                    purchase_price={"from": 0, "to": 5_000_000},
+                    max_pages=1,
+                )
+            ]
+
+    crawled = asyncio.run(run())
+    assert sorted(int(r["id"]) for r in crawled) == list(range(0, 300, 3))
+    assert {json.loads(r["body"])["from"] for r in local_api.requests} == {0}
+
+
+def test_failed_partition_fails_the_crawl(local_api, listings):
+    handler = local_api.routes["/search/listings"]
+
+    def fail_next(path, body):
+        # The first search succeeds and the partitions it is split in fail.
+        local_api.failures.append(500)
+        return handler(path, body)
+
+    local_api.routes["/search/listings"] = fail_next
+    location = ["geo-zipcode-8001", "geo-zipcode-8002", "geo-zipcode-8003"]
+
+    with Homegate(base_url=local_api.url, max_search_geo=3) as client:
+        with pytest.raises(Exception, match="partition"):
+            list(
+                client.crawl_listings(
+                    offer_type="BUY", categories=["VILLA"], location=location
+                )
+            )
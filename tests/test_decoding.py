@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from homegater.client import Homegate
+from homegater.decoding import compile_fields, get_loads, project_fields
+
+
+def test_get_loads():
+    payload = json.dumps({"name": "Zürich", "rooms": [3.5]}).encode()
+
+    for backend in ("auto", "orjson", "json"):
+        assert get_loads(backend)(payload) == {"name": "Zürich", "rooms": [3.5]}
+    assert get_loads("json") is json.loads
+    with pytest.raises(ValueError):
+        get_loads("simdjson")
+
+
+def test_project_fields():
+    fields = compile_fields(
+        ["id", "listing.prices.rent", "listing.address", "missing.key"]
+    )
+    data = {
+        "id": "1",
+        "remoteViewing": False,
+        "listing": {
+            "prices": {"currency": "CHF", "rent": {"gross": 2500}},
+            "address": {"postalCode": "8001"},
+            "localization": {"de": {}},
+        },
+    }
+
+    assert project_fields(data, fields) == {
+        "id": "1",
+        "listing": {
+            "prices": {"rent": {"gross": 2500}},
+            "address": {"postalCode": "8001"},
+        },
+    }
+
+
+def test_client_projects_fields(local_api):
+    result = {
+        "id": "1",
+        "listing": {"id": "1", "prices": {"currency": "CHF"}, "lister": {}},
+    }
+    local_api.routes["/search/listings"] = {"total": 1, "results": [result]}
+    local_api.routes["/listings/listing/1"] = {"listing": result["listing"]}
+
+    with Homegate(
+        base_url=local_api.url, json_backend="json", fields=["id", "listing.prices"]
+    ) as client:
+        page = client.search_rent_listings(location="geo-zipcode-8001")
+        listing = client.get_listing("1")
+
+    assert page == {
+        "total": 1,
+        "results": [{"id": "1", "listing": {"prices": {"currency": "CHF"}}}],
+    }
+    assert listing == {"listing": {"prices": {"currency": "CHF"}}}
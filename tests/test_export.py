@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from homegater.export import COLUMNS, column_batches, to_arrow, to_numpy, write_parquet
+from tests.conftest import srp_result
+
+
+def result(i):
+    return srp_result(
+        str(i),
+        rent=1000 + i,
+        rooms=3.5 if i % 2 else None,
+        created_at=f"2024-05-{i % 28 + 1:02}T10:00:00Z",
+    )
+
+
+def test_column_batches():
+    batches = list(column_batches((result(i) for i in range(5)), batch_size=2))
+
+    assert [len(b["id"]) for b in batches] == [2, 2, 1]
+    assert tuple(batches[0]) == COLUMNS
+    assert batches[0]["price"] == [1000.0, 1001.0]
+    assert batches[0]["rooms"] == [None, 3.5]
+    assert batches[0]["created_at"] == ["2024-05-01T10:00:00Z", "2024-05-02T10:00:00Z"]
+
+
+def test_to_numpy():
+    (batch,) = to_numpy(result(i) for i in range(3))
+
+    assert batch.dtype.names == COLUMNS
+    assert batch["price"].tolist() == [1000.0, 1001.0, 1002.0]
+    assert np.isnan(batch["rooms"][0]) and batch["rooms"][1] == 3.5
+    assert batch["locality"].tolist() == ["Zürich"] * 3
+    assert batch["postal_code"][2] == "8001"
+
+
+def test_to_arrow_and_parquet(tmp_path):
+    batches = list(to_arrow((result(i) for i in range(5)), batch_size=4))
+    path = str(tmp_path / "listings.parquet")
+    rows = write_parquet((result(i) for i in range(5)), path, batch_size=4)
+
+    assert [b.num_rows for b in batches] == [4, 1]
+    assert batches[0].schema.names == list(COLUMNS)
+    assert batches[0].column("rooms").null_count == 2
+    table = pq.read_table(path)
+    assert rows == table.num_rows == 5
+    assert table.column("price").to_pylist() == [1000.0 + i for i in range(5)]
+    assert math.isclose(table.column("latitude")[0].as_py(), 47.37)
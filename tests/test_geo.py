@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+import homegater.geo
+from homegater.client import Homegate
+from homegater.geo import GeoPoints, distance_m, unique_geo_results
+from homegater.utils import _is_unique_geo_set, _unique_geo_set
+
+
+def geo(geo_id, lat, lon):
+    return {"geoLocation": {"id": geo_id, "center": {"lat": lat, "lon": lon}}}
+
+
+@pytest.fixture
+def points():
+    return GeoPoints(
+        ["geo-city-zurich", "geo-zipcode-8001", "geo-city-horgen", "geo-city-bern"],
+        [47.3769, 47.37690001, 47.2596, 46.948],
+        [8.5417, 8.5417, 8.5975, 7.4474],
+    )
+
+
+def test_distance_m():
+    assert distance_m(47.3769, 8.5417, 46.948, 7.4474) == pytest.approx(
+        95_500, rel=0.01
+    )
+    assert distance_m(47.0, 8.0, 47.0, 8.0) == 0
+
+
+def test_unique_within_tolerance(points):
+    assert points.unique(tolerance_m=0) == [0, 1, 2, 3]
+    assert points.unique() == [0, 2, 3]
+    assert points.unique(tolerance_m=20_000) == [0, 3]
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_unique_matches_pairwise_comparison(numpy, monkeypatch):
+    if not numpy:
+        monkeypatch.setattr(homegater.geo, "np", None)
+    rng = random.Random(0)
+    results = []
+    for i in range(200):
+        if results and i % 3 == 0:
+            # About 0.6 m from a previous center, or at the same center.
+            center = results[rng.randrange(len(results))]["geoLocation"]["center"]
+            lat, lon = center["lat"] + 5e-6 * (i % 2), center["lon"]
+        else:
+            lat, lon = rng.uniform(45.8, 47.8), rng.uniform(5.9, 10.5)
+        results.append(geo(f"geo-{i}", lat, lon))
+
+    expected = []
+    for result in results:
+        center = result["geoLocation"]["center"]
+        if all(
+            distance_m(
+                center["lat"],
+                center["lon"],
+                kept["geoLocation"]["center"]["lat"],
+                kept["geoLocation"]["center"]["lon"],
+            )
+            > 1.0
+            for kept in expected
+        ):
+            expected.append(result)
+
+    assert unique_geo_results(results) == expected
+    assert len(expected) < len(unique_geo_results(results, tolerance_m=0))
+    points = GeoPoints.from_results(results)
+    assert [points.ids[i] for i in points.unique()] == [
+        r["geoLocation"]["id"] for r in expected
+    ]
+
+
+def test_unique_geo_results_matches_utils():
+    results = [geo("a", 1.5, 2.5), geo("b", 1.5, 2.5), geo("c", 1.5, 2.6)]
+
+    assert (
+        unique_geo_results(results)
+        == _unique_geo_set(results)
+        == [
+            results[0],
+            results[2],
+        ]
+    )
+    assert _is_unique_geo_set(results[:2])
+    assert not _is_unique_geo_set(results)
+
+
+def test_client_geo_tolerance(local_api):
+    local_api.routes["/geo/locations"] = {
+        "total": 2,
+        "results": [
+            geo("geo-city-zurich", 47.3769, 8.5417),
+            geo("b", 47.37690001, 8.5417),
+        ],
+    }
+
+    exact = Homegate(base_url=local_api.url, max_search_geo=10)
+    tolerant = Homegate(base_url=local_api.url, geo_tolerance_m=1.0)
+
+    assert exact.get_geo_tags("Zurich", unique=True) == ["geo-city-zurich", "b"]
+    assert tolerant.get_geo_tags("Zurich", unique=True) == ["geo-city-zurich"]
+
+
+def test_grid_index(points):
+    index = points.index(cell_m=1000)
+
+    assert index.nearest(47.37, 8.54) == "geo-city-zurich"
+    assert index.nearest(46.9, 7.4) == "geo-city-bern"
+    assert index.within(47.37, 8.54, radius_m=2_000) == [
+        "geo-city-zurich",
+        "geo-zipcode-8001",
+    ]
+    assert index.within(47.37, 8.54, radius_m=20_000)[-1] == "geo-city-horgen"
+    assert GeoPoints([], [], []).index().nearest(47.0, 8.0) is None
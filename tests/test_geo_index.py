@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from homegater.client import Homegate
+from homegater.geo_index import GeoIndex, main, normalize_location_name
+
+
+def geo(geo_id, lat, lon):
+    return {"geoLocation": {"id": geo_id, "center": {"lat": lat, "lon": lon}}}
+
+
+@pytest.fixture
+def records():
+    return [
+        {
+            "name": "Zürich",
+            "lang": "de",
+            "response": {"total": 1, "results": [geo("geo-city-zurich", 47.37, 8.54)]},
+        },
+        {
+            "name": "8001",
+            "lang": "en",
+            "response": {
+                "total": 2,
+                "results": [
+                    geo("geo-zipcode-8001", 47.37, 8.54),
+                    geo("geo-city-zurich", 47.37, 8.54),
+                ],
+            },
+        },
+        {
+            "name": "Horgen",
+            "lang": "en",
+            "response": {
+                "total": 3,
+                "results": [
+                    geo("geo-city-horgen", 47.25, 8.59),
+                    geo("geo-region-horgen", 47.26, 8.6),
+                ],
+            },
+        },
+    ]
+
+
+def test_normalize_location_name():
+    assert normalize_location_name("  Zürich ") == "zurich"
+    assert normalize_location_name("Neuchâtel") == "neuchatel"
+    assert normalize_location_name("La  Chaux-de-Fonds") == "la chaux-de-fonds"
+
+
+def test_lookup(records):
+    index = GeoIndex.from_records(records)
+
+    assert index.lookup("zurich", "de") == [geo("geo-city-zurich", 47.37, 8.54)]
+    assert index.lookup("Zürich", "en") is None
+    # Zip codes are indexed for every language.
+    assert [g["geoLocation"]["id"] for g in index.lookup("8001", "fr")] == [
+        "geo-zipcode-8001",
+        "geo-city-zurich",
+    ]
+    assert len(index.lookup("8001", "it", results_count=1)) == 1
+    # Only two of the three results of Horgen were recorded.
+    assert len(index.lookup("Horgen", "en", results_count=2)) == 2
+    assert index.lookup("Horgen", "en", results_count=100) is None
+
+
+def test_build_command(records, tmp_path):
+    inputs = tmp_path / "lookups.jsonl"
+    inputs.write_text("\n".join(json.dumps(record) for record in records))
+    output = tmp_path / "index.json"
+
+    main(["build", str(output), str(inputs)])
+
+    index = GeoIndex.load(str(output))
+    assert index.keys == ["*:8001", "de:zurich", "en:horgen"]
+    assert index.lookup("zürich", "de") == GeoIndex.from_records(records).lookup(
+        "zürich", "de"
+    )
+
+
+def test_client_resolves_from_index(records, mocker):
+    client = Homegate(geo_index=GeoIndex.from_records(records))
+    request = mocker.patch.object(client.session, "request")
+
+    assert client.get_geo_tags("8001") == ["geo-zipcode-8001"]
+    assert client.get_geo_tags("8001", unique=False) == [
+        "geo-zipcode-8001",
+        "geo-city-zurich",
+    ]
+    request.assert_not_called()
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from homegater.async_client import AsyncHomegate
+from homegater.client import Homegate
+from homegater.incremental import Cursor, CursorStore, IncrementalScan
+from tests.conftest import paged_search, srp_result
+
+
+def result(listing_id, created_at):
+    return srp_result(listing_id, created_at=created_at)
+
+
+def newest_first(query, listings):
+    return sorted(listings, key=lambda r: r["listing"]["meta"]["createdAt"])[::-1]
+
+
+def test_scan_stops_at_cursor():
+    scan = IncrementalScan(Cursor("2024-05-02", ["3"]))
+
+    assert not scan.feed([result("5", "2024-05-03"), result("4", "2024-05-02")])
+    assert scan.feed(
+        [
+            result("4", "2024-05-02"),
+            result("3", "2024-05-02"),
+            result("2", "2024-05-01"),
+        ]
+    )
+    assert [r["id"] for r in scan.new] == ["5", "4"]
+    assert scan.next_cursor() == Cursor("2024-05-03", ["5"])
+
+
+def test_sync_listings(local_api, tmp_path):
+    listings = [result(str(i), f"2024-05-{i // 2 + 1:02}") for i in range(50)]
+    local_api.routes["/search/listings"] = paged_search(listings, newest_first)
+    store = CursorStore(str(tmp_path / "cursors.sqlite"))
+    search = {"offer_type": "RENT", "categories": ["APARTMENT"], "page_size": 10}
+
+    with Homegate(base_url=local_api.url) as client:
+        first = client.sync_listings(store=store, **search)
+        assert len(local_api.requests) == 5
+        assert client.sync_listings(store=store, **search) == []
+        listings.extend([result("50", "2024-05-25"), result("51", "2024-05-26")])
+        new = client.sync_listings(store=store, **search)
+
+    assert len(first) == 50
+    assert [r["id"] for r in new] == ["51", "50"]
+    assert len(local_api.requests) == 5 + 1 + 1
+    assert store.get(Homegate._cursor_key(json.loads(local_api.requests[-1]["body"])))
+
+
+def test_sync_listings_stops_at_empty_page(local_api, tmp_path):
+    listings = [result(str(i), f"2024-05-{i + 1:02}") for i in range(5)]
+    handler = paged_search(listings, newest_first)
+    # The total overstates the results, e.g. when listings are removed during the scan.
+    local_api.routes["/search/listings"] = lambda path, body: {
+        **handler(path, body),
+        "total": 100,
+    }
+    store = CursorStore(str(tmp_path / "cursors.sqlite"))
+
+    with Homegate(base_url=local_api.url) as client:
+        new = client.sync_listings(
+            offer_type="BUY", categories=["VILLA"], store=store, page_size=5
+        )
+
+    assert len(new) == 5
+    assert len(local_api.requests) == 2
+
+
+def test_sync_listings_async(local_api, tmp_path):
+    listings = [result(str(i), f"2024-05-{i + 1:02}") for i in range(5)]
+    local_api.routes["/search/listings"] = paged_search(listings, newest_first)
+    store = CursorStore(str(tmp_path / "cursors.sqlite"))
+
+    async def run():
+        async with AsyncHomegate(base_url=local_api.url) as client:
+            first = await client.sync_listings(
+                offer_type="BUY", categories=["VILLA"], store=store
+            )
+            listings.append(result("5", "2024-05-06"))
+            second = await client.sync_listings(
+                offer_type="BUY", categories=["VILLA"], store=store
+            )
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert [r["id"] for r in first] == ["4", "3", "2", "1", "0"]
+    assert [r["id"] for r in second] == ["5"]
+
+
+def test_sync_listings_keeps_cursor_on_error(local_api, tmp_path):
+    local_api.failures.append(500)
+    store = CursorStore(str(tmp_path / "cursors.sqlite"))
+
+    with Homegate(base_url=local_api.url) as client:
+        with pytest.raises(Exception, match="cursor is left unchanged"):
+            client.sync_listings(offer_type="BUY", categories=["VILLA"], store=store)
@@ -0,0 +1,134 @@
+import asyncio
+
+import httpx
+
+from homegater.async_client import AsyncHomegate
+from homegater.cache import SearchCache
+from homegater.client import Homegate
+from homegater.metrics import Histogram, Metrics, OpenTelemetryMetrics
+from tests.conftest import paged_search
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert (histogram.count, histogram.sum) == (4, 3.65)
+
+
+def test_prometheus_export():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.request_end("search", 200, 0.05, 120, 2048)
+    metrics.request_end("search", None, 2.0, 120, 0)
+    metrics.cache("geo_cache", hit=True)
+
+    text = metrics.to_prometheus()
+
+    assert text.splitlines()[:3] == [
+        "# HELP homegater_requests_total API requests by endpoint and status.",
+        "# TYPE homegater_requests_total counter",
+        'homegater_requests_total{endpoint="search",status="200"} 1',
+    ]
+    assert 'homegater_requests_total{endpoint="search",status="error"} 1' in text
+    assert (
+        'homegater_request_duration_seconds_bucket{endpoint="search",le="0.1"} 1'
+        in text
+    )
+    assert (
+        'homegater_request_duration_seconds_bucket{endpoint="search",le="+Inf"} 2'
+        in text
+    )
+    assert 'homegater_request_duration_seconds_count{endpoint="search"} 2' in text
+    assert 'homegater_response_bytes_total{endpoint="search"} 2048' in text
+    assert 'homegater_cache_lookups_total{cache="geo_cache",result="hit"} 1' in text
+    assert "decode_seconds" not in text
+
+
+def test_client_metrics(local_api):
+    local_api.routes["/geo/locations"] = {
+        "total": 1,
+        "results": [
+            {"geoLocation": {"id": "geo-zipcode-8001", "center": {"lat": 1, "lon": 2}}}
+        ],
+    }
+    local_api.routes["/search/listings"] = paged_search(5)
+    local_api.failures.append(503)
+    metrics = Metrics()
+
+    with Homegate(
+        base_url=local_api.url,
+        retries=1,
+        backoff_factor=0,
+        search_cache=SearchCache(),
+        instrumentation=metrics,
+    ) as client:
+        client.search_rent_listings(location="8001")
+        client.search_rent_listings(location="geo-zipcode-8001")
+
+    assert metrics.counter("requests_total", endpoint="geo", status="200") == 1
+    assert metrics.counter("requests_total", endpoint="search", status="200") == 1
+    assert metrics.counter("retries_total", endpoint="geo", reason="503") == 1
+    assert metrics.counter("request_bytes_total", endpoint="search") > 0
+    assert metrics.counter("response_bytes_total", endpoint="search") > 0
+    assert metrics.histogram("decode_seconds", endpoint="search").count == 1
+    assert metrics.histogram("first_byte_seconds", endpoint="geo").count == 1
+    assert (
+        metrics.counter("cache_lookups_total", cache="search_cache", result="hit") == 1
+    )
+
+
+def test_async_client_metrics():
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={"total": 0, "results": []})
+
+    metrics = Metrics()
+
+    async def run():
+        async with AsyncHomegate(
+            retries=1,
+            backoff_factor=0,
+            instrumentation=metrics,
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            return await client.search_rent_listings(location="geo-zipcode-8001")
+
+    assert asyncio.run(run()) == {"total": 0, "results": []}
+    assert metrics.counter("requests_total", endpoint="search", status="503") == 1
+    assert metrics.counter("requests_total", endpoint="search", status="200") == 1
+    assert metrics.counter("retries_total", endpoint="search", reason="503") == 1
+    assert metrics.histogram("request_duration_seconds", endpoint="search").count == 2
+
+
+def test_open_telemetry_metrics():
+    recorded = []
+
+    class Instrument:
+        def __init__(self, name):
+            self.name = name
+
+        def add(self, value, attributes):
+            recorded.append((self.name, value, attributes))
+
+        record = add
+
+    class Meter:
+        def create_counter(self, name, unit, description):
+            return Instrument(name)
+
+        create_histogram = create_counter
+
+    hooks = OpenTelemetryMetrics(Meter())
+    hooks.request_end("listing", 404, 0.2, 0, 10)
+    hooks.error("search", ValueError())
+
+    assert recorded == [
+        ("homegater.requests", 1, {"endpoint": "listing", "status": "404"}),
+        ("homegater.request.duration", 0.2, {"endpoint": "listing", "status": "404"}),
+        ("homegater.bytes", 0, {"endpoint": "listing", "direction": "sent"}),
+        ("homegater.bytes", 10, {"endpoint": "listing", "direction": "received"}),
+        ("homegater.errors", 1, {"endpoint": "search", "type": "ValueError"}),
+    ]
@@ -0,0 +1,75 @@
+import json
+import math
+
+import pytest
+
+from homegater.models import Listing, SearchPage
+from tests.conftest import srp_result
+
+
+def test_listing_from_result():
+    result = srp_result("1", rent=2500)
+    listing = Listing.from_result(result)
+
+    assert listing == Listing(
+        id="1",
+        offer_type="RENT",
+        category="APARTMENT",
+        price=2500.0,
+        currency="CHF",
+        rooms=3.5,
+        living_space=80.0,
+        postal_code="8001",
+        locality="Zürich",
+        latitude=47.37,
+        longitude=8.54,
+    )
+    assert listing.raw == result
+    assert not hasattr(listing, "__dict__")
+
+
+def test_listing_from_partial_result():
+    listing = Listing.from_result({"listing": {"id": 42}})
+
+    assert listing.id == "42"
+    assert listing.price is None and listing.latitude is None
+
+
+def test_search_page_to_columns():
+    page = SearchPage.from_response(
+        {
+            "from": 20,
+            "size": 2,
+            "total": 22,
+            "results": [
+                srp_result("1", rent=2500),
+                srp_result("2", price=1e6, rooms=None),
+            ],
+        }
+    )
+    columns = page.to_columns()
+
+    assert (page.from_index, page.total, len(page)) == (20, 22, 2)
+    assert [listing.id for listing in page] == ["1", "2"]
+    assert columns["price"].tolist() == [2500.0, 1e6]
+    assert columns["rooms"][0] == 3.5 and math.isnan(columns["rooms"][1])
+    assert columns["offer_type"] == ["RENT", "BUY"]
+
+
+def test_search_page_from_bytes():
+    results = [srp_result("1", rent=2500), srp_result("2", price=1e6)]
+    texts = [json.dumps(r, ensure_ascii=False) for r in results]
+    content = (
+        f'{{"from": 0, "size": 2,\n "results": [ {texts[0]} ,{texts[1]} ], "total": 2}}'
+    ).encode()
+
+    page = SearchPage.from_bytes(content)
+
+    assert (page.from_index, page.size, page.total) == (0, 2, 2)
+    assert page.listings == SearchPage.from_response(json.loads(content)).listings
+    assert [listing._payload.decode() for listing in page] == texts
+    assert page.listings[0].raw == results[0]
+    assert page.listings[0].raw is page.listings[0].raw
+    assert len(SearchPage.from_bytes(b'{"total": 0, "results": []}')) == 0
+    with pytest.raises(ValueError):
+        SearchPage.from_bytes(b'{"results": [{"id": "1"}')
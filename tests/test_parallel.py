@@ -0,0 +1,168 @@
+import json
+import time
+
+import pyarrow.parquet as pq
+import pytest
+
+from homegater.parallel import (
+    CrawlCheckpoint,
+    JsonlSink,
+    ParquetSink,
+    ProcessCrawler,
+    crawl_plan,
+)
+from tests.conftest import paged_search
+
+
+def geo_locations(path, body):
+    name = path.split("name=")[1].split("&")[0]
+    return {
+        "total": 1,
+        "results": [
+            {
+                "geoLocation": {
+                    "id": f"geo-zipcode-{name}",
+                    "center": {"lat": 47.3, "lon": 8.5},
+                }
+            }
+        ],
+    }
+
+
+def by_geo_and_category(query, listings):
+    """Gives the listings distinct ids per geo tag and category."""
+    geo_tag = query["query"]["location"]["geoTags"][0]
+    category = query["query"]["categories"][0]
+    return [{"id": f"{geo_tag}-{category}-{r['id']}"} for r in listings]
+
+
+@pytest.fixture
+def crawl_api(local_api):
+    local_api.routes["/geo/locations"] = geo_locations
+    local_api.routes["/search/listings"] = paged_search(45, by_geo_and_category)
+    return local_api
+
+
+def crawler(url, **kwargs):
+    return ProcessCrawler(2, base_url=url, page_size=10, coalesce=False, **kwargs)
+
+
+def test_crawl_plan():
+    assert crawl_plan("RENT", ["8001", "8002"], ["APARTMENT", "HOUSE"], size=10) == [
+        {
+            "offer_type": "RENT",
+            "categories": ["APARTMENT"],
+            "location": "8001",
+            "size": 10,
+        },
+        {"offer_type": "RENT", "categories": ["HOUSE"], "location": "8001", "size": 10},
+        {
+            "offer_type": "RENT",
+            "categories": ["APARTMENT"],
+            "location": "8002",
+            "size": 10,
+        },
+        {"offer_type": "RENT", "categories": ["HOUSE"], "location": "8002", "size": 10},
+    ]
+
+
+def test_crawl_into_jsonl(crawl_api, tmp_path):
+    path = tmp_path / "listings.jsonl"
+    searches = crawl_plan("RENT", ["8001", "8002"], ["APARTMENT", "HOUSE"])
+
+    with JsonlSink(str(path)) as sink:
+        stats = crawler(crawl_api.url).crawl(searches, sink)
+
+    ids = [json.loads(line)["id"] for line in path.read_text().splitlines()]
+    assert len(ids) == len(set(ids)) == 4 * 45
+    assert (stats.searches, stats.pages, stats.results) == (4, 20, 180)
+    assert stats.failed == 0
+    assert sum(r["path"].startswith("/search") for r in crawl_api.requests) == 20
+
+
+def test_failed_searches_are_reported(crawl_api):
+    results = []
+    searches = crawl_plan("RENT", ["8001", "not-a-geo-tag!"], ["APARTMENT"])
+    crawl_api.routes["/geo/locations"] = lambda path, body: (
+        {"total": 0, "results": []}
+        if "not-a-geo" in path
+        else geo_locations(path, body)
+    )
+
+    stats = crawler(crawl_api.url).crawl(searches, results.extend)
+
+    assert len(results) == 45
+    assert stats.failed == 1
+    assert "not-a-geo-tag!" in stats.errors[0]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_resume_from_checkpoint(crawl_api, tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "crawl.sqlite"))
+    searches = crawl_plan("RENT", ["8001"], ["APARTMENT"])
+    first_run = []
+
+    def interrupted_sink(results):
+        if len(first_run) == 2:
+            raise Interrupted()
+        first_run.append(results)
+
+    with pytest.raises(Interrupted):
+        crawler(crawl_api.url, checkpoint=checkpoint, checkpoint_every=1).crawl(
+            searches, interrupted_sink
+        )
+    crawl_api.requests.clear()
+
+    second_run = []
+    stats = crawler(crawl_api.url, checkpoint=checkpoint).crawl(
+        searches, second_run.extend
+    )
+
+    ids = [r["id"] for page in first_run for r in page] + [r["id"] for r in second_run]
+    assert sorted(ids) == sorted(f"geo-zipcode-8001-APARTMENT-{i}" for i in range(45))
+    assert stats.skipped_pages == 2
+    assert stats.pages == 3
+    # The plan of the search is restored, so its location is not resolved again.
+    assert [r["path"].split("?")[0] for r in crawl_api.requests] == [
+        "/search/listings"
+    ] * 3
+
+
+def test_shared_rate_budget(crawl_api):
+    searches = crawl_plan("RENT", ["8001"], ["APARTMENT"])
+    handler = paged_search(45, by_geo_and_category)
+    sent = []
+
+    def timed_handler(path, body):
+        sent.append(time.monotonic())
+        return handler(path, body)
+
+    crawl_api.routes["/search/listings"] = timed_handler
+    results = []
+    crawler(crawl_api.url, rate_limit=10).crawl(searches, results.extend)
+
+    # The 5 pages are sent by both workers at 10 requests per second in total.
+    assert len(results) == 45
+    assert max(sent) - min(sent) >= 0.9 * 4 / 10
+
+
+def test_parquet_sink(tmp_path):
+    directory = tmp_path / "listings"
+    with ParquetSink(str(directory), batch_size=2) as sink:
+        sink.write([{"id": "1"}, {"id": "2"}, {"id": "3"}])
+        sink.flush()
+        sink.write([{"id": "4"}])
+
+    assert sorted(p.name for p in directory.iterdir()) == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+    ]
+    assert sorted(pq.read_table(str(directory))["id"].to_pylist()) == [
+        "1",
+        "2",
+        "3",
+        "4",
+    ]
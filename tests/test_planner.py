@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from homegater.async_client import AsyncHomegate
+from homegater.client import Homegate
+from homegater.planner import plan_searches
+
+
+def zip_search(listings):
+    """Stand-in /search/listings handler filtering the listings by zip code geo tag."""
+
+    def handler(path, body):
+        query = json.loads(body)
+        zipcodes = {tag.split("-")[-1] for tag in query["query"]["location"]["geoTags"]}
+        matches = [
+            r for r in listings if r["listing"]["address"]["postalCode"] in zipcodes
+        ]
+        return {"total": len(matches), "results": matches[: query["size"]]}
+
+    return handler
+
+
+def listing(listing_id, postal_code):
+    return {"id": listing_id, "listing": {"address": {"postalCode": postal_code}}}
+
+
+def final_query(geo_tags, offer_type="RENT", from_index=0, size=20):
+    return {
+        "query": {"offerType": offer_type, "location": {"geoTags": geo_tags}},
+        "from": from_index,
+        "size": size,
+    }
+
+
+def test_plan_searches():
+    queries = [
+        final_query(["geo-zipcode-8001"]),
+        final_query(["geo-zipcode-8002"]),
+        final_query(["geo-zipcode-8003"], offer_type="BUY"),
+        final_query(["geo-city-zurich"]),
+        final_query(["geo-zipcode-8004"], from_index=20),
+        final_query(["geo-zipcode-8005"], size=70),
+    ]
+
+    planned = plan_searches(queries, max_merged_size=100)
+
+    assert [[i for i, _ in s.members] for s in planned] == [[0, 1], [2], [3], [4], [5]]
+    assert planned[0].query["query"]["location"]["geoTags"] == [
+        "geo-zipcode-8001",
+        "geo-zipcode-8002",
+    ]
+    assert planned[0].query["size"] == 100
+    assert queries[0]["query"]["location"]["geoTags"] == ["geo-zipcode-8001"]
+
+
+def test_search_many(local_api):
+    listings = [listing(str(i), str(8001 + i % 4)) for i in range(20)]
+    local_api.routes["/search/listings"] = zip_search(listings)
+    local_api.routes["/geo/locations"] = lambda path, body: {
+        "total": 1,
+        "results": [
+            {
+                "geoLocation": {
+                    "id": f"geo-zipcode-{path.split('name=')[1].split('&')[0]}",
+                    "center": {"lat": 1, "lon": 2},
+                }
+            }
+        ],
+    }
+    queries = [
+        {"offer_type": "RENT", "categories": ["APARTMENT"], "location": str(zipcode)}
+        for zipcode in (8001, 8002, 8003, 8004)
+    ]
+    queries.append({**queries[0], "location": "geo-zipcode-8001", "size": 2})
+
+    with Homegate(base_url=local_api.url) as client:
+        plan = client.plan_search_many(queries)
+        expected = [client.search_listings(**query) for query in queries]
+        local_api.requests.clear()
+        responses = client.search_many(queries)
+
+    assert (plan.naive_requests, plan.planned_requests) == (5 + 4, 4 + 1)
+    assert [r["results"] for r in responses] == [r["results"] for r in expected]
+    assert [r["total"] for r in responses] == [5, 5, 5, 5, 5]
+    paths = [r["path"].split("?")[0] for r in local_api.requests]
+    assert paths.count("/geo/locations") == 4
+    assert paths.count("/search/listings") == 1
+
+
+def test_search_many_dispatches_full_pages_of_incomplete_response(local_api):
+    listings = [listing(str(i), str(8001 + i % 3)) for i in range(180)]
+    local_api.routes["/search/listings"] = zip_search(listings)
+    queries = [
+        {
+            "offer_type": "RENT",
+            "categories": ["APARTMENT"],
+            "location": f"geo-zipcode-{z}",
+        }
+        for z in (8001, 8002, 8003)
+    ]
+
+    with Homegate(base_url=local_api.url) as client:
+        expected = [client.search_listings(**query) for query in queries]
+        local_api.requests.clear()
+        plan = client.plan_search_many(queries)
+        responses = client.search_many(queries, plan=plan)
+
+    assert [r["results"] for r in responses] == [r["results"] for r in expected]
+    assert [r["total"] for r in responses] == [34, 33, 33]
+    assert (plan.naive_requests, plan.planned_requests) == (3, 1)
+    assert len(local_api.requests) == 1
+
+
+def test_search_many_falls_back_when_incomplete(local_api):
+    listings = [listing(str(i), "8002" if i % 5 == 0 else "8001") for i in range(50)]
+    local_api.routes["/search/listings"] = zip_search(listings)
+    queries = [
+        {
+            "offer_type": "RENT",
+            "categories": ["APARTMENT"],
+            "location": f"geo-zipcode-{z}",
+        }
+        for z in (8001, 8002)
+    ]
+
+    async def run():
+        async with AsyncHomegate(base_url=local_api.url) as client:
+            plan = await client.plan_search_many(queries, max_merged_size=20 * 2)
+            return plan, await client.search_many(queries, plan=plan)
+
+    plan, responses = asyncio.run(run())
+    # The merged page fills the first page of 8001 only, 8002 is sent on its own.
+    assert [len(r["results"]) for r in responses] == [20, 10]
+    assert [r["total"] for r in responses] == [32, 10]
+    assert plan.planned_requests == len(local_api.requests) == 1 + 1
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from homegater.cache import query_fingerprint
+from homegater.query import FLAT_CATEGORY, SearchQuery
+
+
+def test_search_query_body():
+    query = SearchQuery(
+        "RENT",
+        ["APARTMENT"],
+        ["geo-zipcode-8001"],
+        size=10,
+        monthly_rent={"to": 3000},
+    )
+
+    assert json.loads(query.to_bytes()) == {
+        "query": {
+            "offerType": "RENT",
+            "categories": ["APARTMENT"],
+            "location": {"geoTags": ["geo-zipcode-8001"]},
+            "monthlyRent": {"to": 3000},
+        },
+        "sortBy": "dateCreated",
+        "sortDirection": "desc",
+        "from": 0,
+        "size": 10,
+        "trackTotalHits": True,
+        "fieldset": "srp-list",
+    }
+    assert json.loads(query.to_bytes()) == query.to_dict()
+    assert query_fingerprint(query) == query_fingerprint(query.to_dict())
+
+
+def test_search_query_page():
+    query = SearchQuery("BUY", FLAT_CATEGORY, ["geo-city-zurich"], size=20)
+    page = query.page(40)
+
+    assert (page.from_index, page.size) == (40, 20)
+    assert (query.from_index, query.size) == (0, 20)
+    assert page.to_dict() == {**query.to_dict(), "from": 40}
+    assert json.loads(query.page(60, size=5).to_bytes())["size"] == 5
+    assert page != query
+    assert page.page(0) == query
+
+
+def test_search_queries_share_their_compilation():
+    rent = {"from": 1000, "to": 3000}
+    query = SearchQuery("RENT", ["HOUSE", "APARTMENT"], monthly_rent=rent)
+    rent["to"] = 2000
+    same = SearchQuery(
+        "RENT", ["APARTMENT", "HOUSE"], monthly_rent={"from": 1000, "to": 3000}
+    )
+
+    assert query.to_bytes() == same.to_bytes()
+    assert query.params["monthlyRent"] == {"from": 1000, "to": 3000}
+    assert SearchQuery("RENT", ["HOUSE"], numberOfRooms=1) != SearchQuery(
+        "RENT", ["HOUSE"], numberOfRooms=1.0
+    )
+
+
+def test_search_query_is_immutable():
+    query = SearchQuery("BUY", ["VILLA"], price_to=100)
+
+    with pytest.raises(AttributeError):
+        query.from_index = 20
+    with pytest.raises(TypeError):
+        query.params["priceTo"] = 200
+
+
+@pytest.mark.parametrize(
+    "offer_type, categories",
+    [("SELL", ["VILLA"]), ("BUY", "VILLA"), ("BUY", []), ("BUY", ["villa"])],
+)
+def test_search_query_validation(offer_type, categories):
+    with pytest.raises(ValueError):
+        SearchQuery(offer_type, categories)
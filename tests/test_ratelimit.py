@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from homegater.ratelimit import (
+    AdaptiveTokenBucket,
+    RateLimiter,
+    TokenBucket,
+    parse_retry_after,
+)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=200, burst=1)
+
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+
+    assert time.monotonic() - start == pytest.approx(0.05, abs=0.03)
+
+
+def test_token_bucket_async():
+    bucket = TokenBucket(rate=200, burst=5)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(15)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) == pytest.approx(0.05, abs=0.03)
+
+
+def test_adaptive_token_bucket_aimd(mocker):
+    now = mocker.patch("homegater.ratelimit.time.monotonic", return_value=100.0)
+    bucket = AdaptiveTokenBucket(rate=10, max_rate=12, increase=1, cooldown=1)
+
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 5
+
+    now.return_value = 101.0
+    bucket.on_throttle(retry_after=2)
+    assert bucket.rate == 2.5
+    assert bucket._reserve(1) == pytest.approx(2.4)
+
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 12
+
+
+def test_rate_limiter_per_endpoint():
+    limiter = RateLimiter({"search": 4, "listing": 2})
+
+    assert limiter.report("search", 429, retry_after=0)
+    assert not limiter.report("search", 200)
+    assert not limiter.report("geo", 429)
+    assert limiter.stats() == {
+        "search": {"rate": pytest.approx(2.1), "queue_depth": 0},
+        "listing": {"rate": 2, "queue_depth": 0},
+    }
+
+
+def test_parse_retry_after(mocker):
+    mocker.patch("homegater.ratelimit.time.time", return_value=1445412480.0)
+
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:30:00 GMT") == 120
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from homegater.async_client import AsyncHomegate
+from homegater.client import Homegate
+from homegater.query import SearchQuery
+from homegater.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def slow_listing(path, body):
+    time.sleep(0.2)
+    return {"id": path.split("?")[0].rsplit("/", 1)[1]}
+
+
+def test_concurrent_calls_share_one_request(local_api):
+    local_api.routes["/listings/listing/1"] = slow_listing
+    client = Homegate(base_url=local_api.url)
+    barrier = threading.Barrier(8)
+
+    def get(_):
+        barrier.wait()
+        return client.get_listing("1")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(get, range(8)))
+
+    assert results == [{"id": "1"}] * 8
+    assert len(local_api.requests) == 1
+    assert client.single_flight.stats.calls == 1
+    assert client.single_flight.stats.shared == 7
+
+    # The key is released once the call completed.
+    client.get_listing("1")
+    assert len(local_api.requests) == 2
+
+
+def test_coalescing_disabled(local_api):
+    local_api.routes["/listings/listing/1"] = slow_listing
+    client = Homegate(base_url=local_api.url, coalesce=False)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: client.get_listing("1"), range(4)))
+
+    assert client.single_flight is None
+    assert len(local_api.requests) == 4
+
+
+def test_search_request_keys():
+    query = SearchQuery("RENT", ["APARTMENT"], ["geo-zipcode-8001"])
+    url = "https://api.homegate.ch/search/listings"
+
+    assert Homegate._request_key("POST", url, query) == (
+        f"POST {url} {query.to_bytes().decode()}"
+    )
+    assert Homegate._request_key("POST", url, query) != Homegate._request_key(
+        "POST", url, query.page(20)
+    )
+    # The lists of a SearchQuery are sorted, its body is the same in any order.
+    assert Homegate._request_key(
+        "POST", url, SearchQuery("RENT", ["HOUSE", "APARTMENT"], ["b", "a"])
+    ) == Homegate._request_key(
+        "POST", url, SearchQuery("RENT", ["APARTMENT", "HOUSE"], ["a", "b"])
+    )
+    # The dicts are keyed by the fingerprint of their canonical JSON.
+    assert Homegate._request_key(
+        "POST", url, {"a": 1, "b": 2}
+    ) == Homegate._request_key("POST", url, {"b": 2, "a": 1})
+
+
+def test_exception_shared_with_waiting_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait()
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", fail)
+        started.wait()
+        follower = executor.submit(flight.do, "key", fail)
+        while flight.stats.shared == 0:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="boom"):
+                future.result()
+
+    assert flight.stats.calls == 1
+
+
+def test_async_concurrent_calls_share_one_request():
+    paths = []
+
+    async def handler(request):
+        paths.append(request.url.path)
+        await asyncio.sleep(0.01)
+        if request.url.path == "/geo/locations":
+            return httpx.Response(
+                200,
+                json={
+                    "total": 1,
+                    "results": [
+                        {
+                            "geoLocation": {
+                                "id": "geo-zipcode-8001",
+                                "center": {"lat": 1, "lon": 2},
+                            }
+                        }
+                    ],
+                },
+            )
+        return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[1]})
+
+    async def run():
+        async with AsyncHomegate(transport=httpx.MockTransport(handler)) as client:
+            tags = await asyncio.gather(
+                *(client.get_geo_tags("8001") for _ in range(5))
+            )
+            listings = await asyncio.gather(
+                *(client.get_listing(listing_id) for listing_id in "11122")
+            )
+            return tags, listings
+
+    tags, listings = asyncio.run(run())
+
+    assert tags == [["geo-zipcode-8001"]] * 5
+    assert listings == [{"id": "1"}] * 3 + [{"id": "2"}] * 2
+    assert sorted(paths) == [
+        "/geo/locations",
+        "/listings/listing/1",
+        "/listings/listing/2",
+    ]
+
+
+def test_async_cancelled_caller_does_not_cancel_the_call():
+    flight = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert flight.stats.calls == 1
+    assert flight.stats.shared == 1
@@ -0,0 +1,132 @@
+import pytest
+
+from homegater.client import Homegate
+from homegater.query import SearchQuery
+from homegater.store import ListingStore
+from tests.conftest import srp_result
+
+RESULTS = [
+    srp_result("1", 1500, rooms=2.5, created_at="2024-01-01"),
+    srp_result("2", 2500, rooms=3.5, created_at="2024-01-03"),
+    srp_result("3", 3500, rooms=4.5, created_at="2024-01-02"),
+    srp_result("4", 2000, rooms=3.0, created_at="2024-01-04", category="HOUSE"),
+    srp_result("5", 1800, rooms=2.0, created_at="2024-01-05", zip_code="8002"),
+]
+
+
+@pytest.fixture
+def store():
+    store = ListingStore()
+    query = SearchQuery("RENT", ["APARTMENT", "HOUSE"], ["geo-city-zurich"])
+    store.add_search(query, {"total": 5, "results": RESULTS})
+    return store
+
+
+def ids(response):
+    return [r["id"] for r in response["results"]]
+
+
+def test_search_filters(store):
+    query = SearchQuery(
+        "RENT", ["APARTMENT"], ["geo-zipcode-8001"], monthly_rent={"to": 3000}
+    )
+    response = store.search(query)
+
+    assert ids(response) == ["2", "1"]
+    assert response["total"] == 2
+    assert all("fetchedAt" in r for r in response["results"])
+
+    query = SearchQuery(
+        "RENT", ["APARTMENT", "HOUSE"], ["geo-city-zurich"], numberOfRooms={"from": 3}
+    )
+    assert ids(store.search(query)) == ["4", "2", "3"]
+    assert ids(store.search(SearchQuery("BUY", ["APARTMENT"]))) == []
+
+
+def test_multiple_location_search_tags_by_zip_code():
+    store = ListingStore()
+    query = SearchQuery("RENT", ["APARTMENT"], ["geo-city-zurich", "geo-city-bern"])
+    store.add_search(
+        query,
+        {
+            "total": 2,
+            "results": [
+                srp_result("1", 1500, rooms=2.5, created_at="2024-01-01"),
+                srp_result(
+                    "2", 1600, rooms=2.5, created_at="2024-01-02", zip_code="3011"
+                ),
+            ],
+        },
+    )
+
+    assert (
+        ids(store.search(SearchQuery("RENT", ["APARTMENT"], ["geo-city-bern"]))) == []
+    )
+    bern = SearchQuery("RENT", ["APARTMENT"], ["geo-zipcode-3011"])
+    assert ids(store.search(bern)) == ["2"]
+
+
+def test_search_sort_and_pages(store):
+    query = SearchQuery(
+        "RENT",
+        ["APARTMENT", "HOUSE"],
+        sort_by="monthlyRent",
+        sort_direction="asc",
+        size=2,
+    )
+    assert ids(store.search(query)) == ["1", "5"]
+    page = store.search(query.page(4))
+    assert ids(page) == ["3"]
+    assert page["total"] == 5
+
+
+def test_unsupported_filters_are_rejected(store):
+    with pytest.raises(ValueError, match="floor"):
+        store.search(SearchQuery("RENT", ["APARTMENT"], floor={"from": 2}))
+    with pytest.raises(ValueError, match="distance"):
+        store.search(SearchQuery("RENT", ["APARTMENT"], sort_by="distance"))
+
+
+def test_listing_replaces_stored_payload(store):
+    store.add_listing(
+        {**srp_result("1", 1600, rooms=2.5, created_at="2024-01-01"), "detail": True}
+    )
+
+    response = store.search(SearchQuery("RENT", ["APARTMENT"], ["geo-city-zurich"]))
+
+    assert len(store) == 5
+    assert response["results"][-1]["detail"] is True
+
+
+def test_client_local_source(local_api):
+    local_api.routes["/search/listings"] = {"total": 5, "results": RESULTS}
+    local_api.routes["/listings/listing/9"] = srp_result(
+        "9", 900, rooms=1.0, created_at="2024-02-01"
+    )
+    client = Homegate(base_url=local_api.url, listing_store=ListingStore())
+
+    client.search_rent_listings(location="geo-zipcode-8001")
+    client.get_listing("9")
+    requests = len(local_api.requests)
+    response = client.search_rent_listings(
+        location="geo-zipcode-8001", monthlyRent={"to": 2000}, source="local"
+    )
+
+    assert len(local_api.requests) == requests
+    assert ids(response) == ["9", "5", "1"]
+
+
+def test_local_source_requires_a_store(client):
+    with pytest.raises(ValueError, match="listing_store"):
+        client.search_rent_listings(location="geo-zipcode-8001", source="local")
+
+
+def test_local_source_resolves_locations_without_the_api(local_api, store):
+    client = Homegate(base_url=local_api.url, listing_store=store)
+
+    response = client.search_rent_listings(location="8002", source="local")
+    with pytest.raises(ValueError, match="without the API"):
+        client.search_rent_listings(location="Zurich", source="local")
+
+    assert ids(response) == ["5"]
+    assert local_api.requests == []